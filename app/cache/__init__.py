@@ -0,0 +1,110 @@
+"""Read-through cache for by-id lookups of rarely changing reference entities.
+
+Entries are invalidated from app.database.events after every committed write
+to their table, so the TTL only bounds staleness from writes made by other
+replicas when the in-process backend is used.
+"""
+import json
+import logging
+import os
+import threading
+from app.cache.backends import MemoryBackend, SharedBackend, LocalSharedStore
+from app.database import events
+
+logger = logging.getLogger(__name__)
+
+# memory (per process), redis (shared), local (in-process stand-in for the shared store), none
+ENTITY_CACHE_BACKEND = os.getenv("ENTITY_CACHE_BACKEND", "memory")
+ENTITY_CACHE_SIZE = int(os.getenv("ENTITY_CACHE_SIZE", "10000"))
+ENTITY_CACHE_TTL_SECONDS = int(os.getenv("ENTITY_CACHE_TTL_SECONDS", "300"))
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+CACHED_TABLES = ("organizations", "vehicles", "drivers", "locations")
+
+def make_backend(kind, max_entries, ttl_seconds):
+    if kind == "none":
+        return None
+    if kind == "memory":
+        return MemoryBackend(max_entries, ttl_seconds)
+    if kind == "local":
+        return SharedBackend(LocalSharedStore(), ttl_seconds)
+    if kind == "redis":
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("The redis cache backend requires the redis package (pip install redis)")
+        return SharedBackend(redis.Redis.from_url(CACHE_REDIS_URL), ttl_seconds)
+    raise ValueError(f"Unknown cache backend '{kind}'")
+
+class EntityCache:
+    def __init__(self, backend, tables=CACHED_TABLES):
+        self.backend = backend
+        self.tables = set(tables)
+        # Bumped by every invalidation; a load that raced with one is not stored
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(table, row_id):
+        return f"entity:{table}:{row_id}"
+
+    def get(self, db, model, schema, row_id):
+        """The row as a schema dict from the cache, else loaded from the DB and cached; None if missing"""
+        table = model.__tablename__
+        if self.backend is None or table not in self.tables:
+            return db.query(model).filter(model.id == row_id).first()
+
+        key = self.key(table, row_id)
+        try:
+            cached = self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Cache read failed, using the database: {e}")
+            cached = None
+        if cached is not None:
+            return json.loads(cached)
+
+        epoch = self._epoch
+        row = db.query(model).filter(model.id == row_id).first()
+        if row is None:
+            return None
+        if epoch == self._epoch:
+            try:
+                self.backend.set(key, schema.model_validate(row).model_dump_json())
+            except Exception as e:
+                logger.warning(f"Cache write failed: {e}")
+        return row
+
+    def invalidate(self, table, ids=None):
+        if self.backend is None or table not in self.tables:
+            return
+        with self._lock:
+            self._epoch += 1
+        if ids is None:
+            self.backend.delete_prefix(f"entity:{table}:")
+        else:
+            self.backend.delete([self.key(table, row_id) for row_id in ids])
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self):
+        if self.backend is None:
+            return {"backend": "none"}
+        return {
+            "backend": self.backend.name,
+            "tables": sorted(self.tables),
+            "entries": self.backend.size(),
+            "max_entries": getattr(self.backend, "max_entries", None),
+            "ttl_seconds": self.backend.ttl_seconds,
+            **self.backend.stats.to_dict(),
+        }
+
+entity_cache = EntityCache(make_backend(ENTITY_CACHE_BACKEND, ENTITY_CACHE_SIZE, ENTITY_CACHE_TTL_SECONDS))
+
+@events.subscribe
+def _invalidate_entities(table, ids):
+    try:
+        entity_cache.invalidate(table, ids)
+    except Exception as e:
+        logger.error(f"Cache invalidation failed for {table}: {e}")
@@ -0,0 +1,161 @@
+"""Key/value stores behind the caches.
+
+Values are strings (encoded JSON), so every backend holds the same thing and a
+shared store needs no extra serialization. MemoryBackend is a bounded LRU with
+per-entry TTL inside one process. SharedBackend talks to a Redis-compatible
+client, so replicas share entries and invalidations; LocalSharedStore stands
+in for that client in tests and single-process development.
+"""
+from collections import OrderedDict
+import fnmatch
+import threading
+import time
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def to_dict(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "sets": self.sets,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+class MemoryBackend:
+    name = "memory"
+
+    def __init__(self, max_entries, ttl_seconds):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stats = CacheStats()
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            self.stats.sets += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def delete(self, keys):
+        with self._lock:
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    self.stats.invalidations += 1
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+                self.stats.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self):
+        return len(self._entries)
+
+class LocalSharedStore:
+    """In-process stand-in for the subset of the Redis client SharedBackend uses"""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key):
+        entry = self._data.get(key)
+        if entry is not None and entry[0] is not None and entry[0] < time.time():
+            del self._data[key]
+            return None
+        return entry
+
+    def get(self, key):
+        with self._lock:
+            entry = self._live(key)
+            return None if entry is None else entry[1]
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = (time.time() + ex if ex else None, value)
+
+    def delete(self, *keys):
+        with self._lock:
+            return sum(1 for key in keys if self._data.pop(key, None) is not None)
+
+    def scan_iter(self, match):
+        with self._lock:
+            return [key for key in list(self._data) if fnmatch.fnmatchcase(key, match) and self._live(key)]
+
+    def dbsize(self):
+        with self._lock:
+            return len(self._data)
+
+class SharedBackend:
+    """Entries in a shared store; size limits and LRU eviction are the store's (maxmemory policy)"""
+    name = "shared"
+
+    def __init__(self, client, ttl_seconds, namespace="fleet"):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.namespace = namespace
+        self.stats = CacheStats()
+
+    def _key(self, key):
+        return f"{self.namespace}:{key}"
+
+    def get(self, key):
+        value = self.client.get(self._key(key))
+        if value is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return value.decode() if isinstance(value, bytes) else value
+
+    def set(self, key, value):
+        self.client.set(self._key(key), value, ex=self.ttl_seconds)
+        self.stats.sets += 1
+
+    def delete(self, keys):
+        if keys:
+            self.stats.invalidations += self.client.delete(*[self._key(key) for key in keys])
+
+    def delete_prefix(self, prefix):
+        keys = list(self.client.scan_iter(match=self._key(prefix) + "*"))
+        if keys:
+            self.stats.invalidations += self.client.delete(*keys)
+
+    def clear(self):
+        self.delete_prefix("")
+
+    def size(self):
+        return None
@@ -0,0 +1,117 @@
+"""ETag / Last-Modified support backed by the row version columns.
+
+A row's ETag is derived from its version and updated_at; a list page's from
+the (id, version, updated_at) of every row on it, so any insert, update or
+delete that touches the page changes it. Requests carrying If-None-Match are
+checked with a query for just those columns and answered with 304 before the
+full rows are loaded or serialized.
+"""
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from fastapi import Request, Response
+from sqlalchemy import select
+import functools
+import hashlib
+import inspect
+
+def row_etag(version, updated_at, variant=None):
+    """variant distinguishes responses that carry more than the row, e.g. a live ETA"""
+    token = f"{version}:{updated_at}" if variant is None else f"{version}:{updated_at}:{variant}"
+    digest = hashlib.sha1(token.encode()).hexdigest()[:20]
+    return f'"{digest}"'
+
+def list_etag(versions):
+    """ETag of a page from its (id, version, updated_at) tuples, in page order"""
+    digest = hashlib.sha1()
+    for row_id, version, updated_at in versions:
+        digest.update(f"{row_id}:{version}:{updated_at};".encode())
+    return f'"{digest.hexdigest()[:20]}"'
+
+def http_date(value):
+    if value is None:
+        return None
+    # Timestamps are stored as naive UTC
+    return format_datetime(value.replace(tzinfo=timezone.utc), usegmt=True)
+
+def etag_matches(header, etag):
+    """If-None-Match uses the weak comparison, so W/ prefixes are ignored"""
+    if header is None:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in header.split(","))
+
+def validator_headers(etag, last_modified):
+    headers = {"ETag": etag}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+def not_modified(headers):
+    return Response(status_code=304, headers=headers)
+
+def _version_of(row):
+    # Entity cache hits are JSON dicts, misses ORM rows
+    if isinstance(row, dict):
+        updated_at = row.get("updated_at")
+        if isinstance(updated_at, str):
+            updated_at = datetime.fromisoformat(updated_at)
+        return row.get("id"), row.get("version"), updated_at
+    return row.id, row.version, row.updated_at
+
+def page_validators(rows):
+    """(etag, last_modified) of a loaded page of ORM rows"""
+    versions = [(row.id, row.version, row.updated_at) for row in rows]
+    return _page_validators(versions)
+
+def query_validators(query):
+    """(etag, last_modified) of a list query, reading only the version columns"""
+    model = query.column_descriptions[0]["entity"]
+    return _page_validators(query.with_entities(model.id, model.version, model.updated_at).all())
+
+def _page_validators(versions):
+    modified = [updated_at for _, _, updated_at in versions if updated_at is not None]
+    return list_etag(versions), max(modified, default=None)
+
+def with_request(func, *parameters):
+    """Signature of func plus keyword-only request/response parameters for FastAPI to inject"""
+    signature = inspect.signature(func)
+    extra = [
+        inspect.Parameter(name, inspect.Parameter.KEYWORD_ONLY, annotation=annotation)
+        for name, annotation in parameters
+        if name not in signature.parameters
+    ]
+    return signature.replace(parameters=[*signature.parameters.values(), *extra])
+
+def conditional(model, param, column=None, variant=None):
+    """Add ETag/Last-Modified to a single-row GET and answer matching If-None-Match with 304.
+
+    The row is looked up by the path parameter `param` in `column` (the primary
+    key by default). The handler itself still decides 404s. variant(row_id),
+    when given, returns a token for whatever else the response carries; it is
+    part of the ETag, so a change in it is never answered with 304.
+    """
+    column = model.id if column is None else column
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, request: Request, response: Response, **kwargs):
+            if_none_match = request.headers.get("if-none-match")
+            if if_none_match is not None:
+                current = kwargs["db"].execute(
+                    select(model.id, model.version, model.updated_at).where(column == kwargs[param])
+                ).first()
+                if current is not None:
+                    etag = row_etag(current.version, current.updated_at, variant and variant(current.id))
+                    if etag_matches(if_none_match, etag):
+                        return not_modified(validator_headers(etag, current.updated_at))
+            result = func(*args, **kwargs)
+            row_id, version, updated_at = _version_of(result)
+            if version is not None:
+                etag = row_etag(version, updated_at, variant and variant(row_id))
+                response.headers.update(validator_headers(etag, updated_at))
+            return result
+
+        wrapper.__signature__ = with_request(func, ("request", Request), ("response", Response))
+        return wrapper
+    return decorator
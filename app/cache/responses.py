@@ -0,0 +1,334 @@
+"""Encoded-response cache for list endpoints.
+
+Entries are keyed on the handler plus its parsed parameters, so equivalent
+query strings (reordered, defaults spelled out, "1" vs "01") share an entry.
+Each entry remembers the generation of every table it was built from; any
+committed write to one of those tables bumps its generation (via
+app.database.events), so entries go stale exactly when their data changes.
+Writes from other processes (API workers, the job worker, scripts) are
+picked up from the change_log table (app.services.changelog): at most every
+RESPONSE_CACHE_SYNC_SECONDS a lookup reads the tables logged since the last
+read and bumps them. There is no expiry: if the log cannot be read, every
+table is bumped, and again on the first read that succeeds.
+
+Identical requests arriving while one is already querying wait for it and
+return its bytes (single-flight) instead of issuing the same SQL again. The
+generations are part of the flight key, so a request that starts after a
+write never joins a flight that began before it.
+
+Every response carries the ETag and Last-Modified of its rows (see
+app.cache.conditional), stored alongside the cached body.
+"""
+from collections import OrderedDict, defaultdict
+from datetime import date, datetime
+from enum import Enum
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Query
+import functools
+import logging
+import os
+import threading
+import time
+from sqlalchemy import select
+from app.database import events
+from app.database.config import engine
+from app.models.models import ChangeLog
+from app.services import changelog
+from app.cache.conditional import (
+    etag_matches, not_modified, page_validators, query_validators, row_etag, validator_headers, with_request
+)
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Larger bodies are served but not cached, so one huge page cannot flush the cache
+RESPONSE_CACHE_MAX_ENTRY_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRY_BYTES", str(RESPONSE_CACHE_MAX_BYTES // 16)))
+# How often the change log is read for writes made by other processes; 0 reads it on every lookup
+RESPONSE_CACHE_SYNC_SECONDS = float(os.getenv("RESPONSE_CACHE_SYNC_SECONDS", "1"))
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+
+_KEY_TYPES = (str, int, float, bool, type(None), date, datetime, Enum)
+
+class ResponseCache:
+    def __init__(self, max_bytes=RESPONSE_CACHE_MAX_BYTES, max_entry_bytes=RESPONSE_CACHE_MAX_ENTRY_BYTES,
+                 sync_seconds=RESPONSE_CACHE_SYNC_SECONDS):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.sync_seconds = sync_seconds
+        self._generations = defaultdict(int)
+        self._entries = OrderedDict()  # key -> (generations, (body, headers))
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._cursor = None  # newest change_log id seen
+        self._synced_at = -float("inf")
+        self._sync_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+        self.uncacheable = 0
+
+    def bump(self, table):
+        with self._lock:
+            self._generations[table] += 1
+
+    def sync(self):
+        """Bump the tables written through other processes since the last sync, at most every sync_seconds"""
+        if time.monotonic() - self._synced_at < self.sync_seconds:
+            return
+        # One thread reads the log; the others carry on with the generations they have
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            with engine.connect() as connection:
+                if self._cursor is None:
+                    cursor = changelog.horizon(connection)
+                    # Entries stored before the first read may have missed writes: drop them all
+                    tables = list(self._generations)
+                else:
+                    cursor = max(self._cursor, changelog.horizon(connection, self._cursor))
+                    tables = connection.scalars(
+                        select(ChangeLog.table_name).distinct()
+                        .where(ChangeLog.id > self._cursor, ChangeLog.id <= cursor)
+                    ).all()
+            with self._lock:
+                for table in tables:
+                    self._generations[table] += 1
+            self._cursor = cursor
+            self._synced_at = time.monotonic()
+        except Exception as e:
+            # Other processes' writes cannot be seen: drop everything, and again once the log is readable
+            logger.warning(f"Response cache could not read the change log, invalidating all entries: {e}")
+            with self._lock:
+                for table in list(self._generations):
+                    self._generations[table] += 1
+            self._cursor = None
+            self._synced_at = time.monotonic()
+        finally:
+            self._sync_lock.release()
+
+    def generations(self, tables):
+        with self._lock:
+            return tuple(self._generations[table] for table in tables)
+
+    def get(self, key, tables):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] != tuple(self._generations[table] for table in tables):
+                self._remove(key)
+                self.stale += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, generations, entry):
+        """entry is (body, headers); only the body counts towards the bound"""
+        if len(entry[0]) > self.max_entry_bytes:
+            self.uncacheable += 1
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (generations, entry)
+            self._bytes += len(entry[0])
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, entry = self._entries.pop(key)
+        self._bytes -= len(entry[0])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "stale": self.stale,
+            "evictions": self.evictions,
+            "uncacheable": self.uncacheable,
+            "change_log_cursor": self._cursor,
+            "generations": dict(self._generations),
+        }
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Run a function once per key for all callers that overlap in time"""
+
+    def __init__(self, enabled=SINGLE_FLIGHT_ENABLED):
+        self.enabled = enabled
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+
+    def do(self, key, fn):
+        if not self.enabled:
+            return fn()
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.leaders += 1
+            else:
+                self.followers += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            # Followers see the same 404 (or failure) as the leader
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "in_flight": len(self._flights),
+            "leaders": self.leaders,
+            "followers": self.followers,
+        }
+
+response_cache = ResponseCache()
+flights = SingleFlight()
+
+@events.subscribe
+def _bump_generation(table, ids):
+    response_cache.bump(table)
+
+def _route_key(name, kwargs):
+    return (name, tuple(sorted(
+        (param, value) for param, value in kwargs.items() if isinstance(value, _KEY_TYPES)
+    )))
+
+def _encoder(response_model):
+    adapter = TypeAdapter(response_model)
+
+    def encode(result):
+        """(body, validator headers) of a handler result: a list Query, a list of rows, or one row"""
+        if isinstance(result, Query):
+            result = result.all()
+        if isinstance(result, list):
+            headers = validator_headers(*page_validators(result))
+        else:
+            headers = validator_headers(row_etag(result.version, result.updated_at), result.updated_at)
+        return adapter.dump_json(adapter.validate_python(result, from_attributes=True)), headers
+    return encode
+
+def _respond(request, body, headers):
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return not_modified(headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# The handler was not called by _precheck
+_UNSET = object()
+
+def _precheck(request, func, args, kwargs):
+    """For If-None-Match on a list, (304 response or None, the handler's result or _UNSET).
+
+    The result is whatever the handler returned, Query or not, so it is
+    encoded as is rather than computed again.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return None, _UNSET
+    result = func(*args, **kwargs)
+    if not isinstance(result, Query):
+        return None, result
+    headers = validator_headers(*query_validators(result))
+    return (not_modified(headers) if etag_matches(if_none_match, headers["ETag"]) else None), result
+
+def cached_response(response_model, tables, cache=response_cache, coalesce=True):
+    """Serve a GET handler's encoded JSON from the cache until one of its tables is written.
+
+    The handler returns its un-executed Query (or rows); they are encoded
+    once with the response model and every hit returns the stored bytes and
+    ETag unchanged. If-None-Match on a miss is checked against the page's
+    row versions before any full row is loaded. Concurrent misses for the
+    same key share one query unless coalesce=False.
+    """
+    encode = _encoder(response_model)
+    tables = tuple(tables)
+
+    def decorator(func):
+        name = f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, request: Request, **kwargs):
+            key = _route_key(name, kwargs)
+            cache.sync()
+            entry = cache.get(key, tables)
+            if entry is None:
+                # Read before querying, so a write racing with the query leaves the entry stale
+                generations = cache.generations(tables)
+                unchanged, result = _precheck(request, func, args, kwargs)
+                if unchanged is not None:
+                    return unchanged
+
+                def load():
+                    loaded = encode(func(*args, **kwargs) if result is _UNSET else result)
+                    cache.set(key, generations, loaded)
+                    return loaded
+
+                entry = flights.do((key, generations), load) if coalesce else load()
+            return _respond(request, *entry)
+
+        wrapper.__signature__ = with_request(func, ("request", Request))
+        return wrapper
+    return decorator
+
+def single_flight(response_model, tables=()):
+    """Coalesce concurrent identical calls of an uncached GET handler.
+
+    For data that changes too often to cache (the latest GPS fix). Listing
+    the tables the handler reads keeps requests that start after a write
+    from sharing a result read before it.
+    """
+    encode = _encoder(response_model)
+    tables = tuple(tables)
+
+    def decorator(func):
+        name = f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, request: Request, **kwargs):
+            response_cache.sync()
+            key = (_route_key(name, kwargs), response_cache.generations(tables))
+            unchanged, result = _precheck(request, func, args, kwargs)
+            if unchanged is not None:
+                return unchanged
+            entry = flights.do(key, lambda: encode(func(*args, **kwargs) if result is _UNSET else result))
+            return _respond(request, *entry)
+
+        wrapper.__signature__ = with_request(func, ("request", Request))
+        return wrapper
+    return decorator
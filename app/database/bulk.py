@@ -0,0 +1,155 @@
+from sqlalchemy import insert, update, delete, select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from pydantic import ValidationError
+from itertools import groupby
+from app.database import events
+import os
+
+# Rows per multi-row statement
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "1000"))
+
+ATOMIC = "atomic"
+BEST_EFFORT = "best_effort"
+
+SUCCEEDED = ("created", "updated", "deleted")
+
+def chunked(items, size=BULK_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def error_message(exc):
+    if isinstance(exc, ValidationError):
+        return "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in exc.errors())
+    if isinstance(exc, DBAPIError):
+        return str(exc.orig).strip().splitlines()[0]
+    return str(exc)
+
+def validate_rows(schema, rows, partial=False):
+    """Validate every row in one pass, returning ([(index, values)], [error results]).
+
+    With partial=True each row is a partial update that must carry its "id";
+    only the fields present in the row end up in values.
+    """
+    valid, errors = [], []
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors.append({"index": index, "status": "invalid", "error": "row must be an object"})
+            continue
+        fields = dict(row)
+        row_id = fields.pop("id", None) if partial else None
+        if partial and (not isinstance(row_id, int) or isinstance(row_id, bool)):
+            errors.append({"index": index, "status": "invalid", "error": "id: an integer id is required"})
+            continue
+        try:
+            values = schema(**fields).dict(exclude_unset=partial)
+        except ValidationError as e:
+            errors.append({"index": index, "status": "invalid", "error": error_message(e)})
+            continue
+        if partial:
+            values["id"] = row_id
+        valid.append((index, values))
+    return valid, errors
+
+def _write_bisect(db, table, chunk, write_many, status, op):
+    """Write a chunk under a savepoint; on failure split it in halves to find the bad rows.
+
+    write_many receives a list of values and returns their ids in order. A chunk
+    with k bad rows costs O(k log n) statements instead of one per row.
+    """
+    try:
+        with db.begin_nested():
+            ids = write_many([values for _, values in chunk])
+            events.record(db, table, ids, op)
+        return [{"index": index, "id": row_id, "status": status} for (index, _), row_id in zip(chunk, ids)]
+    except DBAPIError as e:
+        if len(chunk) == 1:
+            return [{"index": chunk[0][0], "status": "failed", "error": error_message(e)}]
+        middle = len(chunk) // 2
+        return (_write_bisect(db, table, chunk[:middle], write_many, status, op)
+                + _write_bisect(db, table, chunk[middle:], write_many, status, op))
+
+def insert_rows(db: Session, model, rows):
+    """Multi-row INSERT ... RETURNING id per chunk; rows are (index, values) pairs"""
+    statement = insert(model).returning(model.id, sort_by_parameter_order=True)
+
+    def insert_many(params):
+        return db.scalars(statement, params).all()
+
+    results = []
+    for chunk in chunked(rows):
+        results.extend(_write_bisect(db, model.__tablename__, chunk, insert_many, "created", events.INSERT))
+    return results
+
+def update_rows(db: Session, model, rows):
+    """Bulk UPDATE by primary key per chunk; every row's values include its id"""
+
+    def update_many(params):
+        # Executemany needs one statement shape, so group rows that set the same columns
+        by_columns = sorted(params, key=sorted)
+        for columns, group in groupby(by_columns, key=sorted):
+            if len(columns) > 1:
+                db.execute(update(model), list(group))
+        return [values["id"] for values in params]
+
+    results = []
+    for chunk in chunked(rows):
+        ids = [values["id"] for _, values in chunk]
+        existing = set(db.scalars(select(model.id).where(model.id.in_(ids))).all())
+        found = []
+        for index, values in chunk:
+            if values["id"] in existing:
+                found.append((index, values))
+            else:
+                results.append({"index": index, "id": values["id"], "status": "not_found"})
+        if found:
+            results.extend(_write_bisect(db, model.__tablename__, found, update_many, "updated", events.UPDATE))
+    return results
+
+def delete_rows(db: Session, model, ids):
+    """DELETE ... WHERE id IN (...) RETURNING id per chunk"""
+    results = []
+    for chunk in chunked(list(enumerate(ids))):
+        try:
+            with db.begin_nested():
+                statement = delete(model).where(model.id.in_([row_id for _, row_id in chunk])).returning(model.id)
+                deleted = set(db.scalars(statement).all())
+                events.record(db, model.__tablename__, deleted, events.DELETE)
+            results.extend(
+                {"index": index, "id": row_id, "status": "deleted" if row_id in deleted else "not_found"}
+                for index, row_id in chunk
+            )
+        except DBAPIError:
+            for index, row_id in chunk:
+                try:
+                    with db.begin_nested():
+                        deleted = db.scalars(delete(model).where(model.id == row_id).returning(model.id)).first()
+                        events.record(db, model.__tablename__, [deleted] if deleted else [], events.DELETE)
+                    results.append({"index": index, "id": row_id, "status": "deleted" if deleted else "not_found"})
+                except DBAPIError as e:
+                    results.append({"index": index, "id": row_id, "status": "failed", "error": error_message(e)})
+    return results
+
+def finish(db: Session, mode, requested, results):
+    """Commit (best effort) or roll everything back if any row failed (atomic)"""
+    results.sort(key=lambda r: r["index"])
+    failed = sum(1 for r in results if r["status"] not in SUCCEEDED)
+    rolled_back = mode == ATOMIC and failed > 0
+    if rolled_back:
+        db.rollback()
+        for r in results:
+            if r["status"] in SUCCEEDED:
+                if r["status"] == "created":
+                    # The id was never committed
+                    r.pop("id", None)
+                r["status"] = "rolled_back"
+    else:
+        db.commit()
+
+    return {
+        "mode": mode,
+        "requested": requested,
+        "succeeded": 0 if rolled_back else requested - failed,
+        "failed": failed,
+        "results": results,
+    }
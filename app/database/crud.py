@@ -0,0 +1,37 @@
+from sqlalchemy import insert, update, select
+from sqlalchemy.orm import Session
+from app.database import events
+
+# Write helpers shared by the routers. Each write is a single statement with
+# RETURNING, so the row sent back to the client costs no extra SELECT. The
+# returned instance is expunged before commit to keep commit from expiring it.
+# Written ids are recorded so caches are invalidated once the commit succeeds.
+
+def create_returning(db: Session, model, values: dict):
+    """INSERT ... RETURNING the new row"""
+    row = db.scalars(insert(model).values(**values).returning(model)).one()
+    events.record(db, model.__tablename__, [row.id], events.INSERT)
+    db.expunge(row)
+    db.commit()
+    return row
+
+def update_returning(db: Session, model, row_id: int, values: dict):
+    """UPDATE ... WHERE id = :id RETURNING the row, or None when no row matched"""
+    if not values:
+        return db.scalars(select(model).where(model.id == row_id)).first()
+
+    statement = (
+        update(model)
+        .where(model.id == row_id)
+        .values(**values)
+        .returning(model)
+        .execution_options(synchronize_session=False)
+    )
+    row = db.scalars(statement).first()
+    if row is None:
+        db.rollback()
+        return None
+    events.record(db, model.__tablename__, [row.id], events.UPDATE)
+    db.expunge(row)
+    db.commit()
+    return row
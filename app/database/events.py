@@ -0,0 +1,109 @@
+"""Write notifications for caches and other derived state.
+
+Writes made through a Session are collected while the transaction is open and
+published only after it commits, so rolled-back changes never reach
+subscribers. ORM flushes are captured automatically; Core statements (the
+RETURNING helpers in crud and bulk) record their rows with record(). Writes
+that bypass sessions entirely (seeding, clearing, snapshot restore, CSV
+import) call publish() themselves.
+
+Subscribers receive (table, ids); ids is None when the whole table changed.
+They run in the committing request, so work that queries should be handed to
+a BackgroundQueue. Each record also keeps its operation in
+session.info["ops"], in write order, for the change log
+(app.services.changelog) to persist before commit.
+"""
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+INSERT = "insert"
+UPDATE = "update"
+DELETE = "delete"
+
+_subscribers = []
+
+def subscribe(callback):
+    _subscribers.append(callback)
+    return callback
+
+def publish(table, ids=None):
+    for callback in _subscribers:
+        try:
+            callback(table, None if ids is None else set(ids))
+        except Exception as e:
+            logger.error(f"Write subscriber {callback.__name__} failed for {table}: {e}")
+
+def publish_all(tables):
+    for table in tables:
+        publish(table)
+
+def record(session, table, ids, op=UPDATE):
+    """Note rows written by a Core statement; published when the session commits"""
+    ids = list(ids)
+    changes = session.info.setdefault("changes", {})
+    pending = changes.setdefault(table, set())
+    if pending is not None:
+        pending.update(ids)
+    session.info.setdefault("ops", []).append((table, op, ids))
+
+@event.listens_for(Session, "after_flush")
+def _record_flush(session, flush_context):
+    for op, instances in ((INSERT, session.new), (UPDATE, session.dirty), (DELETE, session.deleted)):
+        for instance in instances:
+            table = getattr(instance, "__tablename__", None)
+            if table is not None and getattr(instance, "id", None) is not None:
+                record(session, table, [instance.id], op)
+
+@event.listens_for(Session, "after_commit")
+def _publish_commit(session):
+    session.info.pop("ops", None)
+    changes = session.info.pop("changes", None)
+    for table, ids in (changes or {}).items():
+        publish(table, ids)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_rollback(session, previous_transaction):
+    # Savepoint rollbacks (bulk writes isolating a bad row) keep the rest of the changes
+    if previous_transaction.parent is None:
+        session.info.pop("changes", None)
+        session.info.pop("ops", None)
+
+class BackgroundQueue:
+    """Ids handed off by a subscriber, drained by a daemon thread started on first use.
+
+    run(ids) gets every id queued since its previous call, sorted, so a burst
+    of writes costs one call.
+    """
+
+    def __init__(self, name, run):
+        self.name = name
+        self.run = run
+        self._ids = set()
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def add(self, ids):
+        with self._condition:
+            self._ids.update(ids)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._drain, name=self.name, daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def pending(self):
+        return len(self._ids)
+
+    def _drain(self):
+        while True:
+            with self._condition:
+                while not self._ids:
+                    self._condition.wait()
+                ids, self._ids = sorted(self._ids), set()
+            try:
+                self.run(ids)
+            except Exception as e:
+                logger.error(f"{self.name} failed for {len(ids)} ids: {e}")
@@ -0,0 +1,73 @@
+"""Full-text indexes over free-text columns.
+
+Postgres indexes to_tsvector() of the columns with an expression GIN index,
+which it keeps current on every write; queries must use document() so the
+planner recognises the indexed expression. SQLite gets an FTS5 table per
+searchable table that reads its text from the table itself (external
+content), kept in step by insert, update and delete triggers.
+
+Both are created and dropped with their table, so create_all, clear and
+snapshot restore need nothing extra.
+"""
+from sqlalchemy import Index, String, event, func, literal_column
+import sqlalchemy.dialects.postgresql  # noqa: F401 - registers to_tsvector/to_tsquery for func
+
+LANGUAGE = "english"
+# Porter stemming comes closest to the english text search configuration
+SQLITE_TOKENIZER = "porter unicode61 remove_diacritics 2"
+
+# table name -> searchable column names
+SEARCHABLE = {}
+
+def document(columns):
+    """to_tsvector('english', col1 || ' ' || col2 ...), NULLs as empty text"""
+    text = None
+    for column in columns:
+        part = func.coalesce(column, literal_column("''", String))
+        text = part if text is None else text + literal_column("' '", String) + part
+    return func.to_tsvector(literal_column(f"'{LANGUAGE}'"), text)
+
+def fts_table(table_name):
+    return f"{table_name}_fts"
+
+def _sqlite_ddl(table_name, columns):
+    fts = fts_table(table_name)
+    names = ", ".join(columns)
+    new = ", ".join(f"new.{column}" for column in columns)
+    old = ", ".join(f"old.{column}" for column in columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({names}, "
+        f"content='{table_name}', content_rowid='id', tokenize='{SQLITE_TOKENIZER}')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table_name} BEGIN "
+        f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table_name} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {names} ON {table_name} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new}); END",
+        # Index rows already in the table
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+def create_sqlite_index(connection, table_name):
+    for statement in _sqlite_ddl(table_name, SEARCHABLE[table_name]):
+        connection.exec_driver_sql(statement)
+
+def _after_create(table, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        create_sqlite_index(connection, table.name)
+
+def _after_drop(table, connection, **kw):
+    # The triggers went with the table
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {fts_table(table.name)}")
+
+def searchable(table, *columns):
+    """Declare a full-text index over some text columns of a table"""
+    SEARCHABLE[table.name] = columns
+    # An expression-only index does not find its table by itself
+    table.append_constraint(Index(
+        f"ix_{table.name}_fulltext", document([table.c[name] for name in columns]), postgresql_using="gin"
+    ).ddl_if(dialect="postgresql"))
+    event.listen(table, "after_create", _after_create)
+    event.listen(table, "after_drop", _after_drop)
@@ -0,0 +1,234 @@
+from sqlalchemy import MetaData, Table, Column, Integer, String, DateTime, select, func, text, inspect
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.schema import CreateIndex
+from datetime import datetime
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Apply pending migrations at startup; set to false to run scripts/migrate.py as a release step instead
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "true").lower() == "true"
+
+# Arbitrary key for pg_advisory_lock so only one worker migrates at a time
+MIGRATION_LOCK_KEY = 7_210_431
+
+# Kept out of Base.metadata so clearing or recreating data tables never touches it
+schema_metadata = MetaData()
+schema_version = Table(
+    "schema_version",
+    schema_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String),
+    Column("applied_at", DateTime, default=datetime.utcnow),
+)
+
+class Migration:
+    def __init__(self, version, description, upgrade, transactional):
+        self.version = version
+        self.description = description
+        self.upgrade = upgrade
+        self.transactional = transactional
+
+MIGRATIONS = []
+
+def migration(version, description, transactional=True):
+    """Register a schema migration.
+
+    Transactional migrations receive a connection inside a transaction.
+    Non-transactional ones receive the engine, for statements such as
+    CREATE INDEX CONCURRENTLY that Postgres refuses to run in a transaction.
+    Migrations must be idempotent: a fresh database gets the current models
+    from the baseline, so later steps find their objects already present.
+    """
+    def decorator(func):
+        MIGRATIONS.append(Migration(version, description, func, transactional))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return func
+    return decorator
+
+def head_version():
+    return MIGRATIONS[-1].version if MIGRATIONS else 0
+
+def current_version(engine):
+    """Single-query version check used on the startup fast path"""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+    except (OperationalError, ProgrammingError):
+        return 0
+
+def execute_online(engine, statement):
+    """Run DDL outside a transaction (required for CONCURRENTLY on Postgres)"""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql(statement)
+
+def _drop_invalid_index(engine, name):
+    # An interrupted CREATE INDEX CONCURRENTLY leaves an INVALID index behind that
+    # IF NOT EXISTS would otherwise keep forever
+    with engine.connect() as conn:
+        invalid = conn.execute(text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ), {"name": name}).first()
+    if invalid:
+        logger.warning(f"Dropping invalid index {name} left by an interrupted build")
+        execute_online(engine, f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+def index_applies(index, dialect):
+    """Whether an index is built on this dialect (see Index.ddl_if)"""
+    condition = index._ddl_if
+    return condition is None or condition.dialect in (None, dialect.name)
+
+def create_index_online(engine, index):
+    """Create an index without blocking writes to its table"""
+    if not index_applies(index, engine.dialect):
+        return
+    ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=engine.dialect))
+    if engine.dialect.name == "postgresql":
+        _drop_invalid_index(engine, index.name)
+        ddl = ddl.replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY", 1)
+        ddl = ddl.replace("CREATE UNIQUE INDEX", "CREATE UNIQUE INDEX CONCURRENTLY", 1)
+    logger.info(f"Creating index {index.name}")
+    execute_online(engine, ddl)
+
+def _acquire_lock(conn):
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+def _release_lock(conn):
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+def upgrade(engine, target=None):
+    """Apply every migration above the recorded version, in order"""
+    target = head_version() if target is None else target
+    schema_metadata.create_all(bind=engine)
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock_conn:
+        _acquire_lock(lock_conn)
+        try:
+            # Another worker may have finished while we waited for the lock
+            version = current_version(engine)
+            applied = []
+            for step in MIGRATIONS:
+                if step.version <= version or step.version > target:
+                    continue
+                logger.info(f"Applying migration {step.version}: {step.description}")
+                if step.transactional:
+                    with engine.begin() as conn:
+                        step.upgrade(conn)
+                        conn.execute(schema_version.insert().values(version=step.version, description=step.description))
+                else:
+                    step.upgrade(engine)
+                    with engine.begin() as conn:
+                        conn.execute(schema_version.insert().values(version=step.version, description=step.description))
+                applied.append(step.version)
+            return applied
+        finally:
+            _release_lock(lock_conn)
+
+def ensure_schema(engine):
+    """Startup hook: check the version and only migrate when behind"""
+    version = current_version(engine)
+    head = head_version()
+    if version == head:
+        logger.info(f"Database schema is up to date (version {version})")
+        return
+    if version > head:
+        logger.warning(f"Database schema version {version} is newer than this build ({head})")
+        return
+    if not AUTO_MIGRATE:
+        logger.error(f"Database schema is at version {version}, expected {head}; run scripts/migrate.py")
+        return
+    applied = upgrade(engine)
+    logger.info(f"Applied migrations {applied}; schema is at version {head}")
+
+# Migrations
+
+@migration(1, "Baseline schema")
+def baseline(conn):
+    from app.database.config import Base
+    from app.models import models  # noqa: F401 - registers the tables on Base.metadata
+    Base.metadata.create_all(bind=conn)
+
+@migration(2, "Indexes for list endpoint filters", transactional=False)
+def list_filter_indexes(engine):
+    from app.models import models
+    names = [
+        "ix_vehicles_organization_id_status", "ix_vehicles_status_vehicle_type", "ix_vehicles_vehicle_type",
+        "ix_drivers_organization_id_status", "ix_drivers_status",
+        "ix_locations_organization_id_type", "ix_locations_type", "ix_locations_state_city",
+        "ix_routes_vehicle_id_scheduled_departure", "ix_routes_driver_id_scheduled_departure",
+        "ix_routes_status_scheduled_departure",
+        "ix_deliveries_route_id_status", "ix_deliveries_status_priority", "ix_deliveries_priority",
+        "ix_deliveries_location_id",
+        "ix_maintenance_records_vehicle_id_service_date", "ix_maintenance_records_maintenance_type",
+        "ix_fuel_logs_vehicle_id_date", "ix_fuel_logs_fuel_type",
+        "ix_incidents_driver_id_date", "ix_incidents_resolved_severity", "ix_incidents_severity",
+        "ix_incidents_incident_type",
+        "ix_gps_tracking_vehicle_id_timestamp", "ix_gps_tracking_timestamp",
+    ]
+    indexes = {index.name: index for table in models.Base.metadata.sorted_tables for index in table.indexes}
+    for name in names:
+        create_index_online(engine, indexes[name])
+
+@migration(3, "Background job queue")
+def job_queue(conn):
+    from app.models import models
+    models.Job.__table__.create(bind=conn, checkfirst=True)
+
+@migration(4, "Row versions for conditional requests")
+def row_versions(conn):
+    from app.database.config import Base
+    from app.models import models  # noqa: F401
+    applied_at = datetime.utcnow().isoformat(sep=" ")
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        if "version" not in table.c:
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        if "version" not in existing:
+            conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+        if "updated_at" not in existing:
+            # A constant default fills existing rows without rewriting the table;
+            # the migration time is a safe upper bound on their last change
+            conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN updated_at TIMESTAMP DEFAULT '{applied_at}'")
+            if conn.dialect.name == "postgresql":
+                conn.exec_driver_sql(f"ALTER TABLE {table.name} ALTER COLUMN updated_at DROP DEFAULT")
+
+@migration(5, "Change log for incremental sync")
+def change_log(conn):
+    from app.models import models
+    models.ChangeLog.__table__.create(bind=conn, checkfirst=True)
+
+@migration(6, "Trigram index for tracking number search", transactional=False)
+def tracking_number_trigram_index(engine):
+    from app.models import models
+    if engine.dialect.name != "postgresql":
+        return
+    execute_online(engine, "CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    indexes = {index.name: index for index in models.Delivery.__table__.indexes}
+    create_index_online(engine, indexes["ix_deliveries_tracking_number_trgm"])
+
+@migration(7, "Full-text search indexes", transactional=False)
+def fulltext_indexes(engine):
+    from app.database import fulltext
+    from app.models import models
+    for table in models.Base.metadata.sorted_tables:
+        if table.name not in fulltext.SEARCHABLE:
+            continue
+        if engine.dialect.name == "sqlite":
+            with engine.begin() as conn:
+                fulltext.create_sqlite_index(conn, table.name)
+        else:
+            indexes = {index.name: index for index in table.indexes}
+            create_index_online(engine, indexes[f"ix_{table.name}_fulltext"])
+
+@migration(8, "Trigram index for city search", transactional=False)
+def city_trigram_index(engine):
+    from app.models import models
+    if engine.dialect.name != "postgresql":
+        return
+    indexes = {index.name: index for index in models.Location.__table__.indexes}
+    create_index_online(engine, indexes["ix_locations_city_trgm"])
@@ -0,0 +1,192 @@
+from sqlalchemy import event
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+import hashlib
+import logging
+import math
+import os
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Statements slower than this are recorded together with their query plan
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "true").lower() == "true"
+# EXPLAIN (ANALYZE, BUFFERS) executes the statement a second time, so it is opt-in
+SLOW_QUERY_EXPLAIN_ANALYZE = os.getenv("SLOW_QUERY_EXPLAIN_ANALYZE", "false").lower() == "true"
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "1000"))
+
+# "GET /vehicles/" style label of the route that issued the statement
+current_route: ContextVar = ContextVar("current_route", default=None)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\([^)]+\)s|%s|\?|:\w+")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*\?\s*,?)+\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+def fingerprint(statement):
+    """Normalize a statement so that executions differing only in literals group together"""
+    normalized = _STRING_LITERAL.sub("?", statement)
+    normalized = _PLACEHOLDER.sub("?", normalized)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _IN_LIST.sub("IN (...)", normalized)
+    normalized = _WHITESPACE.sub(" ", normalized).strip()
+    return hashlib.sha1(normalized.encode()).hexdigest()[:16], normalized
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    # Nearest rank: the smallest value with at least pct% of the values at or below it
+    rank = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+class SlowQueryLog:
+    """Bounded in-memory log of slow statements"""
+
+    def __init__(self, maxlen=SLOW_QUERY_LOG_SIZE):
+        self._entries = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def record(self, entry):
+        with self._lock:
+            self._entries.append(entry)
+
+    def entries(self):
+        with self._lock:
+            return list(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def summary(self):
+        """Group recorded statements by fingerprint with count and latency percentiles"""
+        groups = {}
+        for entry in self.entries():
+            group = groups.setdefault(entry["fingerprint"], {
+                "fingerprint": entry["fingerprint"],
+                "statement": entry["normalized"],
+                "durations": [],
+                "routes": set(),
+                "last_seen": None,
+                "last_parameters": None,
+                "last_plan": None,
+            })
+            group["durations"].append(entry["duration_ms"])
+            if entry["route"]:
+                group["routes"].add(entry["route"])
+            group["last_seen"] = entry["recorded_at"]
+            group["last_parameters"] = entry["parameters"]
+            group["last_plan"] = entry["plan"] or group["last_plan"]
+
+        results = []
+        for group in groups.values():
+            durations = sorted(group.pop("durations"))
+            group["count"] = len(durations)
+            group["mean_ms"] = round(sum(durations) / len(durations), 3)
+            group["p50_ms"] = round(_percentile(durations, 50), 3)
+            group["p95_ms"] = round(_percentile(durations, 95), 3)
+            group["max_ms"] = round(durations[-1], 3)
+            group["total_ms"] = round(sum(durations), 3)
+            group["routes"] = sorted(group["routes"])
+            results.append(group)
+
+        results.sort(key=lambda g: g["total_ms"], reverse=True)
+        return results
+
+slow_query_log = SlowQueryLog()
+
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+def _explain_prefix(dialect_name, statement):
+    if not statement.lstrip().upper().startswith(_EXPLAINABLE):
+        return None
+    if dialect_name == "sqlite":
+        return "EXPLAIN QUERY PLAN "
+    if dialect_name == "postgresql":
+        is_select = statement.lstrip().upper().startswith(("SELECT", "WITH"))
+        if SLOW_QUERY_EXPLAIN_ANALYZE and is_select:
+            return "EXPLAIN (ANALYZE, BUFFERS) "
+        return "EXPLAIN "
+    return None
+
+def _explain(conn, statement, parameters):
+    """Capture the plan on the same DBAPI connection, bypassing engine events"""
+    prefix = _explain_prefix(conn.dialect.name, statement)
+    if prefix is None:
+        return None
+
+    # A failed EXPLAIN must not abort the caller's Postgres transaction
+    use_savepoint = conn.dialect.name == "postgresql" and conn.in_transaction()
+    cursor = conn.connection.cursor()
+    try:
+        if use_savepoint:
+            cursor.execute("SAVEPOINT slow_query_explain")
+        cursor.execute(prefix + statement, parameters)
+        rows = cursor.fetchall()
+        if use_savepoint:
+            cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+    except Exception as e:
+        logger.warning(f"Could not capture query plan: {e}")
+        if use_savepoint:
+            cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+        return None
+    finally:
+        cursor.close()
+
+    if conn.dialect.name == "sqlite":
+        # (id, parent, notused, detail)
+        return [row[-1] for row in rows]
+    return [row[0] for row in rows]
+
+def _describe_parameters(parameters, executemany):
+    if executemany:
+        return f"<executemany: {len(parameters)} parameter sets>"
+    text = repr(parameters)
+    return text if len(text) <= 1000 else text[:1000] + "..."
+
+def install(engine, log=slow_query_log, threshold_ms=None):
+    """Attach the recorder to an engine"""
+    threshold = SLOW_QUERY_THRESHOLD_MS if threshold_ms is None else threshold_ms
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_start_time"].pop()
+        duration_ms = (time.perf_counter() - started) * 1000
+        if duration_ms < threshold:
+            return
+
+        plan = None
+        if SLOW_QUERY_EXPLAIN and not executemany:
+            plan = _explain(conn, statement, parameters)
+
+        key, normalized = fingerprint(statement)
+        route = current_route.get()
+        log.record({
+            "fingerprint": key,
+            "normalized": normalized,
+            "statement": statement,
+            "parameters": _describe_parameters(parameters, executemany),
+            "duration_ms": duration_ms,
+            "route": route,
+            "plan": plan,
+            "recorded_at": datetime.utcnow(),
+        })
+        logger.warning(f"Slow query ({duration_ms:.1f} ms) from {route or 'no route'}: {normalized[:200]}")
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        # after_cursor_execute does not fire for failed statements
+        timings = context.connection.info.get("query_start_time") if context.connection is not None else None
+        if timings:
+            timings.pop()
+
+    return log
@@ -1,8 +1,10 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 import os
 import logging
-from app.database.config import engine, Base
+from app.database.config import engine
+from app.database import slow_query, migrations
+from app.services.jobs import job_pool, JOB_WORKERS
 from app.routers import (
     organizations,
     vehicles,
@@ -14,7 +16,16 @@ from app.routers import (
     fuel,
     incidents,
     gps,
-    seed
+    seed,
+    diagnostics,
+    bulk,
+    imports,
+    jobs,
+    snapshots,
+    changes,
+    search,
+    dispatch,
+    speed_model
 )
 
 logging.basicConfig(level=logging.INFO)
@@ -25,22 +36,30 @@ app = FastAPI(
     description="A comprehensive fleet management and logistics tracking system",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    dependencies=[Depends(diagnostics.track_query_route)]
 )
 
+slow_query.install(engine)
+
 @app.on_event("startup")
 async def startup_event():
-    """Create database tables on startup"""
+    """Check the schema version, apply pending migrations and start the job workers"""
     try:
-        logger.info("Creating database tables...")
-        Base.metadata.create_all(bind=engine)
-        logger.info("Database tables created successfully!")
+        migrations.ensure_schema(engine)
     except Exception as e:
-        logger.error(f"Failed to create database tables: {e}")
+        logger.error(f"Failed to migrate database schema: {e}")
         logger.error("Make sure DATABASE_URL environment variable is set correctly")
         # Don't crash the app, just log the error
         # This allows the app to start even if DB isn't ready yet
 
+    if JOB_WORKERS > 0:
+        job_pool.start()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    job_pool.stop()
+
 # CORS configuration
 app.add_middleware(
     CORSMiddleware,
@@ -51,6 +70,7 @@ app.add_middleware(
 )
 
 # Include routers
+app.include_router(bulk.router)
 app.include_router(organizations.router)
 app.include_router(vehicles.router)
 app.include_router(drivers.router)
@@ -62,6 +82,14 @@ app.include_router(fuel.router)
 app.include_router(incidents.router)
 app.include_router(gps.router)
 app.include_router(seed.router)
+app.include_router(diagnostics.router)
+app.include_router(imports.router)
+app.include_router(jobs.router)
+app.include_router(snapshots.router)
+app.include_router(changes.router)
+app.include_router(search.router)
+app.include_router(dispatch.router)
+app.include_router(speed_model.router)
 
 @app.get("/")
 def root():
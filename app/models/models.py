@@ -1,9 +1,21 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Text, Numeric
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Text, Numeric, Index, JSON, DDL, event, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database.config import Base
+from app.database import fulltext
 
-class Organization(Base):
+# Trigram indexes (gin_trgm_ops) need the extension before any table is created
+event.listen(
+    Base.metadata, "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+class RowVersion:
+    """Row version for ETags: bumped by every UPDATE, ORM or Core, in the UPDATE statement itself"""
+    version = Column(Integer, nullable=False, default=1, server_default="1", onupdate=text("version + 1"))
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class Organization(RowVersion, Base):
     __tablename__ = "organizations"
 
     id = Column(Integer, primary_key=True, index=True)
@@ -17,8 +29,14 @@ class Organization(Base):
     drivers = relationship("Driver", back_populates="organization")
     locations = relationship("Location", back_populates="organization")
 
-class Vehicle(Base):
+class Vehicle(RowVersion, Base):
     __tablename__ = "vehicles"
+    # Indexes follow the filter combinations of GET /vehicles/
+    __table_args__ = (
+        Index("ix_vehicles_organization_id_status", "organization_id", "status"),
+        Index("ix_vehicles_status_vehicle_type", "status", "vehicle_type"),
+        Index("ix_vehicles_vehicle_type", "vehicle_type"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     organization_id = Column(Integer, ForeignKey("organizations.id"))
@@ -39,8 +57,12 @@ class Vehicle(Base):
     fuel_logs = relationship("FuelLog", back_populates="vehicle")
     gps_tracking = relationship("GPSTracking", back_populates="vehicle")
 
-class Driver(Base):
+class Driver(RowVersion, Base):
     __tablename__ = "drivers"
+    __table_args__ = (
+        Index("ix_drivers_organization_id_status", "organization_id", "status"),
+        Index("ix_drivers_status", "status"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     organization_id = Column(Integer, ForeignKey("organizations.id"))
@@ -59,8 +81,18 @@ class Driver(Base):
     routes = relationship("Route", back_populates="driver")
     incidents = relationship("Incident", back_populates="driver")
 
-class Location(Base):
+class Location(RowVersion, Base):
     __tablename__ = "locations"
+    __table_args__ = (
+        Index("ix_locations_organization_id_type", "organization_id", "type"),
+        Index("ix_locations_type", "type"),
+        Index("ix_locations_state_city", "state", "city"),
+        # City substring search; SQLite uses app.services.substring_index
+        Index(
+            "ix_locations_city_trgm", "city",
+            postgresql_using="gin", postgresql_ops={"city": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     organization_id = Column(Integer, ForeignKey("organizations.id"))
@@ -80,8 +112,14 @@ class Location(Base):
     routes_destination = relationship("Route", foreign_keys="Route.destination_location_id", back_populates="destination_location")
     deliveries = relationship("Delivery", back_populates="location")
 
-class Route(Base):
+class Route(RowVersion, Base):
     __tablename__ = "routes"
+    # Per-vehicle and per-driver schedules are read in departure order
+    __table_args__ = (
+        Index("ix_routes_vehicle_id_scheduled_departure", "vehicle_id", "scheduled_departure"),
+        Index("ix_routes_driver_id_scheduled_departure", "driver_id", "scheduled_departure"),
+        Index("ix_routes_status_scheduled_departure", "status", "scheduled_departure"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     vehicle_id = Column(Integer, ForeignKey("vehicles.id"))
@@ -93,7 +131,7 @@ class Route(Base):
     scheduled_arrival = Column(DateTime)
     actual_arrival = Column(DateTime, nullable=True)
     distance_km = Column(Float)
-    status = Column(String, default="scheduled")  # scheduled, in_progress, completed, cancelled
+    status = Column(String, default="scheduled")  # draft, scheduled, in_progress, completed, cancelled
     created_at = Column(DateTime, default=datetime.utcnow)
 
     vehicle = relationship("Vehicle", back_populates="routes")
@@ -102,8 +140,19 @@ class Route(Base):
     destination_location = relationship("Location", foreign_keys=[destination_location_id], back_populates="routes_destination")
     deliveries = relationship("Delivery", back_populates="route")
 
-class Delivery(Base):
+class Delivery(RowVersion, Base):
     __tablename__ = "deliveries"
+    __table_args__ = (
+        Index("ix_deliveries_route_id_status", "route_id", "status"),
+        Index("ix_deliveries_status_priority", "status", "priority"),
+        Index("ix_deliveries_priority", "priority"),
+        Index("ix_deliveries_location_id", "location_id"),
+        # Substring search on tracking numbers (ILIKE '%term%'); SQLite uses app.services.substring_index
+        Index(
+            "ix_deliveries_tracking_number_trgm", "tracking_number",
+            postgresql_using="gin", postgresql_ops={"tracking_number": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     route_id = Column(Integer, ForeignKey("routes.id"))
@@ -125,8 +174,12 @@ class Delivery(Base):
     route = relationship("Route", back_populates="deliveries")
     location = relationship("Location", back_populates="deliveries")
 
-class MaintenanceRecord(Base):
+class MaintenanceRecord(RowVersion, Base):
     __tablename__ = "maintenance_records"
+    __table_args__ = (
+        Index("ix_maintenance_records_vehicle_id_service_date", "vehicle_id", "service_date"),
+        Index("ix_maintenance_records_maintenance_type", "maintenance_type"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     vehicle_id = Column(Integer, ForeignKey("vehicles.id"))
@@ -142,8 +195,12 @@ class MaintenanceRecord(Base):
 
     vehicle = relationship("Vehicle", back_populates="maintenance_records")
 
-class FuelLog(Base):
+class FuelLog(RowVersion, Base):
     __tablename__ = "fuel_logs"
+    __table_args__ = (
+        Index("ix_fuel_logs_vehicle_id_date", "vehicle_id", "date"),
+        Index("ix_fuel_logs_fuel_type", "fuel_type"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     vehicle_id = Column(Integer, ForeignKey("vehicles.id"))
@@ -158,8 +215,14 @@ class FuelLog(Base):
 
     vehicle = relationship("Vehicle", back_populates="fuel_logs")
 
-class Incident(Base):
+class Incident(RowVersion, Base):
     __tablename__ = "incidents"
+    __table_args__ = (
+        Index("ix_incidents_driver_id_date", "driver_id", "date"),
+        Index("ix_incidents_resolved_severity", "resolved", "severity"),
+        Index("ix_incidents_severity", "severity"),
+        Index("ix_incidents_incident_type", "incident_type"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     driver_id = Column(Integer, ForeignKey("drivers.id"))
@@ -175,8 +238,13 @@ class Incident(Base):
 
     driver = relationship("Driver", back_populates="incidents")
 
-class GPSTracking(Base):
+class GPSTracking(RowVersion, Base):
     __tablename__ = "gps_tracking"
+    # Latest-fix lookups and the unfiltered feed both read newest first
+    __table_args__ = (
+        Index("ix_gps_tracking_vehicle_id_timestamp", "vehicle_id", "timestamp"),
+        Index("ix_gps_tracking_timestamp", "timestamp"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     vehicle_id = Column(Integer, ForeignKey("vehicles.id"))
@@ -188,3 +256,48 @@ class GPSTracking(Base):
     altitude = Column(Float, nullable=True)
 
     vehicle = relationship("Vehicle", back_populates="gps_tracking")
+
+class Job(Base):
+    __tablename__ = "jobs"
+    # Workers claim the highest-priority runnable job; status lists read newest first
+    __table_args__ = (
+        Index("ix_jobs_status_priority_run_after", "status", "priority", "run_after"),
+        Index("ix_jobs_kind_created_at", "kind", "created_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String)
+    params = Column(JSON, default=dict)
+    status = Column(String, default="queued")  # queued, running, succeeded, failed, cancelled
+    priority = Column(Integer, default=0)  # higher runs first
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=1)
+    run_after = Column(DateTime, default=datetime.utcnow)
+    cancel_requested = Column(Boolean, default=False)
+    locked_by = Column(String, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    progress = Column(JSON, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+class ChangeLog(Base):
+    __tablename__ = "change_log"
+    # Sync reads a type's changes after a cursor; pruning walks by age
+    __table_args__ = (
+        Index("ix_change_log_table_name_id", "table_name", "id"),
+        Index("ix_change_log_changed_at", "changed_at"),
+    )
+
+    id = Column(Integer, primary_key=True)  # the sync cursor; assigned in commit order
+    table_name = Column(String, nullable=False)
+    row_id = Column(Integer, nullable=True)  # NULL for a reset of the whole table
+    op = Column(String, nullable=False)  # insert, update, delete, reset
+    changed_at = Column(DateTime, default=datetime.utcnow)
+
+# Free text searched by GET /search
+fulltext.searchable(Delivery.__table__, "customer_name", "delivery_notes")
+fulltext.searchable(Incident.__table__, "description", "resolution_notes")
+fulltext.searchable(MaintenanceRecord.__table__, "description", "service_provider")
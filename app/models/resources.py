@@ -0,0 +1,37 @@
+from typing import NamedTuple, Optional, Type
+from pydantic import BaseModel
+from app.models import models, schemas
+
+class Resource(NamedTuple):
+    name: str
+    tag: str
+    model: type
+    schema: Type[BaseModel]
+    create_schema: Type[BaseModel]
+    update_schema: Optional[Type[BaseModel]]
+
+# URL prefix -> model and schemas, for endpoints that work across all resources
+RESOURCES = {
+    resource.name: resource for resource in [
+        Resource("organizations", "organizations", models.Organization, schemas.Organization,
+                 schemas.OrganizationCreate, schemas.OrganizationUpdate),
+        Resource("vehicles", "vehicles", models.Vehicle, schemas.Vehicle,
+                 schemas.VehicleCreate, schemas.VehicleUpdate),
+        Resource("drivers", "drivers", models.Driver, schemas.Driver,
+                 schemas.DriverCreate, schemas.DriverUpdate),
+        Resource("locations", "locations", models.Location, schemas.Location,
+                 schemas.LocationCreate, schemas.LocationUpdate),
+        Resource("routes", "routes", models.Route, schemas.Route,
+                 schemas.RouteCreate, schemas.RouteUpdate),
+        Resource("deliveries", "deliveries", models.Delivery, schemas.Delivery,
+                 schemas.DeliveryCreate, schemas.DeliveryUpdate),
+        Resource("maintenance", "maintenance", models.MaintenanceRecord, schemas.MaintenanceRecord,
+                 schemas.MaintenanceRecordCreate, schemas.MaintenanceRecordUpdate),
+        Resource("fuel", "fuel", models.FuelLog, schemas.FuelLog,
+                 schemas.FuelLogCreate, schemas.FuelLogUpdate),
+        Resource("incidents", "incidents", models.Incident, schemas.Incident,
+                 schemas.IncidentCreate, schemas.IncidentUpdate),
+        Resource("gps", "gps-tracking", models.GPSTracking, schemas.GPSTracking,
+                 schemas.GPSTrackingCreate, None),
+    ]
+}
@@ -1,6 +1,27 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field, field_validator, model_validator
 from datetime import datetime
-from typing import Optional
+from typing import ClassVar, FrozenSet, List, Optional
+import typing
+
+def _not_nullable(schema):
+    """Fields of a schema whose type does not admit None"""
+    return frozenset(
+        name for name, field in schema.model_fields.items()
+        if field.annotation is not type(None) and type(None) not in typing.get_args(field.annotation)
+    )
+
+class PartialUpdate(BaseModel):
+    """PATCH body: any field may be omitted, but only nullable ones may be null"""
+    not_nullable: ClassVar[FrozenSet[str]] = frozenset()
+
+    @model_validator(mode="before")
+    @classmethod
+    def _reject_nulls(cls, data):
+        if isinstance(data, dict):
+            nulls = sorted(name for name, value in data.items() if value is None and name in cls.not_nullable)
+            if nulls:
+                raise ValueError(f"{', '.join(nulls)} may be omitted but not null")
+        return data
 
 # Organization Schemas
 class OrganizationBase(BaseModel):
@@ -12,9 +33,19 @@ class OrganizationBase(BaseModel):
 class OrganizationCreate(OrganizationBase):
     pass
 
+class OrganizationUpdate(PartialUpdate):
+    not_nullable = _not_nullable(OrganizationCreate)
+
+    name: Optional[str] = None
+    email: Optional[str] = None
+    phone: Optional[str] = None
+    address: Optional[str] = None
+
 class Organization(OrganizationBase):
     id: int
     created_at: datetime
+    version: int
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -35,9 +66,25 @@ class VehicleBase(BaseModel):
 class VehicleCreate(VehicleBase):
     pass
 
+class VehicleUpdate(PartialUpdate):
+    not_nullable = _not_nullable(VehicleCreate)
+
+    organization_id: Optional[int] = None
+    vin: Optional[str] = None
+    make: Optional[str] = None
+    model: Optional[str] = None
+    year: Optional[int] = None
+    license_plate: Optional[str] = None
+    vehicle_type: Optional[str] = None
+    capacity_kg: Optional[float] = None
+    current_mileage: Optional[float] = None
+    status: Optional[str] = None
+
 class Vehicle(VehicleBase):
     id: int
     created_at: datetime
+    version: int
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -58,9 +105,25 @@ class DriverBase(BaseModel):
 class DriverCreate(DriverBase):
     pass
 
+class DriverUpdate(PartialUpdate):
+    not_nullable = _not_nullable(DriverCreate)
+
+    organization_id: Optional[int] = None
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    email: Optional[EmailStr] = None
+    phone: Optional[str] = None
+    license_number: Optional[str] = None
+    license_expiry: Optional[datetime] = None
+    hire_date: Optional[datetime] = None
+    status: Optional[str] = None
+    rating: Optional[float] = None
+
 class Driver(DriverBase):
     id: int
     created_at: datetime
+    version: int
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -81,13 +144,32 @@ class LocationBase(BaseModel):
 class LocationCreate(LocationBase):
     pass
 
+class LocationUpdate(PartialUpdate):
+    not_nullable = _not_nullable(LocationCreate)
+
+    organization_id: Optional[int] = None
+    name: Optional[str] = None
+    type: Optional[str] = None
+    address: Optional[str] = None
+    city: Optional[str] = None
+    state: Optional[str] = None
+    postal_code: Optional[str] = None
+    country: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+
 class Location(LocationBase):
     id: int
     created_at: datetime
+    version: int
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
+class NearbyLocation(Location):
+    distance_km: float
+
 # Route Schemas
 class RouteBase(BaseModel):
     vehicle_id: int
@@ -101,16 +183,44 @@ class RouteBase(BaseModel):
     actual_departure: Optional[datetime] = None
     actual_arrival: Optional[datetime] = None
 
+def _status_not_null(value):
+    if value is None:
+        raise ValueError("status may be omitted but not null")
+    return value
+
 class RouteCreate(RouteBase):
-    pass
+    _status = field_validator("status")(_status_not_null)
+
+class RouteUpdate(PartialUpdate):
+    not_nullable = _not_nullable(RouteCreate)
+
+    vehicle_id: Optional[int] = None
+    driver_id: Optional[int] = None
+    origin_location_id: Optional[int] = None
+    destination_location_id: Optional[int] = None
+    scheduled_departure: Optional[datetime] = None
+    scheduled_arrival: Optional[datetime] = None
+    distance_km: Optional[float] = None
+    status: Optional[str] = None
+    actual_departure: Optional[datetime] = None
+    actual_arrival: Optional[datetime] = None
+
+    _status = field_validator("status")(_status_not_null)
 
 class Route(RouteBase):
     id: int
     created_at: datetime
+    version: int
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
+class RouteEstimateRequest(BaseModel):
+    origin_location_id: int
+    destination_location_id: int
+    departure: Optional[datetime] = None
+
 # Delivery Schemas
 class DeliveryBase(BaseModel):
     route_id: int
@@ -131,13 +241,46 @@ class DeliveryBase(BaseModel):
 class DeliveryCreate(DeliveryBase):
     pass
 
+class DeliveryUpdate(PartialUpdate):
+    not_nullable = _not_nullable(DeliveryCreate)
+
+    route_id: Optional[int] = None
+    location_id: Optional[int] = None
+    tracking_number: Optional[str] = None
+    customer_name: Optional[str] = None
+    customer_email: Optional[str] = None
+    customer_phone: Optional[str] = None
+    package_count: Optional[int] = None
+    weight_kg: Optional[float] = None
+    scheduled_delivery: Optional[datetime] = None
+    status: Optional[str] = None
+    priority: Optional[str] = None
+    signature_required: Optional[bool] = None
+    actual_delivery: Optional[datetime] = None
+    delivery_notes: Optional[str] = None
+
 class Delivery(DeliveryBase):
     id: int
     created_at: datetime
+    version: int
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
+class DeliveryEta(BaseModel):
+    vehicle_id: int
+    route_id: int
+    estimated_arrival: datetime
+    remaining_km: float
+    stops_before: int
+    fix_id: int
+    fix_timestamp: datetime
+    computed_at: datetime
+
+class TrackedDelivery(Delivery):
+    eta: Optional[DeliveryEta] = None
+
 # Maintenance Record Schemas
 class MaintenanceRecordBase(BaseModel):
     vehicle_id: int
@@ -153,9 +296,24 @@ class MaintenanceRecordBase(BaseModel):
 class MaintenanceRecordCreate(MaintenanceRecordBase):
     pass
 
+class MaintenanceRecordUpdate(PartialUpdate):
+    not_nullable = _not_nullable(MaintenanceRecordCreate)
+
+    vehicle_id: Optional[int] = None
+    maintenance_type: Optional[str] = None
+    description: Optional[str] = None
+    cost: Optional[float] = None
+    mileage_at_service: Optional[float] = None
+    service_date: Optional[datetime] = None
+    service_provider: Optional[str] = None
+    downtime_hours: Optional[float] = None
+    next_service_date: Optional[datetime] = None
+
 class MaintenanceRecord(MaintenanceRecordBase):
     id: int
     created_at: datetime
+    version: int
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -174,9 +332,23 @@ class FuelLogBase(BaseModel):
 class FuelLogCreate(FuelLogBase):
     pass
 
+class FuelLogUpdate(PartialUpdate):
+    not_nullable = _not_nullable(FuelLogCreate)
+
+    vehicle_id: Optional[int] = None
+    date: Optional[datetime] = None
+    location: Optional[str] = None
+    liters: Optional[float] = None
+    cost_per_liter: Optional[float] = None
+    total_cost: Optional[float] = None
+    mileage: Optional[float] = None
+    fuel_type: Optional[str] = None
+
 class FuelLog(FuelLogBase):
     id: int
     created_at: datetime
+    version: int
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -196,9 +368,24 @@ class IncidentBase(BaseModel):
 class IncidentCreate(IncidentBase):
     pass
 
+class IncidentUpdate(PartialUpdate):
+    not_nullable = _not_nullable(IncidentCreate)
+
+    driver_id: Optional[int] = None
+    incident_type: Optional[str] = None
+    severity: Optional[str] = None
+    description: Optional[str] = None
+    date: Optional[datetime] = None
+    location: Optional[str] = None
+    resolved: Optional[bool] = None
+    cost: Optional[float] = None
+    resolution_notes: Optional[str] = None
+
 class Incident(IncidentBase):
     id: int
     created_at: datetime
+    version: int
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -218,6 +405,33 @@ class GPSTrackingCreate(GPSTrackingBase):
 
 class GPSTracking(GPSTrackingBase):
     id: int
+    version: int
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
+
+# Dispatch Schemas
+class DispatchPlanRequest(BaseModel):
+    organization_id: int
+    departure: Optional[datetime] = None
+    shift_hours: Optional[float] = Field(None, gt=0, le=24)
+    delivery_ids: Optional[List[int]] = None
+    dry_run: bool = False
+
+# Bulk Operation Schemas
+class BulkDelete(BaseModel):
+    ids: List[int]
+
+class BulkRowResult(BaseModel):
+    index: int
+    status: str  # created, updated, deleted, invalid, not_found, failed, rolled_back
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class BulkResult(BaseModel):
+    mode: str
+    requested: int
+    succeeded: int
+    failed: int
+    results: List[BulkRowResult]
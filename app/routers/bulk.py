@@ -0,0 +1,87 @@
+from fastapi import APIRouter, Depends, HTTPException, Body
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Literal
+from app.models import models, schemas
+from app.models.resources import RESOURCES
+from app.database.config import get_db
+from app.database import bulk
+from app.services import schedule_index
+
+# Included ahead of the per-resource routers so /{resource}/bulk is not taken for /{resource}/{id}
+router = APIRouter()
+
+Mode = Literal["atomic", "best_effort"]
+
+# Checks that need the database, run on validated rows: (db, rows, partial) -> (rows to write, error results)
+ROW_CHECKS = {models.Route: schedule_index.check_rows}
+
+def _check(db, resource, mode, requested, valid, partial=False):
+    check = ROW_CHECKS.get(resource.model)
+    if check is None:
+        return valid, []
+    valid, errors = check(db, valid, partial)
+    _reject_invalid(mode, requested, [error for error in errors if error["status"] == "invalid"])
+    return valid, errors
+
+def _respond(db, mode, requested, results):
+    result = bulk.finish(db, mode, requested, results)
+    if mode == bulk.ATOMIC and result["failed"]:
+        raise HTTPException(status_code=409, detail=result)
+    return result
+
+def _reject_invalid(mode, requested, errors):
+    if mode == bulk.ATOMIC and errors:
+        raise HTTPException(status_code=422, detail={
+            "mode": mode,
+            "requested": requested,
+            "succeeded": 0,
+            "failed": len(errors),
+            "results": sorted(errors, key=lambda r: r["index"]),
+        })
+
+def _bulk_create(resource):
+    def bulk_create(
+        rows: List[Dict[str, Any]] = Body(..., description=f"Array of {resource.create_schema.__name__} objects"),
+        mode: Mode = "atomic",
+        db: Session = Depends(get_db)
+    ):
+        valid, errors = bulk.validate_rows(resource.create_schema, rows)
+        _reject_invalid(mode, len(rows), errors)
+        valid, rejected = _check(db, resource, mode, len(rows), valid)
+        results = errors + rejected + bulk.insert_rows(db, resource.model, valid)
+        return _respond(db, mode, len(rows), results)
+    return bulk_create
+
+def _bulk_update(resource):
+    def bulk_update(
+        rows: List[Dict[str, Any]] = Body(..., description=f"Array of {resource.update_schema.__name__} objects, each with its id"),
+        mode: Mode = "atomic",
+        db: Session = Depends(get_db)
+    ):
+        valid, errors = bulk.validate_rows(resource.update_schema, rows, partial=True)
+        _reject_invalid(mode, len(rows), errors)
+        valid, rejected = _check(db, resource, mode, len(rows), valid, partial=True)
+        results = errors + rejected + bulk.update_rows(db, resource.model, valid)
+        return _respond(db, mode, len(rows), results)
+    return bulk_update
+
+def _bulk_delete(resource):
+    def bulk_delete(
+        request: schemas.BulkDelete,
+        mode: Mode = "atomic",
+        db: Session = Depends(get_db)
+    ):
+        results = bulk.delete_rows(db, resource.model, request.ids)
+        return _respond(db, mode, len(request.ids), results)
+    return bulk_delete
+
+for resource in RESOURCES.values():
+    path = f"/{resource.name}/bulk"
+    options = dict(tags=[resource.tag], response_model=schemas.BulkResult, response_model_exclude_none=True)
+    router.add_api_route(path, _bulk_create(resource), methods=["POST"],
+                         name=f"bulk_create_{resource.name}", **options)
+    if resource.update_schema is not None:
+        router.add_api_route(path, _bulk_update(resource), methods=["PATCH"],
+                             name=f"bulk_update_{resource.name}", **options)
+    router.add_api_route(path, _bulk_delete(resource), methods=["DELETE"],
+                         name=f"bulk_delete_{resource.name}", **options)
@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+from app.database.config import get_db
+from app.services import changelog
+
+router = APIRouter(prefix="/changes", tags=["changes"])
+
+@router.get("/")
+def get_changes(
+    since: Optional[int] = None,
+    types: Optional[str] = None,
+    limit: int = Query(changelog.CHANGES_PAGE_SIZE, ge=1, le=5000),
+    db: Session = Depends(get_db)
+):
+    """Inserts, updates and deletes in commit order after the cursor `since`.
+
+    Call without `since` to get the current cursor, then pass each response's
+    next_cursor back until has_more is false. `types` is a comma-separated
+    list of tables (e.g. deliveries,routes). A "reset" change means the whole
+    type was replaced and must be re-pulled; 410 means the cursor is older
+    than the retention window and the client must resync from scratch.
+    """
+    table_names = [name.strip() for name in types.split(",") if name.strip()] if types else None
+    unknown = sorted(set(table_names or []) - set(changelog.TRACKED))
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown types {', '.join(unknown)}; expected any of {', '.join(sorted(changelog.TRACKED))}"
+        )
+    try:
+        return changelog.read_changes(db, since, table_names, limit)
+    except changelog.CursorExpired as e:
+        raise HTTPException(status_code=410, detail=str(e))
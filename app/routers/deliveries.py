@@ -4,10 +4,16 @@ from typing import List, Optional
 from datetime import datetime
 from app.models import models, schemas
 from app.database.config import get_db
+from app.database import crud
+from app.cache.responses import cached_response
+from app.cache.conditional import conditional
+from app.services import eta
+from app.services.substring_index import filter_tracking_number
 
 router = APIRouter(prefix="/deliveries", tags=["deliveries"])
 
 @router.get("/", response_model=List[schemas.Delivery])
+@cached_response(List[schemas.Delivery], tables=["deliveries"])
 def get_deliveries(
     skip: int = 0,
     limit: int = 100,
@@ -26,44 +32,44 @@ def get_deliveries(
     if route_id:
         query = query.filter(models.Delivery.route_id == route_id)
     if tracking_number:
-        query = query.filter(models.Delivery.tracking_number.ilike(f"%{tracking_number}%"))
+        query = filter_tracking_number(db, query, tracking_number)
 
-    deliveries = query.offset(skip).limit(limit).all()
-    return deliveries
+    return query.offset(skip).limit(limit)
 
 @router.get("/{delivery_id}", response_model=schemas.Delivery)
+@conditional(models.Delivery, "delivery_id")
 def get_delivery(delivery_id: int, db: Session = Depends(get_db)):
     delivery = db.query(models.Delivery).filter(models.Delivery.id == delivery_id).first()
     if not delivery:
         raise HTTPException(status_code=404, detail="Delivery not found")
     return delivery
 
-@router.get("/tracking/{tracking_number}", response_model=schemas.Delivery)
+@router.get("/tracking/{tracking_number}", response_model=schemas.TrackedDelivery)
+@conditional(models.Delivery, "tracking_number", column=models.Delivery.tracking_number, variant=eta.variant)
 def get_delivery_by_tracking(tracking_number: str, db: Session = Depends(get_db)):
+    """The delivery with its ETA from the carrying vehicle's latest GPS fix, while it is on the way"""
     delivery = db.query(models.Delivery).filter(models.Delivery.tracking_number == tracking_number).first()
     if not delivery:
         raise HTTPException(status_code=404, detail="Delivery not found")
-    return delivery
+    return {**schemas.Delivery.model_validate(delivery).model_dump(), "eta": eta.get(delivery.id)}
 
 @router.post("/", response_model=schemas.Delivery)
 def create_delivery(delivery: schemas.DeliveryCreate, db: Session = Depends(get_db)):
-    db_delivery = models.Delivery(**delivery.dict())
-    db.add(db_delivery)
-    db.commit()
-    db.refresh(db_delivery)
+    db_delivery = crud.create_returning(db, models.Delivery, delivery.dict())
     return db_delivery
 
 @router.put("/{delivery_id}", response_model=schemas.Delivery)
 def update_delivery(delivery_id: int, delivery: schemas.DeliveryCreate, db: Session = Depends(get_db)):
-    db_delivery = db.query(models.Delivery).filter(models.Delivery.id == delivery_id).first()
+    db_delivery = crud.update_returning(db, models.Delivery, delivery_id, delivery.dict())
     if not db_delivery:
         raise HTTPException(status_code=404, detail="Delivery not found")
+    return db_delivery
 
-    for key, value in delivery.dict().items():
-        setattr(db_delivery, key, value)
-
-    db.commit()
-    db.refresh(db_delivery)
+@router.patch("/{delivery_id}", response_model=schemas.Delivery)
+def patch_delivery(delivery_id: int, delivery: schemas.DeliveryUpdate, db: Session = Depends(get_db)):
+    db_delivery = crud.update_returning(db, models.Delivery, delivery_id, delivery.dict(exclude_unset=True))
+    if not db_delivery:
+        raise HTTPException(status_code=404, detail="Delivery not found")
     return db_delivery
 
 @router.delete("/{delivery_id}")
@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Request
+from app.database.slow_query import slow_query_log, current_route, SLOW_QUERY_THRESHOLD_MS
+from app.cache import entity_cache
+from app.cache.responses import response_cache, flights
+from app.services import eta, route_monitor
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+async def track_query_route(request: Request):
+    """Label statements issued while handling this request with the matched route"""
+    route = request.scope.get("route")
+    path = route.path if route is not None else request.url.path
+    current_route.set(f"{request.method} {path}")
+
+@router.get("/slow-queries")
+def get_slow_queries(limit: int = 50):
+    """Slow statements grouped by fingerprint, most total time first"""
+    groups = slow_query_log.summary()
+    return {
+        "threshold_ms": SLOW_QUERY_THRESHOLD_MS,
+        "recorded": len(slow_query_log.entries()),
+        "groups": groups[:limit]
+    }
+
+@router.delete("/slow-queries")
+def clear_slow_queries():
+    slow_query_log.clear()
+    return {"message": "Slow query log cleared"}
+
+@router.get("/cache")
+def get_cache_stats():
+    """Hit ratio, evictions and size of the entity, list response, ETA and route progress caches, and request coalescing counts"""
+    return {
+        "entities": entity_cache.stats(),
+        "responses": response_cache.stats(),
+        "single_flight": flights.stats(),
+        "etas": eta.stats(),
+        "route_progress": route_monitor.stats(),
+    }
+
+@router.delete("/cache")
+def clear_cache():
+    entity_cache.clear()
+    response_cache.clear()
+    return {"message": "Cache cleared"}
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.models import models, schemas
+from app.database.config import get_db
+from app.services import dispatch
+
+router = APIRouter(prefix="/dispatch", tags=["dispatch"])
+
+@router.post("/plan")
+def plan_dispatch(request: schemas.DispatchPlanRequest, db: Session = Depends(get_db)):
+    """Assign an organization's pending, unrouted deliveries to its free vehicles and drivers.
+
+    Deliveries are clustered by location and packed within each vehicle's
+    capacity_kg. Active vehicles and drivers count as free when no draft,
+    scheduled or in-progress route of theirs overlaps the shift starting at
+    `departure`. Each loaded vehicle becomes a draft route from its nearest
+    depot and back, with its stops listed in visiting order. With dry_run
+    nothing is written.
+    """
+    if db.get(models.Organization, request.organization_id) is None:
+        raise HTTPException(status_code=404, detail="Organization not found")
+    return dispatch.plan(
+        db,
+        request.organization_id,
+        departure=request.departure,
+        shift_hours=request.shift_hours or dispatch.DISPATCH_SHIFT_HOURS,
+        delivery_ids=request.delivery_ids,
+        dry_run=request.dry_run,
+    )
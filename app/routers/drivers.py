@@ -1,12 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from datetime import datetime
 from app.models import models, schemas
 from app.database.config import get_db
+from app.database import crud
+from app.cache import entity_cache
+from app.cache.responses import cached_response
+from app.cache.conditional import conditional
+from app.services import schedule_index
 
 router = APIRouter(prefix="/drivers", tags=["drivers"])
 
 @router.get("/", response_model=List[schemas.Driver])
+@cached_response(List[schemas.Driver], tables=["drivers"])
 def get_drivers(
     skip: int = 0,
     limit: int = 100,
@@ -21,35 +28,52 @@ def get_drivers(
     if organization_id:
         query = query.filter(models.Driver.organization_id == organization_id)
 
-    drivers = query.offset(skip).limit(limit).all()
-    return drivers
+    return query.offset(skip).limit(limit)
+
+@router.get("/available", response_model=List[schemas.Driver])
+def get_available_drivers(
+    start: datetime,
+    end: datetime,
+    organization_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db)
+):
+    """Active drivers with no draft, scheduled or in-progress route overlapping [start, end)"""
+    if schedule_index.to_us(end) <= schedule_index.to_us(start):
+        raise HTTPException(status_code=422, detail="end must be after start")
+    busy = schedule_index.bookings.busy(db, "driver", start, end)
+    query = db.query(models.Driver.id).filter(models.Driver.status == "active")
+    if organization_id:
+        query = query.filter(models.Driver.organization_id == organization_id)
+    ids = [row_id for row_id, in query.order_by(models.Driver.id) if row_id not in busy][skip:skip + limit]
+    return db.query(models.Driver).filter(models.Driver.id.in_(ids)).order_by(models.Driver.id).all()
 
 @router.get("/{driver_id}", response_model=schemas.Driver)
+@conditional(models.Driver, "driver_id")
 def get_driver(driver_id: int, db: Session = Depends(get_db)):
-    driver = db.query(models.Driver).filter(models.Driver.id == driver_id).first()
+    driver = entity_cache.get(db, models.Driver, schemas.Driver, driver_id)
     if not driver:
         raise HTTPException(status_code=404, detail="Driver not found")
     return driver
 
 @router.post("/", response_model=schemas.Driver)
 def create_driver(driver: schemas.DriverCreate, db: Session = Depends(get_db)):
-    db_driver = models.Driver(**driver.dict())
-    db.add(db_driver)
-    db.commit()
-    db.refresh(db_driver)
+    db_driver = crud.create_returning(db, models.Driver, driver.dict())
     return db_driver
 
 @router.put("/{driver_id}", response_model=schemas.Driver)
 def update_driver(driver_id: int, driver: schemas.DriverCreate, db: Session = Depends(get_db)):
-    db_driver = db.query(models.Driver).filter(models.Driver.id == driver_id).first()
+    db_driver = crud.update_returning(db, models.Driver, driver_id, driver.dict())
     if not db_driver:
         raise HTTPException(status_code=404, detail="Driver not found")
+    return db_driver
 
-    for key, value in driver.dict().items():
-        setattr(db_driver, key, value)
-
-    db.commit()
-    db.refresh(db_driver)
+@router.patch("/{driver_id}", response_model=schemas.Driver)
+def patch_driver(driver_id: int, driver: schemas.DriverUpdate, db: Session = Depends(get_db)):
+    db_driver = crud.update_returning(db, models.Driver, driver_id, driver.dict(exclude_unset=True))
+    if not db_driver:
+        raise HTTPException(status_code=404, detail="Driver not found")
     return db_driver
 
 @router.delete("/{driver_id}")
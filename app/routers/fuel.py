@@ -3,10 +3,14 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.models import models, schemas
 from app.database.config import get_db
+from app.database import crud
+from app.cache.responses import cached_response
+from app.cache.conditional import conditional
 
 router = APIRouter(prefix="/fuel", tags=["fuel"])
 
 @router.get("/", response_model=List[schemas.FuelLog])
+@cached_response(List[schemas.FuelLog], tables=["fuel_logs"])
 def get_fuel_logs(
     skip: int = 0,
     limit: int = 100,
@@ -21,10 +25,10 @@ def get_fuel_logs(
     if fuel_type:
         query = query.filter(models.FuelLog.fuel_type == fuel_type)
 
-    logs = query.offset(skip).limit(limit).all()
-    return logs
+    return query.offset(skip).limit(limit)
 
 @router.get("/{log_id}", response_model=schemas.FuelLog)
+@conditional(models.FuelLog, "log_id")
 def get_fuel_log(log_id: int, db: Session = Depends(get_db)):
     log = db.query(models.FuelLog).filter(models.FuelLog.id == log_id).first()
     if not log:
@@ -33,23 +37,21 @@ def get_fuel_log(log_id: int, db: Session = Depends(get_db)):
 
 @router.post("/", response_model=schemas.FuelLog)
 def create_fuel_log(log: schemas.FuelLogCreate, db: Session = Depends(get_db)):
-    db_log = models.FuelLog(**log.dict())
-    db.add(db_log)
-    db.commit()
-    db.refresh(db_log)
+    db_log = crud.create_returning(db, models.FuelLog, log.dict())
     return db_log
 
 @router.put("/{log_id}", response_model=schemas.FuelLog)
 def update_fuel_log(log_id: int, log: schemas.FuelLogCreate, db: Session = Depends(get_db)):
-    db_log = db.query(models.FuelLog).filter(models.FuelLog.id == log_id).first()
+    db_log = crud.update_returning(db, models.FuelLog, log_id, log.dict())
     if not db_log:
         raise HTTPException(status_code=404, detail="Fuel log not found")
+    return db_log
 
-    for key, value in log.dict().items():
-        setattr(db_log, key, value)
-
-    db.commit()
-    db.refresh(db_log)
+@router.patch("/{log_id}", response_model=schemas.FuelLog)
+def patch_fuel_log(log_id: int, log: schemas.FuelLogUpdate, db: Session = Depends(get_db)):
+    db_log = crud.update_returning(db, models.FuelLog, log_id, log.dict(exclude_unset=True))
+    if not db_log:
+        raise HTTPException(status_code=404, detail="Fuel log not found")
     return db_log
 
 @router.delete("/{log_id}")
@@ -4,10 +4,14 @@ from typing import List, Optional
 from datetime import datetime
 from app.models import models, schemas
 from app.database.config import get_db
+from app.database import crud
+from app.cache.responses import single_flight
+from app.cache.conditional import conditional
 
 router = APIRouter(prefix="/gps", tags=["gps-tracking"])
 
 @router.get("/", response_model=List[schemas.GPSTracking])
+@single_flight(List[schemas.GPSTracking], tables=["gps_tracking"])
 def get_gps_tracking(
     skip: int = 0,
     limit: int = 100,
@@ -19,10 +23,10 @@ def get_gps_tracking(
     if vehicle_id:
         query = query.filter(models.GPSTracking.vehicle_id == vehicle_id)
 
-    tracking = query.order_by(models.GPSTracking.timestamp.desc()).offset(skip).limit(limit).all()
-    return tracking
+    return query.order_by(models.GPSTracking.timestamp.desc()).offset(skip).limit(limit)
 
 @router.get("/vehicle/{vehicle_id}/latest", response_model=schemas.GPSTracking)
+@single_flight(schemas.GPSTracking, tables=["gps_tracking"])
 def get_latest_gps_for_vehicle(vehicle_id: int, db: Session = Depends(get_db)):
     tracking = db.query(models.GPSTracking).filter(
         models.GPSTracking.vehicle_id == vehicle_id
@@ -33,6 +37,7 @@ def get_latest_gps_for_vehicle(vehicle_id: int, db: Session = Depends(get_db)):
     return tracking
 
 @router.get("/{tracking_id}", response_model=schemas.GPSTracking)
+@conditional(models.GPSTracking, "tracking_id")
 def get_gps_tracking_by_id(tracking_id: int, db: Session = Depends(get_db)):
     tracking = db.query(models.GPSTracking).filter(models.GPSTracking.id == tracking_id).first()
     if not tracking:
@@ -41,10 +46,7 @@ def get_gps_tracking_by_id(tracking_id: int, db: Session = Depends(get_db)):
 
 @router.post("/", response_model=schemas.GPSTracking)
 def create_gps_tracking(tracking: schemas.GPSTrackingCreate, db: Session = Depends(get_db)):
-    db_tracking = models.GPSTracking(**tracking.dict())
-    db.add(db_tracking)
-    db.commit()
-    db.refresh(db_tracking)
+    db_tracking = crud.create_returning(db, models.GPSTracking, tracking.dict())
     return db_tracking
 
 @router.delete("/{tracking_id}")
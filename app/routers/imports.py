@@ -0,0 +1,58 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+import os
+import re
+from app.database.config import get_db
+from app.models.resources import RESOURCES
+from app.services import csv_import, jobs
+
+router = APIRouter(prefix="/admin/import", tags=["admin"])
+
+@router.post("/{resource}")
+async def import_csv(
+    resource: str,
+    request: Request,
+    response: Response,
+    chunk_size: int = csv_import.IMPORT_CHUNK_SIZE,
+    db: Session = Depends(get_db)
+):
+    """Import a CSV upload (raw text/csv request body) of create rows for a resource.
+
+    Uploads up to IMPORT_INLINE_BYTES are imported before responding; larger ones
+    are queued as a csv_import job and answered with 202.
+    """
+    if resource not in RESOURCES:
+        raise HTTPException(status_code=404, detail=f"Unknown resource '{resource}'")
+
+    # Spool the body to disk as it arrives so the upload never sits in memory
+    import_id = csv_import.new_import_id()
+    path = csv_import.upload_path(import_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    queued = False
+    try:
+        with open(path, "wb") as spool:
+            async for chunk in request.stream():
+                spool.write(chunk)
+        if os.path.getsize(path) <= csv_import.IMPORT_INLINE_BYTES:
+            return await run_in_threadpool(csv_import.run_import, resource, path, max(1, chunk_size), import_id)
+        job = await run_in_threadpool(jobs.enqueue, db, "csv_import", {
+            "resource": resource, "path": path, "chunk_size": max(1, chunk_size), "import_id": import_id
+        })
+        queued = True
+        response.status_code = 202
+        return {**jobs.accepted(job), "import_id": import_id}
+    finally:
+        # A queued upload is removed by its job
+        if not queued:
+            os.remove(path)
+
+@router.get("/reports/{import_id}")
+def get_import_report(import_id: str):
+    if not re.fullmatch(r"[0-9a-f]{32}", import_id):
+        raise HTTPException(status_code=404, detail="Import report not found")
+    path = csv_import.report_path(import_id)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Import report not found")
+    return FileResponse(path, media_type="text/csv", filename=f"import-errors-{import_id}.csv")
@@ -3,10 +3,14 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.models import models, schemas
 from app.database.config import get_db
+from app.database import crud
+from app.cache.responses import cached_response
+from app.cache.conditional import conditional
 
 router = APIRouter(prefix="/incidents", tags=["incidents"])
 
 @router.get("/", response_model=List[schemas.Incident])
+@cached_response(List[schemas.Incident], tables=["incidents"])
 def get_incidents(
     skip: int = 0,
     limit: int = 100,
@@ -27,10 +31,10 @@ def get_incidents(
     if resolved is not None:
         query = query.filter(models.Incident.resolved == resolved)
 
-    incidents = query.offset(skip).limit(limit).all()
-    return incidents
+    return query.offset(skip).limit(limit)
 
 @router.get("/{incident_id}", response_model=schemas.Incident)
+@conditional(models.Incident, "incident_id")
 def get_incident(incident_id: int, db: Session = Depends(get_db)):
     incident = db.query(models.Incident).filter(models.Incident.id == incident_id).first()
     if not incident:
@@ -39,23 +43,21 @@ def get_incident(incident_id: int, db: Session = Depends(get_db)):
 
 @router.post("/", response_model=schemas.Incident)
 def create_incident(incident: schemas.IncidentCreate, db: Session = Depends(get_db)):
-    db_incident = models.Incident(**incident.dict())
-    db.add(db_incident)
-    db.commit()
-    db.refresh(db_incident)
+    db_incident = crud.create_returning(db, models.Incident, incident.dict())
     return db_incident
 
 @router.put("/{incident_id}", response_model=schemas.Incident)
 def update_incident(incident_id: int, incident: schemas.IncidentCreate, db: Session = Depends(get_db)):
-    db_incident = db.query(models.Incident).filter(models.Incident.id == incident_id).first()
+    db_incident = crud.update_returning(db, models.Incident, incident_id, incident.dict())
     if not db_incident:
         raise HTTPException(status_code=404, detail="Incident not found")
+    return db_incident
 
-    for key, value in incident.dict().items():
-        setattr(db_incident, key, value)
-
-    db.commit()
-    db.refresh(db_incident)
+@router.patch("/{incident_id}", response_model=schemas.Incident)
+def patch_incident(incident_id: int, incident: schemas.IncidentUpdate, db: Session = Depends(get_db)):
+    db_incident = crud.update_returning(db, models.Incident, incident_id, incident.dict(exclude_unset=True))
+    if not db_incident:
+        raise HTTPException(status_code=404, detail="Incident not found")
     return db_incident
 
 @router.delete("/{incident_id}")
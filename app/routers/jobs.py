@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import Optional
+from app.database.config import get_db
+from app.models.models import Job
+from app.services import jobs
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+@router.get("/")
+def list_jobs(
+    status: Optional[str] = None,
+    kind: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db)
+):
+    """Jobs newest first, optionally filtered by status and kind"""
+    query = db.query(Job)
+    if status:
+        query = query.filter(Job.status == status)
+    if kind:
+        query = query.filter(Job.kind == kind)
+    return [jobs.to_dict(job) for job in query.order_by(Job.id.desc()).offset(skip).limit(limit).all()]
+
+@router.get("/{job_id}")
+def get_job(job_id: int, db: Session = Depends(get_db)):
+    job = db.get(Job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return jobs.to_dict(job)
+
+@router.post("/{job_id}/cancel")
+def cancel_job(job_id: int, db: Session = Depends(get_db)):
+    """Cancel a queued job, or ask a running one to stop"""
+    job = jobs.cancel(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status in (jobs.SUCCEEDED, jobs.FAILED):
+        raise HTTPException(status_code=409, detail=f"Job already {job.status}")
+    return jobs.to_dict(job)
@@ -1,12 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.models import models, schemas
 from app.database.config import get_db
+from app.database import crud
+from app.cache import entity_cache
+from app.cache.responses import cached_response
+from app.cache.conditional import conditional
+from app.services import geo_index, distance_matrix
+from app.services.substring_index import cities, filter_contains
 
 router = APIRouter(prefix="/locations", tags=["locations"])
 
+# A 500 x 500 matrix is about 2 MB of JSON per quantity
+MAX_MATRIX_IDS = 500
+
 @router.get("/", response_model=List[schemas.Location])
+@cached_response(List[schemas.Location], tables=["locations"])
 def get_locations(
     skip: int = 0,
     limit: int = 100,
@@ -21,41 +31,112 @@ def get_locations(
     if type:
         query = query.filter(models.Location.type == type)
     if city:
-        query = query.filter(models.Location.city.ilike(f"%{city}%"))
+        query = filter_contains(db, query, cities, city)
     if state:
         query = query.filter(models.Location.state == state)
     if organization_id:
         query = query.filter(models.Location.organization_id == organization_id)
 
-    locations = query.offset(skip).limit(limit).all()
-    return locations
+    return query.offset(skip).limit(limit)
+
+# Registered before /{location_id}, which would otherwise capture these paths
+
+@router.get("/nearest", response_model=List[schemas.NearbyLocation])
+def get_nearest_locations(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    k: int = Query(10, ge=1, le=1000),
+    max_km: Optional[float] = Query(None, gt=0),
+    db: Session = Depends(get_db)
+):
+    """The k locations nearest to a point by great-circle distance, nearest first.
+
+    With max_km this also reverse-geocodes a GPS fix: k=1 returns the known
+    site it is at, or nothing.
+    """
+    hits = geo_index.locations.nearest(db, lat, lon, k, max_km)
+    rows = {
+        row.id: row
+        for row in db.query(models.Location).filter(models.Location.id.in_([location_id for location_id, _ in hits]))
+    }
+    return [
+        schemas.NearbyLocation(**schemas.Location.model_validate(rows[location_id]).model_dump(), distance_km=round(km, 3))
+        for location_id, km in hits if location_id in rows
+    ]
+
+@router.get("/within", response_model=List[schemas.Location])
+def get_locations_within(
+    bbox: str,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db)
+):
+    """Locations inside bbox=min_lon,min_lat,max_lon,max_lat (GeoJSON order), by id.
+
+    A min_lon greater than max_lon selects a box across the antimeridian.
+    """
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(value) for value in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be min_lon,min_lat,max_lon,max_lat")
+    if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lon <= 180 and -180 <= max_lon <= 180):
+        raise HTTPException(
+            status_code=400,
+            detail="bbox must be within -180..180 longitude and -90..90 latitude, with min_lat <= max_lat"
+        )
+    ids = geo_index.locations.within(db, min_lat, min_lon, max_lat, max_lon)[skip:skip + limit]
+    return db.query(models.Location).filter(models.Location.id.in_(ids)).order_by(models.Location.id).all()
+
+@router.get("/distance-matrix")
+def get_distance_matrix(ids: str, road: bool = True, db: Session = Depends(get_db)):
+    """Distances (km) and travel times (minutes) between every pair of the comma-separated location ids.
+
+    Row i, column j is from ids[i] to ids[j]. Distances are great-circle
+    times the road factor unless road=false; times always use road distance.
+    """
+    try:
+        location_ids = [int(value) for value in ids.split(",") if value.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be a comma-separated list of location ids")
+    if not location_ids or len(location_ids) > MAX_MATRIX_IDS:
+        raise HTTPException(status_code=400, detail=f"Pass between 1 and {MAX_MATRIX_IDS} location ids")
+    try:
+        km = distance_matrix.store.lookup(db, location_ids).astype(float)
+    except KeyError as e:
+        raise HTTPException(
+            status_code=404, detail=f"Locations not found or without coordinates: {', '.join(map(str, e.args[0]))}"
+        )
+    return {
+        "ids": location_ids,
+        "distance_km": (distance_matrix.road_km(km) if road else km).round(3).tolist(),
+        "duration_minutes": distance_matrix.travel_minutes(km).round(1).tolist(),
+    }
 
 @router.get("/{location_id}", response_model=schemas.Location)
+@conditional(models.Location, "location_id")
 def get_location(location_id: int, db: Session = Depends(get_db)):
-    location = db.query(models.Location).filter(models.Location.id == location_id).first()
+    location = entity_cache.get(db, models.Location, schemas.Location, location_id)
     if not location:
         raise HTTPException(status_code=404, detail="Location not found")
     return location
 
 @router.post("/", response_model=schemas.Location)
 def create_location(location: schemas.LocationCreate, db: Session = Depends(get_db)):
-    db_location = models.Location(**location.dict())
-    db.add(db_location)
-    db.commit()
-    db.refresh(db_location)
+    db_location = crud.create_returning(db, models.Location, location.dict())
     return db_location
 
 @router.put("/{location_id}", response_model=schemas.Location)
 def update_location(location_id: int, location: schemas.LocationCreate, db: Session = Depends(get_db)):
-    db_location = db.query(models.Location).filter(models.Location.id == location_id).first()
+    db_location = crud.update_returning(db, models.Location, location_id, location.dict())
     if not db_location:
         raise HTTPException(status_code=404, detail="Location not found")
+    return db_location
 
-    for key, value in location.dict().items():
-        setattr(db_location, key, value)
-
-    db.commit()
-    db.refresh(db_location)
+@router.patch("/{location_id}", response_model=schemas.Location)
+def patch_location(location_id: int, location: schemas.LocationUpdate, db: Session = Depends(get_db)):
+    db_location = crud.update_returning(db, models.Location, location_id, location.dict(exclude_unset=True))
+    if not db_location:
+        raise HTTPException(status_code=404, detail="Location not found")
     return db_location
 
 @router.delete("/{location_id}")
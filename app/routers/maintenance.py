@@ -3,10 +3,14 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.models import models, schemas
 from app.database.config import get_db
+from app.database import crud
+from app.cache.responses import cached_response
+from app.cache.conditional import conditional
 
 router = APIRouter(prefix="/maintenance", tags=["maintenance"])
 
 @router.get("/", response_model=List[schemas.MaintenanceRecord])
+@cached_response(List[schemas.MaintenanceRecord], tables=["maintenance_records"])
 def get_maintenance_records(
     skip: int = 0,
     limit: int = 100,
@@ -21,10 +25,10 @@ def get_maintenance_records(
     if maintenance_type:
         query = query.filter(models.MaintenanceRecord.maintenance_type == maintenance_type)
 
-    records = query.offset(skip).limit(limit).all()
-    return records
+    return query.offset(skip).limit(limit)
 
 @router.get("/{record_id}", response_model=schemas.MaintenanceRecord)
+@conditional(models.MaintenanceRecord, "record_id")
 def get_maintenance_record(record_id: int, db: Session = Depends(get_db)):
     record = db.query(models.MaintenanceRecord).filter(models.MaintenanceRecord.id == record_id).first()
     if not record:
@@ -33,23 +37,21 @@ def get_maintenance_record(record_id: int, db: Session = Depends(get_db)):
 
 @router.post("/", response_model=schemas.MaintenanceRecord)
 def create_maintenance_record(record: schemas.MaintenanceRecordCreate, db: Session = Depends(get_db)):
-    db_record = models.MaintenanceRecord(**record.dict())
-    db.add(db_record)
-    db.commit()
-    db.refresh(db_record)
+    db_record = crud.create_returning(db, models.MaintenanceRecord, record.dict())
     return db_record
 
 @router.put("/{record_id}", response_model=schemas.MaintenanceRecord)
 def update_maintenance_record(record_id: int, record: schemas.MaintenanceRecordCreate, db: Session = Depends(get_db)):
-    db_record = db.query(models.MaintenanceRecord).filter(models.MaintenanceRecord.id == record_id).first()
+    db_record = crud.update_returning(db, models.MaintenanceRecord, record_id, record.dict())
     if not db_record:
         raise HTTPException(status_code=404, detail="Maintenance record not found")
+    return db_record
 
-    for key, value in record.dict().items():
-        setattr(db_record, key, value)
-
-    db.commit()
-    db.refresh(db_record)
+@router.patch("/{record_id}", response_model=schemas.MaintenanceRecord)
+def patch_maintenance_record(record_id: int, record: schemas.MaintenanceRecordUpdate, db: Session = Depends(get_db)):
+    db_record = crud.update_returning(db, models.MaintenanceRecord, record_id, record.dict(exclude_unset=True))
+    if not db_record:
+        raise HTTPException(status_code=404, detail="Maintenance record not found")
     return db_record
 
 @router.delete("/{record_id}")
@@ -3,40 +3,43 @@ from sqlalchemy.orm import Session
 from typing import List
 from app.models import models, schemas
 from app.database.config import get_db
+from app.database import crud
+from app.cache import entity_cache
+from app.cache.responses import cached_response
+from app.cache.conditional import conditional
 
 router = APIRouter(prefix="/organizations", tags=["organizations"])
 
 @router.get("/", response_model=List[schemas.Organization])
+@cached_response(List[schemas.Organization], tables=["organizations"])
 def get_organizations(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    organizations = db.query(models.Organization).offset(skip).limit(limit).all()
-    return organizations
+    return db.query(models.Organization).offset(skip).limit(limit)
 
 @router.get("/{organization_id}", response_model=schemas.Organization)
+@conditional(models.Organization, "organization_id")
 def get_organization(organization_id: int, db: Session = Depends(get_db)):
-    organization = db.query(models.Organization).filter(models.Organization.id == organization_id).first()
+    organization = entity_cache.get(db, models.Organization, schemas.Organization, organization_id)
     if not organization:
         raise HTTPException(status_code=404, detail="Organization not found")
     return organization
 
 @router.post("/", response_model=schemas.Organization)
 def create_organization(organization: schemas.OrganizationCreate, db: Session = Depends(get_db)):
-    db_organization = models.Organization(**organization.dict())
-    db.add(db_organization)
-    db.commit()
-    db.refresh(db_organization)
+    db_organization = crud.create_returning(db, models.Organization, organization.dict())
     return db_organization
 
 @router.put("/{organization_id}", response_model=schemas.Organization)
 def update_organization(organization_id: int, organization: schemas.OrganizationCreate, db: Session = Depends(get_db)):
-    db_organization = db.query(models.Organization).filter(models.Organization.id == organization_id).first()
+    db_organization = crud.update_returning(db, models.Organization, organization_id, organization.dict())
     if not db_organization:
         raise HTTPException(status_code=404, detail="Organization not found")
+    return db_organization
 
-    for key, value in organization.dict().items():
-        setattr(db_organization, key, value)
-
-    db.commit()
-    db.refresh(db_organization)
+@router.patch("/{organization_id}", response_model=schemas.Organization)
+def patch_organization(organization_id: int, organization: schemas.OrganizationUpdate, db: Session = Depends(get_db)):
+    db_organization = crud.update_returning(db, models.Organization, organization_id, organization.dict(exclude_unset=True))
+    if not db_organization:
+        raise HTTPException(status_code=404, detail="Organization not found")
     return db_organization
 
 @router.delete("/{organization_id}")
@@ -1,12 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from datetime import datetime, timedelta
+import time
 from app.models import models, schemas
 from app.database.config import get_db
+from app.database import crud
+from app.cache.responses import cached_response
+from app.cache.conditional import conditional
+from app.services import route_optimizer, route_monitor, geo_index, speed_model, schedule_index
 
 router = APIRouter(prefix="/routes", tags=["routes"])
 
 @router.get("/", response_model=List[schemas.Route])
+@cached_response(List[schemas.Route], tables=["routes"])
 def get_routes(
     skip: int = 0,
     limit: int = 100,
@@ -24,35 +31,111 @@ def get_routes(
     if driver_id:
         query = query.filter(models.Route.driver_id == driver_id)
 
-    routes = query.offset(skip).limit(limit).all()
-    return routes
+    return query.offset(skip).limit(limit)
 
 @router.get("/{route_id}", response_model=schemas.Route)
+@conditional(models.Route, "route_id")
 def get_route(route_id: int, db: Session = Depends(get_db)):
     route = db.query(models.Route).filter(models.Route.id == route_id).first()
     if not route:
         raise HTTPException(status_code=404, detail="Route not found")
     return route
 
+@router.post("/estimate")
+def estimate_route(request: schemas.RouteEstimateRequest, db: Session = Depends(get_db)):
+    """Travel time between two locations from the GPS speed model, leaving at `departure` (default now)"""
+    endpoints = []
+    for location_id in (request.origin_location_id, request.destination_location_id):
+        coordinates = geo_index.locations.coordinates(db, location_id)
+        if coordinates is None:
+            raise HTTPException(status_code=404, detail=f"Location {location_id} not found or has no coordinates")
+        endpoints.extend(coordinates)
+    departure = request.departure or datetime.utcnow()
+    started = time.perf_counter()
+    minutes, road_km = speed_model.model.travel_minutes(*endpoints, departure)
+    elapsed_us = (time.perf_counter() - started) * 1e6
+    return {
+        "origin_location_id": request.origin_location_id,
+        "destination_location_id": request.destination_location_id,
+        "departure": departure,
+        "arrival": departure + timedelta(minutes=minutes),
+        "duration_minutes": round(minutes, 1),
+        "distance_km": round(road_km, 3),
+        "average_speed_kmh": round(road_km / minutes * 60, 1) if minutes else None,
+        "model_built_at": speed_model.model.built_at,
+        "estimate_us": round(elapsed_us, 1),
+    }
+
+@router.post("/{route_id}/optimize")
+def optimize_route(route_id: int, db: Session = Depends(get_db)):
+    """Best stop order for the route's pending and in-transit deliveries.
+
+    Urgent stops come first, then express, then standard. Within a tier the
+    order minimizes road distance plus lateness against scheduled_delivery.
+    The order is returned, not stored.
+    """
+    route = db.query(models.Route).filter(models.Route.id == route_id).first()
+    if not route:
+        raise HTTPException(status_code=404, detail="Route not found")
+    try:
+        return route_optimizer.optimize_route(db, route)
+    except KeyError as e:
+        raise HTTPException(
+            status_code=422, detail=f"Locations without coordinates: {', '.join(map(str, e.args[0]))}"
+        )
+
+@router.get("/{route_id}/progress")
+def get_route_progress(route_id: int, db: Session = Depends(get_db)):
+    """Percent complete and distance from the origin-destination corridor, as of the vehicle's latest GPS fix.
+
+    Updated on every fix written for an in-progress route; `events` lists
+    where the vehicle left the corridor and came back.
+    """
+    route = db.query(models.Route).filter(models.Route.id == route_id).first()
+    if not route:
+        raise HTTPException(status_code=404, detail="Route not found")
+    return route_monitor.progress(db, route)
+
+def check_bookings(db: Session, values: dict, route_id: Optional[int] = None):
+    """Raise 422 for an empty or reversed window, 409 when the route would double-book its vehicle or driver.
+
+    Locks the vehicle and driver until the caller commits, so a concurrent
+    booking waits and then sees this one.
+    """
+    error = schedule_index.check(db, [(0, route_id, values)]).get(0)
+    if error is None:
+        return
+    if error.conflicts is None:
+        raise HTTPException(status_code=422, detail=str(error))
+    raise HTTPException(status_code=409, detail={"message": str(error), "conflicts": error.conflicts})
+
 @router.post("/", response_model=schemas.Route)
 def create_route(route: schemas.RouteCreate, db: Session = Depends(get_db)):
-    db_route = models.Route(**route.dict())
-    db.add(db_route)
-    db.commit()
-    db.refresh(db_route)
+    values = route.dict()
+    check_bookings(db, values)
+    db_route = crud.create_returning(db, models.Route, values)
     return db_route
 
 @router.put("/{route_id}", response_model=schemas.Route)
 def update_route(route_id: int, route: schemas.RouteCreate, db: Session = Depends(get_db)):
-    db_route = db.query(models.Route).filter(models.Route.id == route_id).first()
+    values = route.dict()
+    check_bookings(db, values, route_id)
+    db_route = crud.update_returning(db, models.Route, route_id, values)
     if not db_route:
         raise HTTPException(status_code=404, detail="Route not found")
+    return db_route
 
-    for key, value in route.dict().items():
-        setattr(db_route, key, value)
-
-    db.commit()
-    db.refresh(db_route)
+@router.patch("/{route_id}", response_model=schemas.Route)
+def patch_route(route_id: int, route: schemas.RouteUpdate, db: Session = Depends(get_db)):
+    values = route.dict(exclude_unset=True)
+    if values.keys() & set(schedule_index.BOOKING_FIELDS):
+        current = schedule_index.current(db, [route_id]).get(route_id)
+        if current is None:
+            raise HTTPException(status_code=404, detail="Route not found")
+        check_bookings(db, {**current, **values}, route_id)
+    db_route = crud.update_returning(db, models.Route, route_id, values)
+    if not db_route:
+        raise HTTPException(status_code=404, detail="Route not found")
     return db_route
 
 @router.delete("/{route_id}")
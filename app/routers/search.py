@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+from app.database.config import get_db
+from app.services import search as search_service
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+@router.get("/")
+def search(
+    q: str = Query(..., min_length=1),
+    types: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=200),
+    db: Session = Depends(get_db)
+):
+    """Ranked full-text search of delivery, incident and maintenance notes.
+
+    Every word of `q` must match (stemmed, case-insensitive); end a word with
+    * to match it as a prefix, e.g. `q=damaged pall*`. `types` is a
+    comma-separated list of tables to search (default: all).
+    """
+    type_names = [name.strip() for name in types.split(",") if name.strip()] if types else None
+    unknown = sorted(set(type_names or []) - set(search_service.SEARCH_TYPES))
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown types {', '.join(unknown)}; expected any of {', '.join(sorted(search_service.SEARCH_TYPES))}"
+        )
+    if not search_service.parse_terms(q):
+        raise HTTPException(status_code=400, detail="q must contain at least one word")
+    return search_service.search(db, q, type_names, limit)
@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import Optional
+import os
+from app.database.config import get_db
+from app.services import jobs, snapshots
+
+router = APIRouter(prefix="/admin/snapshots", tags=["admin"])
+
+def existing_snapshot(name: str):
+    try:
+        path = snapshots.snapshot_path(name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not os.path.exists(os.path.join(path, "manifest.json")):
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    return name
+
+@router.get("/")
+def list_snapshots():
+    return snapshots.list_snapshots()
+
+@router.post("/", status_code=202)
+def create_snapshot(name: Optional[str] = None, db: Session = Depends(get_db)):
+    """Queue an export of all data tables to a compressed columnar snapshot"""
+    if name is not None:
+        try:
+            path = snapshots.snapshot_path(name)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if os.path.exists(path):
+            raise HTTPException(status_code=409, detail=f"Snapshot '{name}' already exists")
+    return jobs.accepted(jobs.enqueue(db, "snapshot_export", {"name": name}))
+
+@router.get("/{name}")
+def get_snapshot(name: str):
+    return snapshots.read_manifest(existing_snapshot(name))
+
+@router.post("/{name}/restore", status_code=202)
+def restore_snapshot(name: str, db: Session = Depends(get_db)):
+    """Queue a restore replacing all data with the snapshot (use with caution!)"""
+    return jobs.accepted(jobs.enqueue(db, "snapshot_restore", {"name": existing_snapshot(name)}))
+
+@router.delete("/{name}")
+def delete_snapshot(name: str):
+    snapshots.delete_snapshot(existing_snapshot(name))
+    return {"message": f"Snapshot '{name}' deleted"}
@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+from app.database.config import get_db
+from app.services import jobs, speed_model
+
+router = APIRouter(prefix="/admin/speed-model", tags=["admin"])
+
+@router.get("/")
+def get_speed_model():
+    """The speed model this process estimates travel times with"""
+    return speed_model.model.stats()
+
+@router.post("/", status_code=202)
+def build_speed_model(
+    cell_degrees: Optional[float] = Query(None, gt=0, le=10, description="Grid cell size (default SPEED_GRID_DEGREES)"),
+    db: Session = Depends(get_db)
+):
+    """Queue a rebuild of the speed model from the whole GPS history"""
+    return jobs.accepted(jobs.enqueue(db, "speed_model", {"cell_degrees": cell_degrees}))
@@ -1,12 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from datetime import datetime
 from app.models import models, schemas
 from app.database.config import get_db
+from app.database import crud
+from app.cache import entity_cache
+from app.cache.responses import cached_response
+from app.cache.conditional import conditional
+from app.services import schedule_index
 
 router = APIRouter(prefix="/vehicles", tags=["vehicles"])
 
 @router.get("/", response_model=List[schemas.Vehicle])
+@cached_response(List[schemas.Vehicle], tables=["vehicles"])
 def get_vehicles(
     skip: int = 0,
     limit: int = 100,
@@ -24,35 +31,52 @@ def get_vehicles(
     if organization_id:
         query = query.filter(models.Vehicle.organization_id == organization_id)
 
-    vehicles = query.offset(skip).limit(limit).all()
-    return vehicles
+    return query.offset(skip).limit(limit)
+
+@router.get("/available", response_model=List[schemas.Vehicle])
+def get_available_vehicles(
+    start: datetime,
+    end: datetime,
+    organization_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db)
+):
+    """Active vehicles with no draft, scheduled or in-progress route overlapping [start, end)"""
+    if schedule_index.to_us(end) <= schedule_index.to_us(start):
+        raise HTTPException(status_code=422, detail="end must be after start")
+    busy = schedule_index.bookings.busy(db, "vehicle", start, end)
+    query = db.query(models.Vehicle.id).filter(models.Vehicle.status == "active")
+    if organization_id:
+        query = query.filter(models.Vehicle.organization_id == organization_id)
+    ids = [row_id for row_id, in query.order_by(models.Vehicle.id) if row_id not in busy][skip:skip + limit]
+    return db.query(models.Vehicle).filter(models.Vehicle.id.in_(ids)).order_by(models.Vehicle.id).all()
 
 @router.get("/{vehicle_id}", response_model=schemas.Vehicle)
+@conditional(models.Vehicle, "vehicle_id")
 def get_vehicle(vehicle_id: int, db: Session = Depends(get_db)):
-    vehicle = db.query(models.Vehicle).filter(models.Vehicle.id == vehicle_id).first()
+    vehicle = entity_cache.get(db, models.Vehicle, schemas.Vehicle, vehicle_id)
     if not vehicle:
         raise HTTPException(status_code=404, detail="Vehicle not found")
     return vehicle
 
 @router.post("/", response_model=schemas.Vehicle)
 def create_vehicle(vehicle: schemas.VehicleCreate, db: Session = Depends(get_db)):
-    db_vehicle = models.Vehicle(**vehicle.dict())
-    db.add(db_vehicle)
-    db.commit()
-    db.refresh(db_vehicle)
+    db_vehicle = crud.create_returning(db, models.Vehicle, vehicle.dict())
     return db_vehicle
 
 @router.put("/{vehicle_id}", response_model=schemas.Vehicle)
 def update_vehicle(vehicle_id: int, vehicle: schemas.VehicleCreate, db: Session = Depends(get_db)):
-    db_vehicle = db.query(models.Vehicle).filter(models.Vehicle.id == vehicle_id).first()
+    db_vehicle = crud.update_returning(db, models.Vehicle, vehicle_id, vehicle.dict())
     if not db_vehicle:
         raise HTTPException(status_code=404, detail="Vehicle not found")
+    return db_vehicle
 
-    for key, value in vehicle.dict().items():
-        setattr(db_vehicle, key, value)
-
-    db.commit()
-    db.refresh(db_vehicle)
+@router.patch("/{vehicle_id}", response_model=schemas.Vehicle)
+def patch_vehicle(vehicle_id: int, vehicle: schemas.VehicleUpdate, db: Session = Depends(get_db)):
+    db_vehicle = crud.update_returning(db, models.Vehicle, vehicle_id, vehicle.dict(exclude_unset=True))
+    if not db_vehicle:
+        raise HTTPException(status_code=404, detail="Vehicle not found")
     return db_vehicle
 
 @router.delete("/{vehicle_id}")
@@ -0,0 +1,176 @@
+"""Change log for incremental client sync.
+
+Row changes recorded on a session (app.database.events) are written to the
+change_log table inside the committing transaction, so a change is logged if
+and only if it commits. Log ids are drawn from a sequence, so on Postgres a
+transaction can commit an id below one already visible. Readers page only
+up to horizon(): writers hold a shared advisory lock from before they draw
+ids until they commit, without waiting on each other. When the ids after a
+reader's cursor have gaps, the reader takes that lock exclusively for an
+instant, which waits out the writers that could still fill them. SQLite has
+a single writer, so its ids are always in commit order.
+
+Whole-table writes that bypass sessions (seeding, clearing, snapshot restore)
+log a single "reset" entry per table: clients must re-pull that type.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import event, select, insert, delete, func, text
+from sqlalchemy.orm import Session
+import logging
+import os
+from app.database import events
+from app.database.config import SessionLocal
+from app.models.models import ChangeLog
+from app.models.resources import RESOURCES
+from app.services.jobs import maintenance_task
+
+logger = logging.getLogger(__name__)
+
+CHANGE_RETENTION_DAYS = float(os.getenv("CHANGE_RETENTION_DAYS", "7"))
+CHANGES_PAGE_SIZE = int(os.getenv("CHANGES_PAGE_SIZE", "500"))
+
+# Arbitrary advisory lock key: shared by change log writers until they commit, exclusive for readers' barriers
+CHANGE_LOG_LOCK_KEY = 7_210_432
+
+RESET = "reset"
+
+# table name -> resource (model and response schema)
+TRACKED = {resource.model.__tablename__: resource for resource in RESOURCES.values()}
+
+def _lock(connection):
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("SELECT pg_advisory_xact_lock_shared(:key)"), {"key": CHANGE_LOG_LOCK_KEY})
+
+def _dialect(db):
+    """Dialect name of a Session or a Connection"""
+    return db.dialect.name if hasattr(db, "dialect") else db.get_bind().dialect.name
+
+def horizon(db, since=None, upto=None):
+    """Id up to which the log is final: every entry at or below it has committed or never will.
+
+    upto defaults to the newest visible id. Ids in (since, upto] are checked
+    for gaps left by writers still in flight (or rolled back), and only then
+    does the reader wait for the writers; since=None always waits, for a
+    reader starting from scratch.
+    """
+    if upto is None:
+        upto = db.execute(select(func.max(ChangeLog.id))).scalar() or 0
+    if _dialect(db) != "postgresql" or (since is not None and upto <= since):
+        return upto
+    if since is not None:
+        present = db.execute(
+            select(func.count()).select_from(ChangeLog).where(ChangeLog.id > since, ChangeLog.id <= upto)
+        ).scalar()
+        if present == upto - since:
+            return upto
+    # Every writer that drew an id at or below upto took the shared lock first
+    db.execute(text("SELECT pg_advisory_lock(:key)"), {"key": CHANGE_LOG_LOCK_KEY})
+    db.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": CHANGE_LOG_LOCK_KEY})
+    return upto
+
+@event.listens_for(Session, "before_commit")
+def _write_changes(session):
+    # The commit's own flush runs after this hook, so flush now to capture its changes
+    session.flush()
+    ops = session.info.pop("ops", None)
+    if not ops:
+        return
+    now = datetime.utcnow()
+    entries = [
+        {"table_name": table, "row_id": row_id, "op": op, "changed_at": now}
+        for table, op, ids in ops if table in TRACKED
+        for row_id in ids
+    ]
+    if entries:
+        connection = session.connection()
+        _lock(connection)
+        connection.execute(insert(ChangeLog), entries)
+
+def log_reset(engine, tables):
+    """Log that every row of these tables may have changed; failures are logged, not raised"""
+    try:
+        with engine.begin() as connection:
+            _lock(connection)
+            now = datetime.utcnow()
+            connection.execute(insert(ChangeLog), [
+                {"table_name": table, "row_id": None, "op": RESET, "changed_at": now}
+                for table in tables if table in TRACKED
+            ])
+    except Exception as e:
+        logger.error(f"Could not log reset of {', '.join(tables)}: {e}")
+
+class CursorExpired(Exception):
+    pass
+
+def read_changes(db, since=None, types=None, limit=CHANGES_PAGE_SIZE):
+    """Changes after the cursor `since`, oldest first, with the current state of changed rows.
+
+    Without a cursor nothing is returned but the current cursor: clients take
+    a full copy first and sync from there. Raises CursorExpired when entries
+    after `since` have been pruned.
+    """
+    oldest, newest = db.execute(select(func.min(ChangeLog.id), func.max(ChangeLog.id))).one()
+    if since is None:
+        return {"changes": [], "next_cursor": horizon(db, None, newest or 0), "has_more": False}
+    if oldest is not None and since < oldest - 1:
+        raise CursorExpired(f"Cursor {since} is older than the {CHANGE_RETENTION_DAYS:g} day retention window")
+
+    query = select(ChangeLog).where(ChangeLog.id > since)
+    if types:
+        query = query.where(ChangeLog.table_name.in_(types))
+    # The page ends at the entry after its last, or the newest id; only ids up to there must be final
+    ids = db.scalars(query.with_only_columns(ChangeLog.id).order_by(ChangeLog.id).limit(limit + 1)).all()
+    final = horizon(db, since, ids[limit - 1] if len(ids) > limit else newest or 0)
+    entries = db.scalars(query.where(ChangeLog.id <= final).order_by(ChangeLog.id).limit(limit + 1)).all()
+    truncated = len(entries) > limit
+    has_more = truncated or final < (newest or 0)
+    entries = entries[:limit]
+
+    # One query per type for the rows still present; deleted rows come back as None
+    wanted = {}
+    for entry in entries:
+        if entry.op in (events.INSERT, events.UPDATE):
+            wanted.setdefault(entry.table_name, set()).add(entry.row_id)
+    current = {}
+    for table, ids in wanted.items():
+        resource = TRACKED[table]
+        for row in db.scalars(select(resource.model).where(resource.model.id.in_(ids))):
+            current[table, row.id] = resource.schema.model_validate(row).model_dump(mode="json")
+
+    changes = []
+    for entry in entries:
+        data = current.get((entry.table_name, entry.row_id))
+        op = entry.op
+        if op in (events.INSERT, events.UPDATE) and data is None:
+            # Removed by a later change that is further along in the feed
+            op = events.DELETE
+        changes.append({
+            "cursor": entry.id,
+            "type": entry.table_name,
+            "id": entry.row_id,
+            "op": op,
+            "changed_at": entry.changed_at,
+            "data": data,
+        })
+    if truncated:
+        next_cursor = entries[-1].id
+    else:
+        # Nothing more of these types up to the horizon, and no entry at or below it can still commit
+        next_cursor = max(since, final)
+    return {"changes": changes, "next_cursor": next_cursor, "has_more": has_more}
+
+@maintenance_task
+def prune_changes():
+    """Drop entries older than the retention window, always keeping the newest"""
+    cutoff = datetime.utcnow() - timedelta(days=CHANGE_RETENTION_DAYS)
+    with SessionLocal() as db:
+        newest = db.execute(select(func.max(ChangeLog.id))).scalar()
+        if newest is None:
+            return 0
+        deleted = db.execute(
+            delete(ChangeLog).where(ChangeLog.changed_at < cutoff, ChangeLog.id < newest)
+        ).rowcount
+        db.commit()
+    if deleted:
+        logger.info(f"Pruned {deleted} change log entries older than {CHANGE_RETENTION_DAYS:g} days")
+    return deleted
@@ -0,0 +1,154 @@
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from datetime import datetime
+import csv
+import itertools
+import logging
+import multiprocessing
+import os
+import tempfile
+import uuid
+from app.database.config import SessionLocal
+from app.database import bulk
+from app.models import models
+from app.models.resources import RESOURCES
+from app.services import schedule_index
+from app.services.jobs import job_handler
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "5000"))
+# Validation processes; 0 validates in the importing thread
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", str(os.cpu_count() or 1)))
+IMPORT_REPORT_DIR = os.getenv("IMPORT_REPORT_DIR", os.path.join(tempfile.gettempdir(), "fleet-imports"))
+# Uploads larger than this are imported by a job instead of within the request
+IMPORT_INLINE_BYTES = int(os.getenv("IMPORT_INLINE_BYTES", str(1024 * 1024)))
+
+_pool = None
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        # Forking a process with live threads (server, job workers) can copy held locks
+        _pool = ProcessPoolExecutor(max_workers=IMPORT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+def validate_chunk(resource_name, rows):
+    """Validate (line, row) pairs against the resource's create schema.
+
+    Runs in a worker process. Empty cells are dropped so schema defaults apply.
+    """
+    schema = RESOURCES[resource_name].create_schema
+    cleaned = [{k: v for k, v in row.items() if k and v not in ("", None)} for _, row in rows]
+    valid, errors = bulk.validate_rows(schema, cleaned)
+    return (
+        [(rows[index][0], values) for index, values in valid],
+        [(rows[error["index"]][0], error["error"]) for error in errors],
+    )
+
+def _read_chunks(reader, size):
+    # Line 1 is the header
+    numbered = ((reader.line_num, row) for row in reader)
+    while True:
+        chunk = list(itertools.islice(numbered, size))
+        if not chunk:
+            return
+        yield chunk
+
+def new_import_id():
+    return uuid.uuid4().hex
+
+def report_path(import_id):
+    return os.path.join(IMPORT_REPORT_DIR, f"{import_id}.csv")
+
+def upload_path(import_id):
+    """Where an upload is spooled; import jobs read it from here, so the worker must share the directory"""
+    return os.path.join(IMPORT_REPORT_DIR, f"{import_id}.upload")
+
+def run_import(resource_name, csv_path, chunk_size=IMPORT_CHUNK_SIZE, import_id=None, progress=None):
+    """Stream a CSV file into the resource's table.
+
+    Chunks are validated in a process pool with a bounded number in flight, valid
+    rows are bulk-inserted and committed per chunk, and rejected lines go to an
+    error report, so memory stays flat whatever the file size. progress(step,
+    bytes_read, total_bytes) is called after every chunk.
+    """
+    resource = RESOURCES[resource_name]
+    import_id = import_id or new_import_id()
+    os.makedirs(IMPORT_REPORT_DIR, exist_ok=True)
+    started = datetime.utcnow()
+    summary = {"rows": 0, "imported": 0, "rejected": 0}
+    total_bytes = os.path.getsize(csv_path)
+
+    with open(csv_path, newline="", encoding="utf-8-sig") as source, \
+            open(report_path(import_id), "w", newline="") as report_file:
+        reader = csv.DictReader(source)
+        report = csv.writer(report_file)
+        report.writerow(["line", "error", *(reader.fieldnames or [])])
+        fieldnames = reader.fieldnames or []
+        raw_lines = {}
+
+        def reject(line, message):
+            row = raw_lines.get(line, {})
+            report.writerow([line, message, *(row.get(name, "") for name in fieldnames)])
+            summary["rejected"] += 1
+
+        def write(chunk_result, chunk):
+            valid, errors = chunk_result
+            raw_lines.clear()
+            raw_lines.update(chunk)
+            for line, message in errors:
+                reject(line, message)
+
+            db = SessionLocal()
+            try:
+                results = []
+                if resource.model is models.Route:
+                    # Booking locks are held until this chunk commits
+                    valid, results = schedule_index.check_rows(db, valid)
+                results += bulk.insert_rows(db, resource.model, valid)
+                db.commit()
+            finally:
+                db.close()
+            # valid rows are (line, values) pairs, so each result's index is its line
+            for result in results:
+                if result["status"] == "created":
+                    summary["imported"] += 1
+                else:
+                    reject(result["index"], result.get("error", result["status"]))
+            if progress:
+                # The reader runs ahead of the chunks written, so this is approximate
+                progress("bytes", min(source.buffer.tell(), total_bytes), total_bytes)
+
+        in_flight = deque()
+        max_in_flight = max(1, IMPORT_WORKERS) * 2
+        for chunk in _read_chunks(reader, chunk_size):
+            summary["rows"] += len(chunk)
+            if IMPORT_WORKERS > 0:
+                in_flight.append((_get_pool().submit(validate_chunk, resource_name, chunk), chunk))
+                if len(in_flight) >= max_in_flight:
+                    future, done_chunk = in_flight.popleft()
+                    write(future.result(), done_chunk)
+            else:
+                write(validate_chunk(resource_name, chunk), chunk)
+        while in_flight:
+            future, done_chunk = in_flight.popleft()
+            write(future.result(), done_chunk)
+
+    elapsed = (datetime.utcnow() - started).total_seconds()
+    logger.info(f"Imported {summary['imported']}/{summary['rows']} {resource_name} rows in {elapsed:.1f}s")
+    return {
+        "import_id": import_id,
+        "resource": resource_name,
+        **summary,
+        "seconds": round(elapsed, 3),
+        "error_report": f"/admin/import/reports/{import_id}" if summary["rejected"] else None,
+    }
+
+@job_handler("csv_import")
+def import_job(context, resource, path, chunk_size=IMPORT_CHUNK_SIZE, import_id=None):
+    """Import a spooled upload; chunks already committed stay if the job is cancelled"""
+    try:
+        return run_import(resource, path, chunk_size, import_id, progress=context.report)
+    finally:
+        os.remove(path)
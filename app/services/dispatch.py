@@ -0,0 +1,380 @@
+"""Capacity-aware assignment of pending deliveries to vehicles and drivers.
+
+A plan is built in three steps over NumPy arrays:
+1. Spatial pre-clustering. Deliveries become points on the unit sphere, and
+   weighted k-means places one centre per vehicle used. The fleet is the
+   fewest of the largest vehicles whose capacity covers the load at
+   DISPATCH_TARGET_FILL.
+2. Capacitated assignment. Centres are matched to vehicles, the heaviest
+   cluster to the largest vehicle. Deliveries are then placed, those with
+   the most to lose first (the largest lead of their nearest centre over
+   the next), each in the nearest centre with room left. Centres move to the
+   load placed on them and the placement is repeated. Deliveries that fit
+   nowhere bring in the next largest vehicles, while there are any.
+3. Sequencing. Each vehicle's stops are ordered by
+   app.services.route_optimizer from the depot nearest its centre and back,
+   sharing DISPATCH_TIME_LIMIT_SECONDS between the routes.
+
+Steps 1 and 2 compare points by dot product of unit vectors, which orders
+them as great-circle distance does, in chunks of rows so the delivery by
+centre matrix is never held whole.
+"""
+import os
+import time
+from datetime import datetime, timedelta
+from typing import NamedTuple
+import numpy as np
+from sqlalchemy import select, insert, update, delete
+from app.database import events
+from app.models import models
+from app.services import distance_matrix, route_optimizer, schedule_index
+from app.services.geo import unit_vectors, haversine_km
+
+# Share of capacity the fleet is sized for, leaving room for packing
+DISPATCH_TARGET_FILL = float(os.getenv("DISPATCH_TARGET_FILL", "0.9"))
+# Sequencing budget for a whole plan
+DISPATCH_TIME_LIMIT_SECONDS = float(os.getenv("DISPATCH_TIME_LIMIT_SECONDS", "2"))
+DISPATCH_SHIFT_HOURS = float(os.getenv("DISPATCH_SHIFT_HOURS", "10"))
+KMEANS_ITERATIONS = 8
+PLACEMENT_ITERATIONS = 3
+# Nearest centres tried before searching every centre with room
+PLACEMENT_CANDIDATES = 8
+CHUNK_ROWS = 4096
+DEPOT_TYPES = ("warehouse", "depot", "distribution_center")
+DRAFT = "draft"
+
+class Trip(NamedTuple):
+    vehicle: int  # position in the capacities given
+    depot: int  # position in the depots given, or -1 when there are none
+    stops: np.ndarray  # delivery positions in visiting order
+    load_kg: float
+    distance_km: float
+    duration_minutes: float
+    late_minutes: float
+
+def choose_fleet(capacities, load_kg, exclude=()):
+    """Positions of the fewest largest vehicles, outside exclude, whose capacity covers load_kg at the target fill"""
+    order = np.array([position for position in np.argsort(-capacities, kind="stable").tolist() if position not in exclude],
+                     dtype=np.int64)
+    needed = int(np.searchsorted(np.cumsum(capacities[order]), load_kg / DISPATCH_TARGET_FILL)) + 1
+    return order[:needed]
+
+def _nearest_centres(points, centres, count):
+    """(positions, similarities) of each point's `count` nearest centres, nearest first"""
+    count = min(count, len(centres))
+    positions = np.empty((len(points), count), dtype=np.int64)
+    similarities = np.empty((len(points), count))
+    for start in range(0, len(points), CHUNK_ROWS):
+        similarity = points[start:start + CHUNK_ROWS] @ centres.T
+        if count < len(centres):
+            nearest = np.argpartition(-similarity, count - 1, axis=1)[:, :count]
+        else:
+            nearest = np.broadcast_to(np.arange(count), similarity.shape)
+        nearest_similarity = np.take_along_axis(similarity, nearest, axis=1)
+        order = np.argsort(-nearest_similarity, axis=1)
+        positions[start:start + CHUNK_ROWS] = np.take_along_axis(nearest, order, axis=1)
+        similarities[start:start + CHUNK_ROWS] = np.take_along_axis(nearest_similarity, order, axis=1)
+    return positions, similarities
+
+def _recentre(points, weights, labels, centres):
+    """Weighted mean direction of each centre's points; centres without points stay put"""
+    placed = labels >= 0
+    sums = np.stack([
+        np.bincount(labels[placed], weights=points[placed, axis] * weights[placed], minlength=len(centres))
+        for axis in range(3)
+    ], axis=1)
+    norms = np.linalg.norm(sums, axis=1)
+    moved = norms > 1e-12
+    centres = centres.copy()
+    centres[moved] = sums[moved] / norms[moved, None]
+    return centres
+
+def kmeans(points, weights, k, rng):
+    """Weighted k-means on the unit sphere from k-means++ seeds; returns (centres, labels)"""
+    centres = np.empty((k, 3))
+    cumulative = np.cumsum(weights)
+    centres[0] = points[min(int(np.searchsorted(cumulative, rng.random() * cumulative[-1])), len(points) - 1)]
+    # Squared chord to the nearest centre so far
+    closest = np.maximum(2 - 2 * points @ centres[0], 0)
+    for c in range(1, k):
+        cumulative = np.cumsum(weights * closest)
+        if cumulative[-1] > 0:
+            index = min(int(np.searchsorted(cumulative, rng.random() * cumulative[-1])), len(points) - 1)
+        else:
+            index = int(rng.integers(len(points)))
+        centres[c] = points[index]
+        np.minimum(closest, np.maximum(2 - 2 * points @ centres[c], 0), out=closest)
+    labels = np.zeros(len(points), dtype=np.int64)
+    for _ in range(KMEANS_ITERATIONS):
+        labels = _nearest_centres(points, centres, 1)[0][:, 0]
+        centres = _recentre(points, weights, labels, centres)
+    return centres, labels
+
+def place(points, weights, centres, capacities):
+    """Bin per point (position in centres and capacities), or -1 where no bin has room"""
+    nearest, similarity = _nearest_centres(points, centres, PLACEMENT_CANDIDATES)
+    # Points whose nearest centre barely beats the next have the least to lose and go last
+    lead = similarity[:, 0] - similarity[:, 1] if nearest.shape[1] > 1 else np.zeros(len(points))
+    remaining = capacities.astype(np.float64).copy()
+    labels = np.full(len(points), -1, dtype=np.int64)
+    for i in np.argsort(-lead, kind="stable").tolist():
+        weight = weights[i]
+        for b in nearest[i].tolist():
+            if remaining[b] >= weight:
+                break
+        else:
+            room = np.flatnonzero(remaining >= weight)
+            if not len(room):
+                continue
+            b = int(room[np.argmax(centres[room] @ points[i])])
+        labels[i] = b
+        remaining[b] -= weight
+    return labels
+
+def assign(points, weights, capacities, rng):
+    """Bin per point (position in capacities) or -1, and the capacities' positions that were used"""
+    # k-means weights: a delivery without a weight still pulls its centre a little
+    pull = np.maximum(weights, 1e-3)
+    fleet = choose_fleet(capacities, weights.sum())
+    labels = np.full(len(points), -1, dtype=np.int64)
+    while True:
+        centres, clusters = kmeans(points, pull, len(fleet), rng)
+        # Heaviest cluster to the largest vehicle
+        demand = np.bincount(clusters, weights=weights, minlength=len(fleet))
+        centres = centres[np.argsort(-demand, kind="stable")]
+        bins = fleet[np.argsort(-capacities[fleet], kind="stable")]
+        for _ in range(PLACEMENT_ITERATIONS):
+            labels = place(points, weights, centres, capacities[bins])
+            centres = _recentre(points, pull, labels, centres)
+        unplaced = labels < 0
+        fits = weights[unplaced] <= np.delete(capacities, fleet).max(initial=0)
+        if not fits.any():
+            break
+        fleet = np.concatenate([bins, choose_fleet(capacities, weights[unplaced][fits].sum(), exclude=set(fleet.tolist()))])
+    return np.where(labels >= 0, bins[np.maximum(labels, 0)], -1), bins
+
+def solve(lat, lon, weights, tiers, deadlines, capacities, depot_lat, depot_lon,
+          time_limit=DISPATCH_TIME_LIMIT_SECONDS, seed=0):
+    """Trips covering the deliveries that fit, largest vehicle first, and the positions of those that do not.
+
+    Deliveries are given as arrays of coordinates, weights (kg), priority tiers
+    and deadlines (minutes after departure, NaN for none); vehicles as
+    capacities (kg). Without depots a trip starts at its first stop and ends
+    at its last.
+    """
+    rng = np.random.default_rng(seed)
+    lat, lon = np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64)
+    weights = np.nan_to_num(np.asarray(weights, dtype=np.float64))
+    tiers, deadlines = np.asarray(tiers), np.asarray(deadlines, dtype=np.float64)
+    depot_lat, depot_lon = np.asarray(depot_lat, dtype=np.float64), np.asarray(depot_lon, dtype=np.float64)
+    capacities = np.asarray(capacities, dtype=np.float64)
+    if not len(weights) or not len(capacities):
+        return [], np.arange(len(weights))
+    points = unit_vectors(lat, lon).reshape(-1, 3)
+    vehicles, used = assign(points, weights, capacities, rng)
+
+    depots = unit_vectors(depot_lat, depot_lon).reshape(-1, 3)
+    minutes_per_km = 60 / distance_matrix.AVERAGE_SPEED_KMH
+    loaded = [vehicle for vehicle in used.tolist() if (vehicles == vehicle).any()]
+    budget_end = time.perf_counter() + time_limit
+    trips = []
+    for index, vehicle in enumerate(loaded):
+        stops = np.flatnonzero(vehicles == vehicle)
+        stop_points = points[stops]
+        depot = -1
+        node_lat, node_lon = lat[stops], lon[stops]
+        if len(depots):
+            centre = stop_points.sum(axis=0)
+            depot = int(np.argmax(depots @ centre))
+            node_lat = np.concatenate([[depot_lat[depot]], node_lat, [depot_lat[depot]]])
+            node_lon = np.concatenate([[depot_lon[depot]], node_lon, [depot_lon[depot]]])
+            distances = distance_matrix.road_km(haversine_km(node_lat[:, None], node_lon[:, None], node_lat, node_lon))
+        else:
+            # Free start and end: legs to and from the endpoints cost nothing
+            distances = np.zeros((len(stops) + 2, len(stops) + 2))
+            distances[1:-1, 1:-1] = distance_matrix.road_km(
+                haversine_km(node_lat[:, None], node_lon[:, None], node_lat, node_lon)
+            )
+        problem = route_optimizer.Problem(distances, tiers[stops], deadlines[stops], minutes_per_km)
+        share = max(0.0, (budget_end - time.perf_counter()) / (len(loaded) - index))
+        plan = problem.solve(share)
+        trips.append(Trip(
+            vehicle=vehicle,
+            depot=depot,
+            stops=stops[plan.path[1:-1] - 1],
+            load_kg=float(weights[stops].sum()),
+            distance_km=plan.distance_km,
+            duration_minutes=plan.distance_km * minutes_per_km + route_optimizer.SERVICE_MINUTES * len(stops),
+            late_minutes=plan.late_minutes,
+        ))
+    return trips, np.flatnonzero(vehicles < 0)
+
+def _write(db, routes, unassigned):
+    """Write the routes as drafts and move their deliveries onto them; returns the routes written.
+
+    busy() was read without locks, so the routes go through the booking
+    check, which locks their vehicles and drivers; a trip that now conflicts
+    is dropped. Deliveries given a route since they were read stay on it.
+    """
+    errors = schedule_index.check(db, [
+        (position, None, {**{field: route.get(field) for field in schedule_index.BOOKING_FIELDS}, "status": DRAFT})
+        for position, route in enumerate(routes)
+    ])
+    for position, error in errors.items():
+        unassigned.extend({"delivery_id": delivery_id, "reason": str(error)} for delivery_id in routes[position]["delivery_ids"])
+    routes = [route for position, route in enumerate(routes) if position not in errors]
+    if not routes:
+        db.commit()
+        return routes
+
+    columns = ("vehicle_id", "driver_id", "origin_location_id", "destination_location_id",
+               "scheduled_departure", "scheduled_arrival", "distance_km")
+    route_ids = db.scalars(
+        insert(models.Route).returning(models.Route.id, sort_by_parameter_order=True),
+        [{**{column: route[column] for column in columns}, "status": DRAFT} for route in routes],
+    ).all()
+    events.record(db, models.Route.__tablename__, route_ids, events.INSERT)
+    written, empty = [], []
+    for route, route_id in zip(routes, route_ids):
+        route["route_id"] = route_id
+        assigned = set(db.scalars(
+            update(models.Delivery)
+            .where(models.Delivery.id.in_(route["delivery_ids"]), models.Delivery.route_id.is_(None))
+            .values(route_id=route_id)
+            .returning(models.Delivery.id)
+        ))
+        events.record(db, models.Delivery.__tablename__, assigned, events.UPDATE)
+        unassigned.extend(
+            {"delivery_id": delivery_id, "reason": "assigned to another route while planning"}
+            for delivery_id in route["delivery_ids"] if delivery_id not in assigned
+        )
+        route["delivery_ids"] = [delivery_id for delivery_id in route["delivery_ids"] if delivery_id in assigned]
+        (written if assigned else empty).append(route)
+    if empty:
+        empty_ids = [route["route_id"] for route in empty]
+        db.execute(delete(models.Route).where(models.Route.id.in_(empty_ids)))
+        events.record(db, models.Route.__tablename__, empty_ids, events.DELETE)
+    db.commit()
+    return written
+
+def plan(db, organization_id, departure=None, shift_hours=DISPATCH_SHIFT_HOURS, delivery_ids=None, dry_run=False):
+    """Assign the organization's pending, unrouted deliveries to its free vehicles and drivers.
+
+    Unless dry_run, each trip is written as a draft Route and its deliveries
+    are moved onto it. Returns the plan as a response dict.
+    """
+    started = time.perf_counter()
+    departure = departure or datetime.utcnow()
+    shift_end = departure + timedelta(hours=shift_hours)
+
+    query = (
+        select(
+            models.Delivery.id, models.Delivery.location_id, models.Delivery.weight_kg,
+            models.Delivery.package_count, models.Delivery.priority, models.Delivery.scheduled_delivery,
+            models.Location.latitude, models.Location.longitude,
+        )
+        .join(models.Location, models.Location.id == models.Delivery.location_id)
+        .where(
+            models.Location.organization_id == organization_id,
+            models.Delivery.status == "pending",
+            models.Delivery.route_id.is_(None),
+        )
+        .order_by(models.Delivery.id)
+    )
+    if delivery_ids is not None:
+        query = query.where(models.Delivery.id.in_(delivery_ids))
+    if not dry_run:
+        # A concurrent plan skips the deliveries this one holds until it commits (Postgres; no-op elsewhere)
+        query = query.with_for_update(of=models.Delivery, skip_locked=True)
+    rows = db.execute(query).all()
+    unassigned = [{"delivery_id": row.id, "reason": "location has no coordinates"}
+                  for row in rows if row.latitude is None or row.longitude is None]
+    deliveries = [row for row in rows if row.latitude is not None and row.longitude is not None]
+
+    busy_vehicles = schedule_index.bookings.busy(db, "vehicle", departure, shift_end)
+    vehicles = [row for row in db.execute(
+        select(models.Vehicle.id, models.Vehicle.capacity_kg)
+        .where(
+            models.Vehicle.organization_id == organization_id,
+            models.Vehicle.status == "active",
+            models.Vehicle.capacity_kg > 0,
+        )
+        .order_by(models.Vehicle.capacity_kg.desc(), models.Vehicle.id)
+    ) if row.id not in busy_vehicles]
+    busy_drivers = schedule_index.bookings.busy(db, "driver", departure, shift_end)
+    drivers = [driver_id for driver_id in db.scalars(
+        select(models.Driver.id)
+        .where(
+            models.Driver.organization_id == organization_id,
+            models.Driver.status == "active",
+            (models.Driver.license_expiry.is_(None)) | (models.Driver.license_expiry > shift_end),
+        )
+        .order_by(models.Driver.rating.desc(), models.Driver.id)
+    ) if driver_id not in busy_drivers]
+    depots = db.execute(
+        select(models.Location.id, models.Location.latitude, models.Location.longitude)
+        .where(
+            models.Location.organization_id == organization_id,
+            models.Location.type.in_(DEPOT_TYPES),
+            models.Location.latitude.isnot(None),
+            models.Location.longitude.isnot(None),
+        )
+        .order_by(models.Location.id)
+    ).all()
+
+    # One driver per vehicle: the largest vehicles that have a driver
+    fleet = vehicles[:len(drivers)]
+    trips, unplaced = solve(
+        np.array([row.latitude for row in deliveries], dtype=np.float64),
+        np.array([row.longitude for row in deliveries], dtype=np.float64),
+        np.array([row.weight_kg or 0.0 for row in deliveries], dtype=np.float64),
+        np.array([route_optimizer.PRIORITY_TIERS.get(row.priority, len(route_optimizer.PRIORITY_TIERS)) for row in deliveries]),
+        np.array([
+            (row.scheduled_delivery - departure).total_seconds() / 60 if row.scheduled_delivery else np.nan
+            for row in deliveries
+        ], dtype=np.float64),
+        np.array([row.capacity_kg for row in fleet], dtype=np.float64),
+        np.array([row.latitude for row in depots], dtype=np.float64),
+        np.array([row.longitude for row in depots], dtype=np.float64),
+    )
+    largest = max((row.capacity_kg for row in fleet), default=0.0)
+    for position in unplaced.tolist():
+        row = deliveries[position]
+        unassigned.append({
+            "delivery_id": row.id,
+            "reason": "heavier than any free vehicle" if (row.weight_kg or 0.0) > largest else "no free vehicle capacity left",
+        })
+
+    routes = []
+    for trip, driver_id in zip(trips, drivers):
+        stops = [deliveries[position] for position in trip.stops.tolist()]
+        routes.append({
+            "route_id": None,
+            "vehicle_id": fleet[trip.vehicle].id,
+            "driver_id": driver_id,
+            "origin_location_id": depots[trip.depot].id if trip.depot >= 0 else stops[0].location_id,
+            "destination_location_id": depots[trip.depot].id if trip.depot >= 0 else stops[-1].location_id,
+            "scheduled_departure": departure,
+            "scheduled_arrival": departure + timedelta(minutes=trip.duration_minutes),
+            "distance_km": round(trip.distance_km, 3),
+            "load_kg": round(trip.load_kg, 3),
+            "capacity_kg": fleet[trip.vehicle].capacity_kg,
+            "package_count": sum(row.package_count or 0 for row in stops),
+            "late_minutes": round(trip.late_minutes, 1),
+            "delivery_ids": [row.id for row in stops],
+        })
+
+    if routes and not dry_run:
+        routes = _write(db, routes, unassigned)
+
+    return {
+        "organization_id": organization_id,
+        "departure": departure,
+        "dry_run": dry_run,
+        "routes": routes,
+        "unassigned": sorted(unassigned, key=lambda entry: entry["delivery_id"]),
+        "deliveries": len(rows),
+        "vehicles_available": len(vehicles),
+        "drivers_available": len(drivers),
+        "solve_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
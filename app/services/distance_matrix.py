@@ -0,0 +1,269 @@
+"""Location-to-location distance and travel-time matrix.
+
+Each organization's matrix holds the great-circle distance in km between
+every pair of its locations as float32, in .npy files memory-mapped by every
+worker process, so a lookup of k locations costs k² reads and no
+trigonometry. Beside the matrix sit the slot ids and the coordinates each
+row was computed from.
+
+A lookup reads the requested locations from the database. Any location whose
+slot is missing, or whose stored coordinates differ from its current ones,
+gets its row and column recomputed (O(n)) under a per-organization file lock
+before the lookup is served. That keeps the files correct across processes
+and across writes made outside the API, with no invalidation messages. A
+full matrix for an organization is computed in vectorized passes when the
+matrix is first needed, and again when it outgrows its capacity. The rebuild
+goes into a new generation directory, which drops slots of deleted locations.
+
+Road distance is the great-circle distance times DISTANCE_ROAD_FACTOR, and
+travel time is road distance at AVERAGE_SPEED_KMH.
+"""
+import fcntl
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+import numpy as np
+from numpy.lib.format import open_memmap
+from sqlalchemy import select
+from app.models import models
+from app.services.geo import haversine_km
+
+logger = logging.getLogger(__name__)
+
+DISTANCE_MATRIX_DIR = os.getenv("DISTANCE_MATRIX_DIR", os.path.join(tempfile.gettempdir(), "fleet-distance-matrix"))
+# Typical ratio of road to great-circle distance
+DISTANCE_ROAD_FACTOR = float(os.getenv("DISTANCE_ROAD_FACTOR", "1.3"))
+AVERAGE_SPEED_KMH = float(os.getenv("AVERAGE_SPEED_KMH", "50"))
+# Organizations with more locations are computed per request instead of stored (n² * 4 bytes)
+DISTANCE_MATRIX_MAX_LOCATIONS = int(os.getenv("DISTANCE_MATRIX_MAX_LOCATIONS", "20000"))
+# Rows computed per vectorized pass of a full build
+BUILD_CHUNK_ROWS = 1024
+
+def _capacity(n):
+    return n + max(16, n // 4)
+
+class OrganizationMatrix:
+    """One generation of an organization's matrix files, memory-mapped"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.count = open_memmap(os.path.join(directory, "count.npy"), mode="r+")
+        self.ids = open_memmap(os.path.join(directory, "ids.npy"), mode="r+")
+        self.coords = open_memmap(os.path.join(directory, "coords.npy"), mode="r+")
+        self.matrix = open_memmap(os.path.join(directory, "matrix.npy"), mode="r+")
+        self._slots = {}
+        self._slots_count = 0
+
+    @property
+    def capacity(self):
+        return len(self.ids)
+
+    def slots(self):
+        """id -> slot, refreshed when other processes have appended"""
+        count = int(self.count[0])
+        if count != self._slots_count:
+            self._slots = {int(row_id): slot for slot, row_id in enumerate(self.ids[:count])}
+            self._slots_count = count
+        return self._slots
+
+    @classmethod
+    def create(cls, directory, ids, coords):
+        os.makedirs(directory)
+        n = len(ids)
+        capacity = _capacity(n)
+        count = open_memmap(os.path.join(directory, "count.npy"), mode="w+", dtype=np.int64, shape=(1,))
+        stored_ids = open_memmap(os.path.join(directory, "ids.npy"), mode="w+", dtype=np.int64, shape=(capacity,))
+        stored_coords = open_memmap(os.path.join(directory, "coords.npy"), mode="w+", dtype=np.float64, shape=(capacity, 2))
+        matrix = open_memmap(os.path.join(directory, "matrix.npy"), mode="w+", dtype=np.float32, shape=(capacity, capacity))
+        stored_ids[:n] = ids
+        stored_coords[:n] = coords
+        for start in range(0, n, BUILD_CHUNK_ROWS):
+            stop = min(n, start + BUILD_CHUNK_ROWS)
+            matrix[start:stop, :n] = haversine_km(
+                coords[start:stop, 0, None], coords[start:stop, 1, None], coords[None, :, 0], coords[None, :, 1]
+            )
+        count[0] = n
+        for array in (stored_ids, stored_coords, matrix, count):
+            array.flush()
+        return cls(directory)
+
+    def write_row(self, slot, coords):
+        """Recompute one location's row and column against every stored slot"""
+        count = max(int(self.count[0]), slot + 1)
+        self.coords[slot] = coords
+        distances = haversine_km(coords[0], coords[1], self.coords[:count, 0], self.coords[:count, 1]).astype(np.float32)
+        distances[slot] = 0
+        self.matrix[slot, :count] = distances
+        self.matrix[:count, slot] = distances
+
+    def append(self, row_id, coords):
+        slot = int(self.count[0])
+        self.ids[slot] = row_id
+        self.write_row(slot, coords)
+        # Readers see the slot only once its row is complete
+        self.count[0] = slot + 1
+        return slot
+
+    def flush(self):
+        for array in (self.ids, self.coords, self.matrix, self.count):
+            array.flush()
+
+class DistanceMatrixStore:
+    def __init__(self, directory=DISTANCE_MATRIX_DIR):
+        self.directory = directory
+        self._open = {}  # organization id -> OrganizationMatrix of the generation last read
+        self._lock = threading.Lock()
+
+    def _organization_dir(self, organization_id):
+        return os.path.join(self.directory, f"org-{organization_id}")
+
+    @contextmanager
+    def _file_lock(self, organization_id):
+        directory = self._organization_dir(organization_id)
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _current(self, organization_id):
+        """The organization's current generation, or None before the first build"""
+        organization_dir = self._organization_dir(organization_id)
+        for _ in range(2):
+            try:
+                with open(os.path.join(organization_dir, "current")) as f:
+                    directory = os.path.join(organization_dir, f.read().strip())
+                opened = self._open.get(organization_id)
+                if opened is None or opened.directory != directory:
+                    opened = OrganizationMatrix(directory)
+                    self._open[organization_id] = opened
+                return opened
+            except FileNotFoundError:
+                # Replaced by a rebuild in another process between reading the pointer and opening
+                continue
+        return None
+
+    def _build(self, db, organization_id, previous):
+        rows = db.execute(
+            select(models.Location.id, models.Location.latitude, models.Location.longitude)
+            .where(
+                models.Location.organization_id == organization_id,
+                models.Location.latitude.isnot(None),
+                models.Location.longitude.isnot(None),
+            )
+            .order_by(models.Location.id)
+        ).all()
+        if len(rows) > DISTANCE_MATRIX_MAX_LOCATIONS:
+            return None
+        ids = np.array([row[0] for row in rows], dtype=np.int64)
+        coords = np.array([(row[1], row[2]) for row in rows], dtype=np.float64).reshape(-1, 2)
+        generation = "gen-1" if previous is None else f"gen-{int(os.path.basename(previous.directory)[4:]) + 1}"
+        organization_dir = self._organization_dir(organization_id)
+        directory = os.path.join(organization_dir, generation)
+        shutil.rmtree(directory, ignore_errors=True)
+        built = OrganizationMatrix.create(directory, ids, coords)
+        pointer = os.path.join(organization_dir, "current")
+        with open(pointer + ".tmp", "w") as f:
+            f.write(generation)
+        os.replace(pointer + ".tmp", pointer)
+        if previous is not None:
+            # Processes that still map the old files keep reading them until their next lookup
+            shutil.rmtree(previous.directory, ignore_errors=True)
+        self._open[organization_id] = built
+        logger.info(f"Built distance matrix for organization {organization_id}: {len(ids)} locations")
+        return built
+
+    def _sync(self, db, organization_id, wanted):
+        """The organization's matrix with every wanted (id, lat, lon) stored at its current coordinates.
+
+        None when the organization has too many locations to store.
+        """
+        stored = self._current(organization_id)
+        if stored is not None and all(_is_current(stored, *location) for location in wanted):
+            return stored
+        with self._file_lock(organization_id):
+            # Another process may have done the work while we waited
+            stored = self._current(organization_id)
+            stale = [location for location in wanted if stored is None or not _is_current(stored, *location)]
+            if not stale:
+                return stored
+            # Many moved locations (a reseed reuses ids) are cheaper to rebuild than to patch
+            if (stored is None or int(stored.count[0]) + len(stale) > stored.capacity
+                    or len(stale) > stored.capacity // 4):
+                return self._build(db, organization_id, stored)
+            slots = stored.slots()
+            for row_id, lat, lon in stale:
+                if row_id in slots:
+                    stored.write_row(slots[row_id], np.array([lat, lon]))
+                else:
+                    stored.append(row_id, np.array([lat, lon]))
+            stored.flush()
+            return stored
+
+    def lookup(self, db, ids):
+        """(k, k) great-circle km between the locations, in the order given.
+
+        Raises KeyError with the ids that do not exist or have no coordinates.
+        """
+        ids = [int(row_id) for row_id in ids]
+        rows = {
+            row.id: row for row in db.execute(
+                select(
+                    models.Location.id, models.Location.organization_id,
+                    models.Location.latitude, models.Location.longitude,
+                ).where(models.Location.id.in_(ids))
+            )
+        }
+        missing = sorted({
+            row_id for row_id in ids
+            if row_id not in rows or rows[row_id].latitude is None or rows[row_id].longitude is None
+        })
+        if missing:
+            raise KeyError(missing)
+
+        result = np.full((len(ids), len(ids)), np.nan, dtype=np.float32)
+        by_organization = {}
+        for position, row_id in enumerate(ids):
+            organization_id = rows[row_id].organization_id
+            if organization_id is not None:
+                by_organization.setdefault(organization_id, []).append(position)
+        for organization_id, positions in by_organization.items():
+            if len(positions) < 2:
+                continue
+            wanted = {(ids[p], rows[ids[p]].latitude, rows[ids[p]].longitude) for p in positions}
+            with self._lock:
+                stored = self._sync(db, organization_id, wanted)
+                if stored is None:
+                    continue
+                slots = stored.slots()
+                indexes = np.array([slots[ids[p]] for p in positions])
+                result[np.ix_(positions, positions)] = stored.matrix[np.ix_(indexes, indexes)]
+
+        # Pairs across organizations are computed
+        first, second = np.nonzero(np.isnan(result))
+        if len(first):
+            lat = np.array([rows[row_id].latitude for row_id in ids], dtype=np.float64)
+            lon = np.array([rows[row_id].longitude for row_id in ids], dtype=np.float64)
+            result[first, second] = haversine_km(lat[first], lon[first], lat[second], lon[second])
+        return result
+
+def _is_current(stored, row_id, lat, lon):
+    slot = stored.slots().get(row_id)
+    if slot is None:
+        return False
+    stored_lat, stored_lon = stored.coords[slot]
+    return stored_lat == lat and stored_lon == lon
+
+def road_km(distance_km):
+    return distance_km * DISTANCE_ROAD_FACTOR
+
+def travel_minutes(distance_km):
+    """Minutes to drive a great-circle distance at the average road speed"""
+    return road_km(distance_km) / AVERAGE_SPEED_KMH * 60
+
+store = DistanceMatrixStore()
@@ -0,0 +1,182 @@
+"""Delivery ETAs from live GPS, ready before anyone asks.
+
+When a GPS fix is written, every open delivery on the vehicle's in-progress
+routes gets a new ETA from the vehicle's latest fix, stored per delivery in a
+cache backend (app.cache.backends). GET /deliveries/tracking/{tracking_number}
+only reads it. Stops are visited from the fix in priority tiers, nearest
+first (as route_optimizer's nearest-neighbour tour). Each leg is timed by
+the GPS speed model (app.services.speed_model) from the hour it starts in,
+with STOP_SERVICE_MINUTES at every stop.
+
+Fixes are seen through app.database.events, so they are handled in the
+process that wrote them. The commit hook only queues the fix ids; one
+background thread per process (events.BackgroundQueue) recomputes, taking every fix queued since its
+last pass at once, so a burst of fixes for a vehicle costs one recompute. With ETA_CACHE_BACKEND=redis every replica reads
+the same entries. An entry expires after ETA_CACHE_TTL_SECONDS without a new
+fix, and a write to its delivery drops it until the vehicle's next fix.
+"""
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import select
+from app.cache import make_backend
+from app.database import events
+from app.database.config import SessionLocal
+from app.models import models
+from app.services import distance_matrix, route_optimizer
+from app.services.geo import haversine_km
+from app.services.speed_model import model
+from app.services.speed_profile import profile
+
+logger = logging.getLogger(__name__)
+
+ETA_CACHE_BACKEND = os.getenv("ETA_CACHE_BACKEND", "memory")
+ETA_CACHE_SIZE = int(os.getenv("ETA_CACHE_SIZE", "100000"))
+ETA_CACHE_TTL_SECONDS = int(os.getenv("ETA_CACHE_TTL_SECONDS", "3600"))
+
+cache = make_backend(ETA_CACHE_BACKEND, ETA_CACHE_SIZE, ETA_CACHE_TTL_SECONDS)
+
+def key(delivery_id):
+    return f"eta:{delivery_id}"
+
+def get(delivery_id):
+    """The delivery's cached ETA as a dict, or None"""
+    if cache is None:
+        return None
+    try:
+        cached = cache.get(key(delivery_id))
+    except Exception as e:
+        logger.warning(f"ETA cache read failed: {e}")
+        return None
+    return None if cached is None else json.loads(cached)
+
+def variant(delivery_id):
+    """ETag token of the delivery's ETA: the fix it was computed from"""
+    entry = get(delivery_id)
+    return None if entry is None else str(entry["fix_id"])
+
+def latest_fix(db, vehicle_id):
+    return db.execute(
+        select(models.GPSTracking)
+        .where(models.GPSTracking.vehicle_id == vehicle_id)
+        .order_by(models.GPSTracking.timestamp.desc())
+        .limit(1)
+    ).scalar()
+
+def arrivals(fix, stops):
+    """Nearest-neighbour tour from the fix over stops, (lat, lon, tier) tuples.
+
+    Returns the visiting order as positions in stops, and the (arrival,
+    cumulative road km) of each stop in that order.
+    """
+    lat = np.array([fix.latitude] + [stop[0] for stop in stops], dtype=np.float64)
+    lon = np.array([fix.longitude] + [stop[1] for stop in stops], dtype=np.float64)
+    # The tour ends wherever the last stop is: a free destination node
+    distances = np.zeros((len(stops) + 2, len(stops) + 2))
+    distances[:-1, :-1] = distance_matrix.road_km(haversine_km(lat[:, None], lon[:, None], lat, lon))
+    problem = route_optimizer.Problem(
+        distances, [stop[2] for stop in stops], np.full(len(stops), np.nan), 60 / distance_matrix.AVERAGE_SPEED_KMH
+    )
+    path = problem.nearest_neighbour()
+    clock, driven, result = fix.timestamp, 0.0, []
+    for previous, node in zip(path[:-2], path[1:-1]):
+        minutes, leg = model.travel_minutes(lat[previous], lon[previous], lat[node], lon[node], clock)
+        clock += timedelta(minutes=minutes)
+        driven += leg
+        result.append((clock, driven))
+        clock += timedelta(minutes=route_optimizer.SERVICE_MINUTES)
+    return path[1:-1] - 1, result
+
+def refresh_vehicles(db, vehicle_ids):
+    """Recompute and cache the ETAs of the deliveries the vehicles carry; returns how many were stored"""
+    if cache is None:
+        return 0
+    rows = db.execute(
+        select(
+            models.Delivery.id, models.Delivery.priority, models.Route.id.label("route_id"), models.Route.vehicle_id,
+            models.Location.latitude, models.Location.longitude,
+        )
+        .join(models.Route, models.Route.id == models.Delivery.route_id)
+        .join(models.Location, models.Location.id == models.Delivery.location_id)
+        .where(
+            models.Route.vehicle_id.in_(vehicle_ids),
+            models.Route.status == "in_progress",
+            models.Delivery.status.in_(route_optimizer.OPEN_STATUSES),
+            models.Location.latitude.isnot(None),
+            models.Location.longitude.isnot(None),
+        )
+        .order_by(models.Delivery.id)
+    ).all()
+    by_vehicle = {}
+    for row in rows:
+        by_vehicle.setdefault(row.vehicle_id, []).append(row)
+
+    stored = 0
+    computed_at = datetime.utcnow()
+    for vehicle_id, deliveries in by_vehicle.items():
+        fix = latest_fix(db, vehicle_id)
+        if fix is None or fix.latitude is None or fix.longitude is None:
+            continue
+        tiers = [route_optimizer.PRIORITY_TIERS.get(row.priority, len(route_optimizer.PRIORITY_TIERS)) for row in deliveries]
+        order, timeline = arrivals(fix, [(row.latitude, row.longitude, tier) for row, tier in zip(deliveries, tiers)])
+        for stops_before, (position, (arrival, remaining_km)) in enumerate(zip(order.tolist(), timeline)):
+            row = deliveries[position]
+            entry = {
+                "vehicle_id": vehicle_id,
+                "route_id": row.route_id,
+                "estimated_arrival": arrival.isoformat(),
+                "remaining_km": round(remaining_km, 3),
+                "stops_before": stops_before,
+                "fix_id": fix.id,
+                "fix_timestamp": fix.timestamp.isoformat(),
+                "computed_at": computed_at.isoformat(),
+            }
+            try:
+                cache.set(key(row.id), json.dumps(entry))
+                stored += 1
+            except Exception as e:
+                logger.warning(f"ETA cache write failed: {e}")
+    return stored
+
+def stats():
+    if cache is None:
+        return {"backend": "none"}
+    return {
+        "backend": cache.name,
+        "entries": cache.size(),
+        "ttl_seconds": cache.ttl_seconds,
+        "pending_fixes": recompute.pending(),
+        "speed_profile": profile.stats(),
+        "speed_model": model.stats(),
+        **cache.stats.to_dict(),
+    }
+
+def refresh_fixes(fix_ids):
+    """Recompute the ETAs of the vehicles that wrote the fixes"""
+    vehicle_ids = set()
+    with SessionLocal() as db:
+        for start in range(0, len(fix_ids), 10000):
+            vehicle_ids.update(db.scalars(
+                select(models.GPSTracking.vehicle_id)
+                .where(models.GPSTracking.id.in_(fix_ids[start:start + 10000]))
+                .distinct()
+            ))
+        vehicle_ids.discard(None)
+        if vehicle_ids:
+            refresh_vehicles(db, sorted(vehicle_ids))
+
+recompute = events.BackgroundQueue("eta-recompute", refresh_fixes)
+
+@events.subscribe
+def _written(table, ids):
+    if cache is None:
+        return
+    if table == models.Delivery.__tablename__:
+        if ids is None:
+            cache.delete_prefix("eta:")
+        else:
+            cache.delete([key(delivery_id) for delivery_id in ids])
+    elif table == models.GPSTracking.__tablename__ and ids:
+        recompute.add(ids)
@@ -0,0 +1,22 @@
+"""Great-circle geometry on NumPy arrays of degrees."""
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+def unit_vectors(lat, lon):
+    """(n, 3) points on the unit sphere; straight-line (chord) order equals great-circle order"""
+    lat, lon = np.radians(np.asarray(lat, dtype=np.float64)), np.radians(np.asarray(lon, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)], axis=-1)
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord) / 2, 0.0, 1.0))
+
+def km_to_chord(km):
+    return 2 * np.sin(np.minimum(np.asarray(km) / (2 * EARTH_RADIUS_KM), np.pi / 2))
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance; the arguments broadcast against each other"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(value, dtype=np.float64)) for value in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
@@ -0,0 +1,236 @@
+"""In-memory spatial index over location coordinates.
+
+Nearest-neighbour queries walk a KD-tree over the locations as points on the
+unit sphere: straight-line distance there orders points exactly as
+great-circle distance does, with no special cases at the poles or the
+antimeridian. Bounding-box queries use the locations sorted by latitude.
+
+Both structures are static and built on first use. Locations written since
+the build are held in a small delta, searched by brute force, and folded in
+by the next rebuild. Before every query the index reads the locations logged
+in change_log (app.services.changelog) since its last read, so it sees
+writes from every process; a reset of the table rebuilds it.
+"""
+import heapq
+import logging
+import os
+import threading
+import time
+import numpy as np
+from sqlalchemy import select
+from app.models import models
+from app.services import changelog
+from app.services.geo import unit_vectors, chord_to_km, km_to_chord, haversine_km
+
+logger = logging.getLogger(__name__)
+
+GEO_LEAF_SIZE = 32
+# Locations changed since the build kept as a delta before the index is rebuilt
+GEO_MAX_DELTA = int(os.getenv("GEO_MAX_DELTA", "10000"))
+
+class KDTree:
+    """Static KD-tree over (n, 3) points with leaf buckets and per-node bounding boxes"""
+
+    def __init__(self, points, leaf_size=GEO_LEAF_SIZE):
+        self.points = points
+        self.order = np.arange(len(points))
+        self.starts, self.stops, self.children, lows, highs = [], [], [], [], []
+        if len(points):
+            self._build(0, len(points), leaf_size, lows, highs)
+        self.lows, self.highs = np.array(lows), np.array(highs)
+
+    def _build(self, start, stop, leaf_size, lows, highs):
+        node = len(self.starts)
+        segment = self.order[start:stop]
+        low, high = self.points[segment].min(axis=0), self.points[segment].max(axis=0)
+        self.starts.append(start)
+        self.stops.append(stop)
+        self.children.append(None)
+        lows.append(low)
+        highs.append(high)
+        if stop - start > leaf_size:
+            # Split the widest axis at the median
+            axis = int(np.argmax(high - low))
+            middle = (start + stop) // 2
+            self.order[start:stop] = segment[np.argpartition(self.points[segment, axis], middle - start)]
+            self.children[node] = (
+                self._build(start, middle, leaf_size, lows, highs),
+                self._build(middle, stop, leaf_size, lows, highs),
+            )
+        return node
+
+    def _box_distance(self, node, point):
+        excess = np.maximum(self.lows[node] - point, 0) + np.maximum(point - self.highs[node], 0)
+        return float(np.sqrt(excess @ excess))
+
+    def nearest(self, point, k, max_distance=np.inf):
+        """[(distance, position in points)] of the k nearest within max_distance, nearest first"""
+        if not len(self.points) or k < 1:
+            return []
+        best = []  # max-heap of (-distance, position)
+        frontier = [(self._box_distance(0, point), 0)]
+        while frontier:
+            bound, node = heapq.heappop(frontier)
+            if bound > (-best[0][0] if len(best) == k else max_distance):
+                break
+            if self.children[node] is not None:
+                for child in self.children[node]:
+                    heapq.heappush(frontier, (self._box_distance(child, point), child))
+                continue
+            positions = self.order[self.starts[node]:self.stops[node]]
+            distances = np.sqrt(((self.points[positions] - point) ** 2).sum(axis=1))
+            for distance, position in zip(distances.tolist(), positions.tolist()):
+                if len(best) < k:
+                    if distance <= max_distance:
+                        heapq.heappush(best, (-distance, position))
+                elif distance < -best[0][0]:
+                    heapq.heapreplace(best, (-distance, position))
+        return sorted((-negative, position) for negative, position in best)
+
+class LocationIndex:
+    def __init__(self):
+        self._ids = np.empty(0, dtype=np.int64)
+        self._lat = np.empty(0)
+        self._lon = np.empty(0)
+        self._tree = KDTree(np.empty((0, 3)))
+        self._by_lat = np.empty(0, dtype=np.int64)
+        self._sorted_lat = np.empty(0)
+        self._delta = {}  # id -> (lat, lon), or None once deleted or without coordinates
+        self._dirty = set()
+        self._cursor = 0  # newest change_log id applied
+        self._caught_up_at = 0.0
+        self._stale = True
+        self._lock = threading.Lock()
+
+    def _located(self):
+        return select(models.Location.id, models.Location.latitude, models.Location.longitude).where(
+            models.Location.latitude.isnot(None), models.Location.longitude.isnot(None)
+        )
+
+    def _build(self, db):
+        # Read the cursor first: changes committed during the build are applied again, which is harmless
+        self._cursor = changelog.horizon(db)
+        rows = db.execute(self._located().order_by(models.Location.id)).all()
+        self._ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self._lat = np.array([row[1] for row in rows], dtype=np.float64)
+        self._lon = np.array([row[2] for row in rows], dtype=np.float64)
+        self._tree = KDTree(unit_vectors(self._lat, self._lon).reshape(-1, 3))
+        self._by_lat = np.argsort(self._lat, kind="stable")
+        self._sorted_lat = self._lat[self._by_lat]
+        self._delta = {}
+        self._dirty = set()
+        self._stale = False
+        self._caught_up_at = time.monotonic()
+        logger.info(f"Built spatial index over {len(self._ids)} locations")
+
+    def refresh(self, db):
+        """Fold in pending writes, rebuilding when stale; queries call this themselves"""
+        with self._lock:
+            self._refresh(db)
+
+    def _catch_up(self, db):
+        """Mark the locations logged since the cursor dirty, or the index stale after a reset"""
+        # Entries older than the change log's retention may be pruned before they are read
+        if time.monotonic() - self._caught_up_at > changelog.CHANGE_RETENTION_DAYS * 86400 / 2:
+            self._stale = True
+            return
+        final = changelog.horizon(db, self._cursor)
+        changed = set(db.scalars(
+            select(models.ChangeLog.row_id)
+            .where(
+                models.ChangeLog.table_name == models.Location.__tablename__,
+                models.ChangeLog.id > self._cursor, models.ChangeLog.id <= final,
+            )
+        ))
+        self._cursor = max(self._cursor, final)
+        if None in changed:
+            self._stale = True
+        self._dirty.update(changed)
+        self._caught_up_at = time.monotonic()
+
+    def _refresh(self, db):
+        if not self._stale:
+            self._catch_up(db)
+        if not self._stale and len(self._delta) + len(self._dirty) > GEO_MAX_DELTA:
+            self._stale = True
+        if self._stale:
+            self._build(db)
+            return
+        dirty, self._dirty = list(self._dirty), set()
+        for start in range(0, len(dirty), 10000):
+            chunk = dirty[start:start + 10000]
+            self._delta.update(dict.fromkeys(chunk))
+            self._delta.update(
+                (row_id, (lat, lon)) for row_id, lat, lon in db.execute(self._located().where(models.Location.id.in_(chunk)))
+            )
+
+    def _delta_points(self):
+        """(ids, lat, lon) of the located rows in the delta"""
+        located = [(row_id, point) for row_id, point in self._delta.items() if point is not None]
+        ids = np.array([row_id for row_id, _ in located], dtype=np.int64)
+        lat = np.array([point[0] for _, point in located], dtype=np.float64)
+        lon = np.array([point[1] for _, point in located], dtype=np.float64)
+        return ids, lat, lon
+
+    def nearest(self, db, lat, lon, k=10, max_km=None):
+        """[(location id, distance km)] of the k nearest locations, nearest first"""
+        max_chord = np.inf if max_km is None else float(km_to_chord(max_km))
+        with self._lock:
+            self._refresh(db)
+            # Rows in the delta may also be in the tree at a stale position; ask for enough to drop them
+            found = self._tree.nearest(unit_vectors(lat, lon), k + len(self._delta), max_chord)
+            hits = [
+                (int(self._ids[position]), float(chord_to_km(chord))) for chord, position in found
+                if int(self._ids[position]) not in self._delta
+            ]
+            ids, delta_lat, delta_lon = self._delta_points()
+        if len(ids):
+            distances = haversine_km(lat, lon, delta_lat, delta_lon)
+            hits += [
+                (row_id, distance) for row_id, distance in zip(ids.tolist(), distances.tolist())
+                if max_km is None or distance <= max_km
+            ]
+        return sorted(hits, key=lambda hit: hit[1])[:k]
+
+    def coordinates(self, db, location_id):
+        """(lat, lon) of a location, or None when it does not exist or has no coordinates"""
+        with self._lock:
+            self._refresh(db)
+            if location_id in self._delta:
+                return self._delta[location_id]
+            position = int(np.searchsorted(self._ids, location_id))
+            if position < len(self._ids) and self._ids[position] == location_id:
+                return float(self._lat[position]), float(self._lon[position])
+            return None
+
+    def within(self, db, min_lat, min_lon, max_lat, max_lon):
+        """Sorted ids of locations in the box; min_lon > max_lon spans the antimeridian"""
+        with self._lock:
+            self._refresh(db)
+            start = np.searchsorted(self._sorted_lat, min_lat, side="left")
+            stop = np.searchsorted(self._sorted_lat, max_lat, side="right")
+            positions = self._by_lat[start:stop]
+            ids = self._ids[positions][_in_lon_range(self._lon[positions], min_lon, max_lon)]
+            if self._delta:
+                changed = np.fromiter(self._delta, dtype=np.int64, count=len(self._delta))
+                ids = ids[~np.isin(ids, changed)]
+                delta_ids, delta_lat, delta_lon = self._delta_points()
+                inside = (delta_lat >= min_lat) & (delta_lat <= max_lat) & _in_lon_range(delta_lon, min_lon, max_lon)
+                ids = np.concatenate([ids, delta_ids[inside]])
+        return np.sort(ids).tolist()
+
+    def stats(self):
+        return {
+            "locations": len(self._ids),
+            "delta": len(self._delta),
+            "pending": len(self._dirty),
+            "stale": self._stale,
+            "cursor": self._cursor,
+        }
+
+def _in_lon_range(lon, min_lon, max_lon):
+    if min_lon <= max_lon:
+        return (lon >= min_lon) & (lon <= max_lon)
+    return (lon >= min_lon) | (lon <= max_lon)
+
+locations = LocationIndex()
@@ -0,0 +1,348 @@
+"""Persistent background job queue for operations that outlive an HTTP request.
+
+Jobs are rows in the jobs table. Worker threads (in the API process, or in the
+scripts/job_worker.py sidecar) claim the highest-priority runnable job with a
+conditional UPDATE; on Postgres the candidate is selected FOR UPDATE SKIP
+LOCKED, so any number of replicas can share the queue without running a job
+twice. Running jobs are kept alive by a heartbeat; a job whose worker stops
+heartbeating is requeued (or failed, once out of attempts).
+"""
+from sqlalchemy import select, update, func
+from datetime import datetime, timedelta
+import importlib
+import logging
+import os
+import socket
+import threading
+import time
+from app.database import crud
+from app.database.config import SessionLocal
+from app.models.models import Job
+
+logger = logging.getLogger(__name__)
+
+# Worker threads started by the API process; 0 leaves execution to scripts/job_worker.py
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", str(os.cpu_count() or 1)))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+# A running job whose heartbeat is older than this is presumed lost
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "120"))
+JOB_RETRY_DELAY_SECONDS = float(os.getenv("JOB_RETRY_DELAY_SECONDS", "10"))
+# Minimum interval between progress writes of one job
+PROGRESS_INTERVAL_SECONDS = 1.0
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+# Modules whose import registers job handlers and maintenance tasks
+HANDLER_MODULES = (
+    "app.services.seed_generator", "app.services.snapshots", "app.services.changelog", "app.services.speed_model",
+    "app.services.csv_import",
+)
+
+class Handler:
+    def __init__(self, kind, run, priority, max_attempts):
+        self.kind = kind
+        self.run = run
+        self.priority = priority
+        self.max_attempts = max_attempts
+
+HANDLERS = {}
+
+def job_handler(kind, priority=0, max_attempts=1):
+    """Register run(context, **params) as the handler for a job kind"""
+    def decorator(func):
+        HANDLERS[kind] = Handler(kind, func, priority, max_attempts)
+        return func
+    return decorator
+
+# Housekeeping run on every heartbeat of every worker pool
+MAINTENANCE_TASKS = []
+
+def maintenance_task(func):
+    MAINTENANCE_TASKS.append(func)
+    return func
+
+def load_handlers():
+    for module in HANDLER_MODULES:
+        importlib.import_module(module)
+
+class JobCancelled(Exception):
+    pass
+
+class JobContext:
+    """Handed to handlers for progress reporting and cooperative cancellation"""
+
+    def __init__(self, job_id, worker_id):
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.progress = {}
+        self._cancel_requested = False
+        self._flushed_at = 0.0
+
+    def set_totals(self, totals):
+        """Declare the steps of the job and how many units each has"""
+        self.progress = {step: {"done": 0, "total": total} for step, total in totals.items()}
+        self.flush()
+
+    def report(self, step, done, total=None):
+        entry = self.progress.setdefault(step, {"done": 0, "total": total or 0})
+        entry["done"] = done
+        if total is not None:
+            entry["total"] = total
+        if time.monotonic() - self._flushed_at >= PROGRESS_INTERVAL_SECONDS:
+            self.flush()
+        self.check_cancelled()
+
+    def flush(self):
+        """Persist progress and pick up a pending cancellation request"""
+        self._flushed_at = time.monotonic()
+        with SessionLocal() as db:
+            statement = (
+                update(Job)
+                .where(Job.id == self.job_id)
+                .values(progress=self.progress, heartbeat_at=datetime.utcnow())
+                .returning(Job.cancel_requested)
+            )
+            self._cancel_requested = bool(db.scalars(statement).first())
+            db.commit()
+
+    def check_cancelled(self):
+        if self._cancel_requested:
+            raise JobCancelled()
+
+def percent(job):
+    if job.status == SUCCEEDED:
+        return 100.0
+    steps = (job.progress or {}).values()
+    total = sum(step["total"] for step in steps)
+    if not total:
+        return 0.0
+    return round(100.0 * sum(step["done"] for step in steps) / total, 1)
+
+def to_dict(job):
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "params": job.params,
+        "status": job.status,
+        "priority": job.priority,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "cancel_requested": job.cancel_requested,
+        "percent": percent(job),
+        "progress": job.progress,
+        "result": job.result,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+def accepted(job):
+    """Response body for endpoints that queue a job"""
+    return {
+        "status": "accepted",
+        "job_id": job.id,
+        "status_url": f"/jobs/{job.id}"
+    }
+
+# Queue operations
+
+def enqueue(db, kind, params=None, priority=None, max_attempts=None, run_after=None):
+    """Add a job to the queue and return its row"""
+    handler = HANDLERS.get(kind)
+    return crud.create_returning(db, Job, {
+        "kind": kind,
+        "params": params or {},
+        "status": QUEUED,
+        "priority": priority if priority is not None else (handler.priority if handler else 0),
+        "max_attempts": max_attempts or (handler.max_attempts if handler else 1),
+        "run_after": run_after or datetime.utcnow(),
+        "created_at": datetime.utcnow(),
+    })
+
+def claim(worker_id):
+    """Take the next runnable job, or None. Safe against concurrent claimers.
+
+    One UPDATE ... WHERE id = (SELECT ... FOR UPDATE SKIP LOCKED) statement: on
+    Postgres competing workers skip each other's candidate row, and the status
+    guard keeps the claim atomic on databases without SKIP LOCKED.
+    """
+    now = datetime.utcnow()
+    candidate = (
+        select(Job.id)
+        .where(Job.status == QUEUED, Job.run_after <= now)
+        .order_by(Job.priority.desc(), Job.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    statement = (
+        update(Job)
+        .where(Job.id == candidate, Job.status == QUEUED)
+        .values(
+            status=RUNNING,
+            locked_by=worker_id,
+            heartbeat_at=now,
+            started_at=func.coalesce(Job.started_at, now),
+            attempts=Job.attempts + 1,
+        )
+        .returning(Job)
+        .execution_options(synchronize_session=False)
+    )
+    with SessionLocal() as db:
+        job = db.scalars(statement).first()
+        if job is None:
+            db.rollback()
+            return None
+        db.expunge(job)
+        db.commit()
+        return job
+
+def _complete(job, worker_id, values):
+    # Guarded by the lease so a worker presumed lost cannot overwrite a retry
+    with SessionLocal() as db:
+        db.execute(
+            update(Job)
+            .where(Job.id == job.id, Job.locked_by == worker_id, Job.status == RUNNING)
+            .values(locked_by=None, **values)
+        )
+        db.commit()
+
+def execute(job, worker_id):
+    """Run a claimed job and record its outcome"""
+    handler = HANDLERS.get(job.kind)
+    context = JobContext(job.id, worker_id)
+    now = datetime.utcnow
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for job kind '{job.kind}'")
+        result = handler.run(context, **(job.params or {}))
+    except JobCancelled:
+        logger.info(f"Job {job.id} ({job.kind}) cancelled")
+        _complete(job, worker_id, {"status": CANCELLED, "progress": context.progress, "finished_at": now()})
+    except Exception as e:
+        if job.attempts < job.max_attempts:
+            delay = JOB_RETRY_DELAY_SECONDS * 2 ** (job.attempts - 1)
+            logger.warning(f"Job {job.id} ({job.kind}) failed, retrying in {delay:.0f}s: {e}")
+            _complete(job, worker_id, {
+                "status": QUEUED, "error": str(e), "run_after": now() + timedelta(seconds=delay)
+            })
+        else:
+            logger.exception(f"Job {job.id} ({job.kind}) failed")
+            _complete(job, worker_id, {
+                "status": FAILED, "error": str(e), "progress": context.progress, "finished_at": now()
+            })
+    else:
+        _complete(job, worker_id, {
+            "status": SUCCEEDED, "result": result, "error": None, "progress": context.progress,
+            "finished_at": now()
+        })
+
+def cancel(db, job_id):
+    """Cancel a queued job outright; ask a running one to stop at its next progress report.
+
+    Returns the job, or None if it does not exist.
+    """
+    now = datetime.utcnow()
+    db.execute(
+        update(Job).where(Job.id == job_id, Job.status == QUEUED)
+        .values(status=CANCELLED, cancel_requested=True, finished_at=now)
+    )
+    db.execute(update(Job).where(Job.id == job_id, Job.status == RUNNING).values(cancel_requested=True))
+    db.commit()
+    return db.get(Job, job_id)
+
+def requeue_stale():
+    """Return jobs whose worker stopped heartbeating to the queue, or fail them when out of attempts"""
+    cutoff = datetime.utcnow() - timedelta(seconds=JOB_LEASE_SECONDS)
+    stale = (Job.status == RUNNING, Job.heartbeat_at < cutoff)
+    with SessionLocal() as db:
+        failed = db.execute(
+            update(Job).where(*stale, Job.attempts >= Job.max_attempts)
+            .values(status=FAILED, locked_by=None, error="Worker stopped responding", finished_at=datetime.utcnow())
+        ).rowcount
+        requeued = db.execute(
+            update(Job).where(*stale).values(status=QUEUED, locked_by=None, run_after=datetime.utcnow())
+        ).rowcount
+        db.commit()
+    if failed or requeued:
+        logger.warning(f"Recovered stale jobs: {requeued} requeued, {failed} failed")
+
+class WorkerPool:
+    """Worker threads that poll the queue, plus a heartbeat for the jobs they run"""
+
+    def __init__(self, workers=JOB_WORKERS, poll_seconds=JOB_POLL_SECONDS):
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self._running = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        load_handlers()
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._work, args=(f"{self.name}:{i}",), name=f"job-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        self._threads.append(threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True))
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Started {self.workers} job workers")
+
+    def stop(self, timeout=10):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _work(self, worker_id):
+        while not self._stop.is_set():
+            try:
+                job = claim(worker_id)
+            except Exception as e:
+                logger.error(f"Job worker {worker_id} could not poll the queue: {e}")
+                job = None
+            if job is None:
+                self._stop.wait(self.poll_seconds)
+                continue
+            with self._lock:
+                self._running[job.id] = worker_id
+            try:
+                execute(job, worker_id)
+            except Exception as e:
+                # Recording the outcome failed; the heartbeat lease recovers the job
+                logger.error(f"Job worker {worker_id} could not record job {job.id}: {e}")
+            finally:
+                with self._lock:
+                    self._running.pop(job.id, None)
+
+    def _heartbeat(self):
+        while not self._stop.wait(JOB_LEASE_SECONDS / 4):
+            try:
+                with self._lock:
+                    running = list(self._running)
+                if running:
+                    with SessionLocal() as db:
+                        db.execute(
+                            update(Job).where(Job.id.in_(running), Job.status == RUNNING)
+                            .values(heartbeat_at=datetime.utcnow())
+                        )
+                        db.commit()
+                requeue_stale()
+            except Exception as e:
+                logger.error(f"Job heartbeat failed: {e}")
+            for task in MAINTENANCE_TASKS:
+                try:
+                    task()
+                except Exception as e:
+                    logger.error(f"Maintenance task {task.__name__} failed: {e}")
+
+job_pool = WorkerPool()
@@ -0,0 +1,247 @@
+"""Progress and corridor deviation of in-progress routes, from live GPS.
+
+A route's corridor is the great circle from its origin to its destination
+location, ROUTE_CORRIDOR_KM wide on each side plus ROUTE_CORRIDOR_SHARE of
+the route's length, since roads bend further from the line on long routes.
+Each GPS fix written for a vehicle updates the state of its in-progress
+routes from that fix alone:
+- percent complete is the fix's along-track distance over the route length;
+- cross-track distance is its distance from the corridor's centre line, or
+  from the nearer end when it is before the origin or past the destination.
+
+A fix outside the corridor raises a "deviation" event, which is logged and
+kept with the route. The next fix back within ROUTE_RETURN_SHARE of the
+corridor width raises a "returned" event. Fixes older than the last one seen
+are ignored. The GPS commit hook only queues the fix ids, and a background
+thread (events.BackgroundQueue) advances the routes. The per-route state is stored in a cache backend
+(app.cache.backends), so GET /routes/{id}/progress only reads it. Use
+ROUTE_MONITOR_BACKEND=redis to share it between replicas.
+"""
+import json
+import logging
+import os
+from datetime import datetime
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+from app.cache import make_backend
+from app.database import events
+from app.database.config import SessionLocal
+from app.models import models
+from app.services import distance_matrix
+from app.services.geo import EARTH_RADIUS_KM, unit_vectors
+
+logger = logging.getLogger(__name__)
+
+ROUTE_MONITOR_BACKEND = os.getenv("ROUTE_MONITOR_BACKEND", "memory")
+ROUTE_MONITOR_SIZE = int(os.getenv("ROUTE_MONITOR_SIZE", "100000"))
+ROUTE_MONITOR_TTL_SECONDS = int(os.getenv("ROUTE_MONITOR_TTL_SECONDS", "86400"))
+ROUTE_CORRIDOR_KM = float(os.getenv("ROUTE_CORRIDOR_KM", "10"))
+ROUTE_CORRIDOR_SHARE = float(os.getenv("ROUTE_CORRIDOR_SHARE", "0.1"))
+# Back inside this share of the corridor width ends a deviation, so a fix on the edge doesn't flap
+ROUTE_RETURN_SHARE = 0.8
+EVENTS_KEPT = 50
+
+cache = make_backend(ROUTE_MONITOR_BACKEND, ROUTE_MONITOR_SIZE, ROUTE_MONITOR_TTL_SECONDS)
+
+def key(route_id):
+    return f"progress:{route_id}"
+
+def get(route_id):
+    """The route's monitor state as a dict, or None"""
+    if cache is None:
+        return None
+    try:
+        cached = cache.get(key(route_id))
+    except Exception as e:
+        logger.warning(f"Route monitor read failed: {e}")
+        return None
+    return None if cached is None else json.loads(cached)
+
+class Corridor:
+    def __init__(self, origin_lat, origin_lon, destination_lat, destination_lon):
+        self.a = unit_vectors(origin_lat, origin_lon)
+        self.b = unit_vectors(destination_lat, destination_lon)
+        normal = np.cross(self.a, self.b)
+        length = float(np.linalg.norm(normal))
+        self.angle = float(np.arctan2(length, self.a @ self.b))
+        # Origin and destination the same place: no line to follow, only distance from it
+        self.normal = normal / length if length > 1e-12 else None
+        self.km = self.angle * EARTH_RADIUS_KM
+        self.width_km = ROUTE_CORRIDOR_KM + ROUTE_CORRIDOR_SHARE * self.km
+
+    @staticmethod
+    def _angle(u, v):
+        return float(np.arctan2(np.linalg.norm(np.cross(u, v)), u @ v))
+
+    def locate(self, lat, lon):
+        """(along-track km clipped to the route, cross-track km) of a point"""
+        p = unit_vectors(lat, lon)
+        if self.normal is None:
+            return 0.0, self._angle(self.a, p) * EARTH_RADIUS_KM
+        offset = float(p @ self.normal)
+        q = p - offset * self.normal
+        along = float(np.arctan2(np.cross(self.a, q) @ self.normal, self.a @ q))
+        if along < 0:
+            return 0.0, self._angle(self.a, p) * EARTH_RADIUS_KM
+        if along > self.angle:
+            return self.km, self._angle(self.b, p) * EARTH_RADIUS_KM
+        return along * EARTH_RADIUS_KM, abs(float(np.arcsin(np.clip(offset, -1, 1)))) * EARTH_RADIUS_KM
+
+def new_state(route_id, vehicle_id):
+    return {
+        "route_id": route_id,
+        "vehicle_id": vehicle_id,
+        "fixes": 0,
+        "last_fix_id": None,
+        "last_fix_timestamp": None,
+        "latitude": None,
+        "longitude": None,
+        "percent_complete": None,
+        "remaining_km": None,
+        "cross_track_km": None,
+        "max_cross_track_km": 0.0,
+        "corridor_km": None,
+        "deviating": False,
+        "events": [],
+    }
+
+def advance(state, corridor, fix):
+    """Move the state on by one fix; returns the event raised, if any"""
+    if state["last_fix_timestamp"] and fix.timestamp < datetime.fromisoformat(state["last_fix_timestamp"]):
+        return None
+    along_km, cross_km = corridor.locate(fix.latitude, fix.longitude)
+    state.update(
+        fixes=state["fixes"] + 1,
+        last_fix_id=fix.id,
+        last_fix_timestamp=fix.timestamp.isoformat(),
+        latitude=fix.latitude,
+        longitude=fix.longitude,
+        percent_complete=round(100 * along_km / corridor.km, 1) if corridor.km else None,
+        remaining_km=round(distance_matrix.road_km(corridor.km - along_km), 3),
+        cross_track_km=round(cross_km, 3),
+        max_cross_track_km=round(max(state["max_cross_track_km"], cross_km), 3),
+        corridor_km=round(corridor.width_km, 3),
+    )
+    if not state["deviating"] and cross_km > corridor.width_km:
+        kind = "deviation"
+    elif state["deviating"] and cross_km <= corridor.width_km * ROUTE_RETURN_SHARE:
+        kind = "returned"
+    else:
+        return None
+    state["deviating"] = kind == "deviation"
+    event = {
+        "type": kind,
+        "fix_id": fix.id,
+        "timestamp": fix.timestamp.isoformat(),
+        "latitude": fix.latitude,
+        "longitude": fix.longitude,
+        "cross_track_km": round(cross_km, 3),
+    }
+    state["events"] = (state["events"] + [event])[-EVENTS_KEPT:]
+    return event
+
+def _routes(db, vehicle_ids):
+    """In-progress routes of the vehicles with their origin and destination coordinates"""
+    origin, destination = aliased(models.Location), aliased(models.Location)
+    return db.execute(
+        select(
+            models.Route.id, models.Route.vehicle_id,
+            origin.latitude.label("origin_lat"), origin.longitude.label("origin_lon"),
+            destination.latitude.label("destination_lat"), destination.longitude.label("destination_lon"),
+        )
+        .join(origin, origin.id == models.Route.origin_location_id)
+        .join(destination, destination.id == models.Route.destination_location_id)
+        .where(
+            models.Route.vehicle_id.in_(vehicle_ids),
+            models.Route.status == "in_progress",
+            origin.latitude.isnot(None), origin.longitude.isnot(None),
+            destination.latitude.isnot(None), destination.longitude.isnot(None),
+        )
+    ).all()
+
+def track(db, fixes):
+    """Advance the in-progress routes of the fixes' vehicles; returns how many routes were updated"""
+    if cache is None:
+        return 0
+    by_vehicle = {}
+    located = [
+        fix for fix in fixes
+        if fix.vehicle_id is not None and fix.latitude is not None and fix.longitude is not None and fix.timestamp
+    ]
+    for fix in sorted(located, key=lambda fix: (fix.timestamp, fix.id)):
+        by_vehicle.setdefault(fix.vehicle_id, []).append(fix)
+    if not by_vehicle:
+        return 0
+    updated = 0
+    for route in _routes(db, list(by_vehicle)):
+        corridor = Corridor(route.origin_lat, route.origin_lon, route.destination_lat, route.destination_lon)
+        state = get(route.id) or new_state(route.id, route.vehicle_id)
+        state["vehicle_id"] = route.vehicle_id
+        for fix in by_vehicle[route.vehicle_id]:
+            event = advance(state, corridor, fix)
+            if event and event["type"] == "deviation":
+                logger.warning(
+                    f"Route {route.id} (vehicle {route.vehicle_id}) is {event['cross_track_km']:.1f} km off its "
+                    f"corridor at fix {fix.id}"
+                )
+        try:
+            cache.set(key(route.id), json.dumps(state))
+            updated += 1
+        except Exception as e:
+            logger.warning(f"Route monitor write failed: {e}")
+    return updated
+
+def progress(db, route):
+    """GET /routes/{id}/progress body; a route with no state yet starts from its vehicle's latest fix"""
+    state = get(route.id)
+    if state is None and route.status == "in_progress" and route.vehicle_id is not None:
+        fix = db.execute(
+            select(models.GPSTracking)
+            .where(models.GPSTracking.vehicle_id == route.vehicle_id)
+            .order_by(models.GPSTracking.timestamp.desc())
+            .limit(1)
+        ).scalar()
+        if fix is not None:
+            track(db, [fix])
+            state = get(route.id)
+    return {
+        **(state or new_state(route.id, route.vehicle_id)),
+        "status": route.status,
+        "origin_location_id": route.origin_location_id,
+        "destination_location_id": route.destination_location_id,
+    }
+
+def stats():
+    if cache is None:
+        return {"backend": "none"}
+    return {
+        "backend": cache.name,
+        "entries": cache.size(),
+        "ttl_seconds": cache.ttl_seconds,
+        "pending_fixes": tracker.pending(),
+        **cache.stats.to_dict(),
+    }
+
+def track_fixes(fix_ids):
+    """track() the fixes with these ids"""
+    with SessionLocal() as db:
+        for start in range(0, len(fix_ids), 10000):
+            track(db, db.execute(
+                select(
+                    models.GPSTracking.id, models.GPSTracking.vehicle_id, models.GPSTracking.timestamp,
+                    models.GPSTracking.latitude, models.GPSTracking.longitude,
+                )
+                .where(models.GPSTracking.id.in_(fix_ids[start:start + 10000]))
+            ).all())
+
+tracker = events.BackgroundQueue("route-monitor", track_fixes)
+
+@events.subscribe
+def _written(table, ids):
+    if cache is None:
+        return
+    if table == models.Route.__tablename__ and ids is None:
+        cache.delete_prefix("progress:")
+    elif table == models.GPSTracking.__tablename__ and ids:
+        tracker.add(ids)
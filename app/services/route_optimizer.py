@@ -0,0 +1,228 @@
+"""Stop sequencing for a route's deliveries.
+
+Stops run from the route's origin to its destination in priority tiers:
+urgent, then express, then standard. Within each tier the search starts from
+two orders, a nearest-neighbour tour and an earliest-deadline tour. Each is
+improved by local search until no move helps or the time budget runs out:
+- 2-opt reverses a run of stops;
+- Or-opt moves a run of up to three stops, either way round.
+
+A pass scores every candidate move of a stop for distance in one NumPy
+operation. The best of them are then checked against the full cost: road km
+plus LATE_PENALTY_KM_PER_MINUTE for every minute a stop is reached after its
+scheduled_delivery. A move is taken only if that cost goes down.
+"""
+import os
+import time
+from datetime import datetime, timedelta
+from typing import NamedTuple
+import numpy as np
+from app.models import models
+from app.services import distance_matrix
+
+PRIORITY_TIERS = {"urgent": 0, "express": 1, "standard": 2}
+SERVICE_MINUTES = float(os.getenv("STOP_SERVICE_MINUTES", "5"))
+LATE_PENALTY_KM_PER_MINUTE = float(os.getenv("LATE_PENALTY_KM_PER_MINUTE", "1"))
+OPTIMIZE_TIME_LIMIT_SECONDS = float(os.getenv("OPTIMIZE_TIME_LIMIT_SECONDS", "0.5"))
+OR_OPT_MAX_SEGMENT = 3
+# Distance-improving candidates per stop and move checked against the full cost
+CANDIDATES_PER_MOVE = 3
+# Deliveries still to be made
+OPEN_STATUSES = ("pending", "in_transit")
+
+class Plan(NamedTuple):
+    path: np.ndarray  # node indexes: origin, stops..., destination
+    distance_km: float
+    late_minutes: float
+    cost: float
+
+class Problem:
+    """Nodes are 0 (origin), 1..n (stops) and n + 1 (destination)"""
+
+    def __init__(self, distances, tiers, deadlines, minutes_per_km, service_minutes=SERVICE_MINUTES):
+        self.distances = np.asarray(distances, dtype=np.float64)
+        self.tiers = np.asarray(tiers)  # per stop
+        self.deadlines = np.asarray(deadlines, dtype=np.float64)  # per stop, minutes after departure; NaN for none
+        self.minutes_per_km = minutes_per_km
+        self.service_minutes = service_minutes
+        self.n = len(self.tiers)
+
+    def plan(self, path):
+        legs = self.distances[path[:-1], path[1:]]
+        distance = float(legs.sum())
+        # Arrival at the k-th stop: driving so far plus service at the stops before it
+        arrivals = np.cumsum(legs[:-1]) * self.minutes_per_km + self.service_minutes * np.arange(self.n)
+        lateness = arrivals - self.deadlines[path[1:-1] - 1]
+        late = float(np.nansum(np.maximum(lateness, 0)))
+        return Plan(path, distance, late, distance + LATE_PENALTY_KM_PER_MINUTE * late)
+
+    def blocks(self):
+        """(first, last) path positions of each tier, in visiting order"""
+        counts = [int(np.sum(self.tiers == tier)) for tier in sorted(set(self.tiers.tolist()))]
+        ranges, start = [], 1
+        for count in counts:
+            ranges.append((start, start + count - 1))
+            start += count
+        return ranges
+
+    def _tier_stops(self):
+        return [np.flatnonzero(self.tiers == tier) + 1 for tier in sorted(set(self.tiers.tolist()))]
+
+    def nearest_neighbour(self):
+        path, current = [0], 0
+        for stops in self._tier_stops():
+            remaining = list(stops)
+            while remaining:
+                nearest = int(np.argmin(self.distances[current, remaining]))
+                current = remaining.pop(nearest)
+                path.append(current)
+        return np.array(path + [self.n + 1])
+
+    def earliest_deadline(self):
+        path = [0]
+        for stops in self._tier_stops():
+            deadlines = self.deadlines[stops - 1]
+            # Stops without a deadline go last, in id order
+            path.extend(stops[np.lexsort((stops, np.where(np.isnan(deadlines), np.inf, deadlines)))].tolist())
+        return np.array(path + [self.n + 1])
+
+    def improve(self, path, deadline):
+        """Local search from path until no move improves it or time.perf_counter() passes deadline"""
+        best = self.plan(path)
+        d = self.distances
+        blocks = self.blocks()
+        improved = True
+        while improved and time.perf_counter() < deadline:
+            improved = False
+            for first, last in blocks:
+                for i in range(first, last + 1):
+                    path = best.path
+                    # 2-opt: reverse path[i..j]
+                    if i < last:
+                        js = np.arange(i + 1, last + 1)
+                        a, b = path[i - 1], path[i]
+                        delta = d[a, path[js]] + d[b, path[js + 1]] - d[a, b] - d[path[js], path[js + 1]]
+                        order = np.argsort(delta)[:CANDIDATES_PER_MOVE]
+                        for j in js[order[delta[order] < -1e-9]]:
+                            candidate = path.copy()
+                            candidate[i:j + 1] = candidate[i:j + 1][::-1]
+                            plan = self.plan(candidate)
+                            if plan.cost < best.cost - 1e-9:
+                                best, improved = plan, True
+                                break
+                    # Or-opt: move path[i..i+length-1] between path[k] and path[k+1], either way round
+                    for length in range(1, OR_OPT_MAX_SEGMENT + 1):
+                        path = best.path
+                        end = i + length - 1
+                        if end > last:
+                            break
+                        ks = np.arange(first - 1, last + 1)
+                        ks = ks[(ks < i - 1) | (ks > end)]
+                        if not len(ks):
+                            continue
+                        head, tail = path[i], path[end]
+                        removed = d[path[i - 1], head] + d[tail, path[end + 1]] - d[path[i - 1], path[end + 1]]
+                        before, after = path[ks], path[ks + 1]
+                        forward = d[before, head] + d[tail, after] - d[before, after] - removed
+                        backward = d[before, tail] + d[head, after] - d[before, after] - removed
+                        delta = np.minimum(forward, backward)
+                        order = np.argsort(delta)[:CANDIDATES_PER_MOVE]
+                        moved = False
+                        for position in order[delta[order] < -1e-9]:
+                            k = ks[position]
+                            segment = path[i:end + 1]
+                            if backward[position] < forward[position]:
+                                segment = segment[::-1]
+                            rest = np.delete(path, np.arange(i, end + 1))
+                            candidate = np.insert(rest, k + 1 if k < i else k + 1 - length, segment)
+                            plan = self.plan(candidate)
+                            if plan.cost < best.cost - 1e-9:
+                                best, improved, moved = plan, True, True
+                                break
+                        if moved:
+                            break
+                if time.perf_counter() >= deadline:
+                    break
+        return best
+
+    def solve(self, time_limit=OPTIMIZE_TIME_LIMIT_SECONDS):
+        if self.n == 0:
+            return self.plan(np.array([0, 1]))
+        starts = [self.nearest_neighbour(), self.earliest_deadline()]
+        # Each start gets an equal share of the budget
+        budget_end = time.perf_counter() + time_limit
+        plans = []
+        for index, start in enumerate(starts):
+            share = (budget_end - time.perf_counter()) / (len(starts) - index)
+            plans.append(self.improve(start, time.perf_counter() + share))
+        return min(plans, key=lambda plan: plan.cost)
+
+def optimize_route(db, route, time_limit=OPTIMIZE_TIME_LIMIT_SECONDS):
+    """The optimized stop order of a route's open deliveries, as a response dict.
+
+    Raises KeyError with the location ids that have no coordinates.
+    """
+    started = time.perf_counter()
+    deliveries = (
+        db.query(models.Delivery)
+        .filter(models.Delivery.route_id == route.id, models.Delivery.status.in_(OPEN_STATUSES))
+        .order_by(models.Delivery.id)
+        .all()
+    )
+    departure = route.actual_departure or route.scheduled_departure or datetime.utcnow()
+
+    # Node matrix from the stored distance matrix; a missing origin or destination costs nothing to reach
+    endpoints = [route.origin_location_id, route.destination_location_id]
+    location_ids = list(dict.fromkeys(
+        [location_id for location_id in endpoints if location_id is not None]
+        + [delivery.location_id for delivery in deliveries]
+    ))
+    n = len(deliveries)
+    distances = np.zeros((n + 2, n + 2))
+    if location_ids:
+        km = distance_matrix.road_km(distance_matrix.store.lookup(db, location_ids).astype(np.float64))
+        position = {location_id: index for index, location_id in enumerate(location_ids)}
+        nodes = [route.origin_location_id, *(delivery.location_id for delivery in deliveries), route.destination_location_id]
+        known = np.array([location_id is not None for location_id in nodes])
+        index = np.array([position.get(location_id, 0) for location_id in nodes])
+        distances = np.where(known[:, None] & known[None, :], km[np.ix_(index, index)], 0.0)
+
+    problem = Problem(
+        distances,
+        tiers=[PRIORITY_TIERS.get(delivery.priority, len(PRIORITY_TIERS)) for delivery in deliveries],
+        deadlines=[
+            (delivery.scheduled_delivery - departure).total_seconds() / 60 if delivery.scheduled_delivery else np.nan
+            for delivery in deliveries
+        ],
+        minutes_per_km=60 / distance_matrix.AVERAGE_SPEED_KMH,
+    )
+    plan = problem.solve(time_limit)
+    given = problem.plan(np.arange(n + 2))
+
+    stops, driven = [], 0.0
+    for sequence, node in enumerate(plan.path[1:-1], start=1):
+        delivery = deliveries[node - 1]
+        leg = float(distances[plan.path[sequence - 1], node])
+        driven += leg
+        arrival_minutes = driven * problem.minutes_per_km + SERVICE_MINUTES * (sequence - 1)
+        deadline = problem.deadlines[node - 1]
+        stops.append({
+            "sequence": sequence,
+            "delivery_id": delivery.id,
+            "location_id": delivery.location_id,
+            "priority": delivery.priority,
+            "scheduled_delivery": delivery.scheduled_delivery,
+            "estimated_arrival": departure + timedelta(minutes=arrival_minutes),
+            "leg_km": round(leg, 3),
+            "late_minutes": round(max(0.0, arrival_minutes - deadline), 1) if not np.isnan(deadline) else 0.0,
+        })
+    return {
+        "route_id": route.id,
+        "departure": departure,
+        "stops": stops,
+        "total_distance_km": round(plan.distance_km, 3),
+        "late_minutes": round(plan.late_minutes, 1),
+        "current_order_distance_km": round(given.distance_km, 3),
+        "current_order_late_minutes": round(given.late_minutes, 1),
+        "solve_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
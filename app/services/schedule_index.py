@@ -0,0 +1,338 @@
+"""In-memory interval index over route bookings of vehicles and drivers.
+
+A route books its vehicle and driver over [scheduled_departure,
+scheduled_arrival) while it is draft, scheduled or in progress. Each vehicle
+and each driver has an interval tree of its bookings, for conflict checks,
+and one more tree over all bookings answers who is busy in a window. The
+trees are static: intervals sorted by start under an implicit balanced tree
+whose nodes hold the latest end beneath them, so an overlap query visits
+O(log n + k) nodes.
+
+Routes written since the build are held in a small delta, searched by brute
+force, and folded in by the next rebuild. Unlike the other in-process
+indexes this one catches up from the change_log table (app.services.changelog)
+before every query, one indexed probe, so it sees writes made by every
+process. check() runs on every route write path (single, bulk and CSV
+import) and takes Postgres advisory locks on the vehicles and drivers it
+checks, so two writers cannot book the same slot between check and commit.
+"""
+import logging
+import os
+import threading
+import time
+from datetime import timezone
+import numpy as np
+from sqlalchemy import select, text
+from app.models import models
+from app.services import changelog
+
+logger = logging.getLogger(__name__)
+
+# Routes that hold their vehicle and driver
+BOOKED_STATUSES = ("draft", "scheduled", "in_progress")
+# Routes changed since the build kept as a delta before the index is rebuilt
+SCHEDULE_MAX_DELTA = int(os.getenv("SCHEDULE_MAX_DELTA", "2000"))
+# Arbitrary first keys for pg_advisory_xact_lock(key, id); held until the booking commits
+VEHICLE_LOCK_KEY = 7_210_433
+DRIVER_LOCK_KEY = 7_210_434
+COLUMNS = ("vehicle", "driver")
+# Route fields a booking depends on
+BOOKING_FIELDS = ("vehicle_id", "driver_id", "scheduled_departure", "scheduled_arrival", "status")
+INTERVAL_LEAF_SIZE = 32
+
+def to_us(value):
+    """Microseconds since the epoch of a naive UTC or aware datetime"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return int(np.datetime64(value, "us").astype(np.int64))
+
+class IntervalTree:
+    """Static interval tree over half-open [start, end) intervals of int64 microseconds.
+
+    Intervals are sorted by start and cut into buckets of INTERVAL_LEAF_SIZE
+    under an implicit balanced tree; each node holds the latest end beneath it.
+    """
+
+    def __init__(self, starts, ends, values, leaf_size=INTERVAL_LEAF_SIZE):
+        order = np.argsort(starts, kind="stable")
+        self.starts, self.ends, self.values = starts[order], ends[order], values[order]
+        self.leaf_size = leaf_size
+        buckets = -(-len(order) // leaf_size)
+        self.size = 1 << max(0, (buckets - 1).bit_length())
+        latest = np.full(2 * self.size, np.iinfo(np.int64).min, dtype=np.int64)
+        if buckets:
+            padded = np.full(buckets * leaf_size, np.iinfo(np.int64).min, dtype=np.int64)
+            padded[:len(order)] = self.ends
+            latest[self.size:self.size + buckets] = padded.reshape(buckets, leaf_size).max(axis=1)
+        level = self.size
+        while level > 1:
+            latest[level // 2:level] = np.maximum(latest[level:2 * level:2], latest[level + 1:2 * level:2])
+            level //= 2
+        self.latest = latest.tolist()
+
+    def __len__(self):
+        return len(self.values)
+
+    def overlapping(self, start, end):
+        """Values of the intervals overlapping [start, end)"""
+        cut = int(np.searchsorted(self.starts, end, side="left"))  # intervals starting before end
+        last_bucket = -(-cut // self.leaf_size)
+        buckets, stack = [], [(1, 0, self.size)] if cut else []
+        while stack:
+            node, low, high = stack.pop()
+            if low >= last_bucket or self.latest[node] <= start:
+                continue
+            if high - low == 1:
+                buckets.append(low)
+                continue
+            middle = (low + high) // 2
+            stack.append((2 * node + 1, middle, high))
+            stack.append((2 * node, low, middle))
+        if not buckets:
+            return []
+        positions = (np.array(buckets)[:, None] * self.leaf_size + np.arange(self.leaf_size)).ravel()
+        positions = positions[positions < cut]
+        return self.values[positions[self.ends[positions] > start]].tolist()
+
+EMPTY = IntervalTree(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+
+def _build_trees(owners, starts, ends, values):
+    """{owner: tree of its values}, in one pass over owner-sorted arrays"""
+    if not len(owners):
+        return {}
+    order = np.argsort(owners, kind="stable")
+    owners, starts, ends, values = owners[order], starts[order], ends[order], values[order]
+    bounds = np.flatnonzero(np.diff(owners)) + 1
+    return {
+        int(owners[low]): IntervalTree(starts[low:high], ends[low:high], values[low:high])
+        for low, high in zip(np.concatenate([[0], bounds]).tolist(), np.concatenate([bounds, [len(owners)]]).tolist())
+    }
+
+class ScheduleIndex:
+    def __init__(self):
+        self._owners = {column: {} for column in COLUMNS}  # column -> {owner id: tree of its route ids}
+        self._all = EMPTY  # every booking, as route ids
+        self._routes = {}  # route id -> (vehicle id, driver id) of the bookings in the trees
+        self._delta = {}  # route id -> (vehicle id, driver id, start, end), or None once no longer booked
+        self._cursor = 0
+        self._caught_up_at = 0.0
+        self._stale = True
+        self._lock = threading.Lock()
+
+    def _booked(self):
+        return select(
+            models.Route.id, models.Route.vehicle_id, models.Route.driver_id,
+            models.Route.scheduled_departure, models.Route.scheduled_arrival,
+        ).where(
+            models.Route.status.in_(BOOKED_STATUSES),
+            models.Route.scheduled_departure.isnot(None),
+            models.Route.scheduled_arrival > models.Route.scheduled_departure,
+        )
+
+    @staticmethod
+    def _booking(row):
+        return row.vehicle_id, row.driver_id, to_us(row.scheduled_departure), to_us(row.scheduled_arrival)
+
+    def _build(self, db):
+        # Read the cursor first: changes committed during the load are applied again, which is harmless
+        self._cursor = changelog.horizon(db)
+        rows = db.execute(self._booked()).all()
+        bookings = [self._booking(row) for row in rows]
+        route_ids = np.array([row.id for row in rows], dtype=np.int64)
+        starts = np.array([booking[2] for booking in bookings], dtype=np.int64)
+        ends = np.array([booking[3] for booking in bookings], dtype=np.int64)
+        for position, column in enumerate(COLUMNS):
+            owned = np.array([booking[position] is not None for booking in bookings], dtype=bool)
+            owners = np.array([booking[position] for booking in bookings if booking[position] is not None], dtype=np.int64)
+            self._owners[column] = _build_trees(owners, starts[owned], ends[owned], route_ids[owned])
+        self._all = IntervalTree(starts, ends, route_ids)
+        self._routes = {row.id: booking[:2] for row, booking in zip(rows, bookings)}
+        self._delta = {}
+        self._stale = False
+        self._caught_up_at = time.monotonic()
+        logger.info(f"Built schedule index over {len(rows)} booked routes")
+
+    def refresh(self, db):
+        """Apply route changes logged since the last refresh, rebuilding when stale; queries call this themselves"""
+        with self._lock:
+            self._refresh(db)
+
+    def _refresh(self, db):
+        # Entries older than the change log's retention may be pruned before they are read
+        if time.monotonic() - self._caught_up_at > changelog.CHANGE_RETENTION_DAYS * 86400 / 2:
+            self._stale = True
+        if self._stale:
+            self._build(db)
+            return
+        final = changelog.horizon(db, self._cursor)
+        changes = db.execute(
+            select(models.ChangeLog.id, models.ChangeLog.row_id)
+            .where(
+                models.ChangeLog.table_name == models.Route.__tablename__,
+                models.ChangeLog.id > self._cursor, models.ChangeLog.id <= final,
+            )
+        ).all()
+        changed = list({row_id for _, row_id in changes})
+        # A reset (row_id NULL) means any route may have changed
+        if None in changed or len(self._delta) + len(changed) > SCHEDULE_MAX_DELTA:
+            self._build(db)
+            return
+        for start in range(0, len(changed), 10000):
+            chunk = changed[start:start + 10000]
+            self._delta.update(dict.fromkeys(chunk))
+            self._delta.update(
+                (row.id, self._booking(row)) for row in db.execute(self._booked().where(models.Route.id.in_(chunk)))
+            )
+        self._cursor = max(self._cursor, final)
+        self._caught_up_at = time.monotonic()
+
+    def _delta_bookings(self, position):
+        return [
+            (route_id, booking[position], booking[2], booking[3])
+            for route_id, booking in self._delta.items()
+            if booking is not None and booking[position] is not None
+        ]
+
+    def overlapping(self, db, column, owner_id, start, end, exclude=()):
+        """Ids of the owner's booked routes overlapping [start, end), other than those in exclude"""
+        start, end = to_us(start), to_us(end)
+        with self._lock:
+            self._refresh(db)
+            route_ids = [
+                route_id for route_id in self._owners[column].get(owner_id, EMPTY).overlapping(start, end)
+                if route_id not in self._delta
+            ]
+            route_ids += [
+                route_id for route_id, owner, booked_start, booked_end in self._delta_bookings(COLUMNS.index(column))
+                if owner == owner_id and booked_start < end and booked_end > start
+            ]
+        return sorted(route_id for route_id in route_ids if route_id not in exclude)
+
+    def busy(self, db, column, start, end):
+        """Ids of the vehicles or drivers with a booked route overlapping [start, end)"""
+        start, end = to_us(start), to_us(end)
+        position = COLUMNS.index(column)
+        with self._lock:
+            self._refresh(db)
+            owners = {
+                self._routes[route_id][position] for route_id in self._all.overlapping(start, end)
+                if route_id not in self._delta
+            }
+            owners.update(
+                owner for _, owner, booked_start, booked_end in self._delta_bookings(position)
+                if booked_start < end and booked_end > start
+            )
+        owners.discard(None)
+        return owners
+
+    def stats(self):
+        return {
+            "vehicles": len(self._owners["vehicle"]),
+            "drivers": len(self._owners["driver"]),
+            "bookings": len(self._all),
+            "delta": len(self._delta),
+            "cursor": self._cursor,
+            "stale": self._stale,
+        }
+
+class BookingError(ValueError):
+    def __init__(self, message, conflicts=None):
+        super().__init__(message)
+        self.conflicts = conflicts  # {"vehicle_route_ids": [...], ...} for a double booking, None for a bad window
+
+def lock(db, vehicle_ids, driver_ids):
+    """Serialize bookings of these vehicles and drivers until the transaction ends (Postgres only)"""
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    # Always in (key, id) order, so two writers cannot wait on each other
+    for key, owner_ids in ((VEHICLE_LOCK_KEY, vehicle_ids), (DRIVER_LOCK_KEY, driver_ids)):
+        for owner_id in sorted(set(owner_ids) - {None}):
+            db.execute(text("SELECT pg_advisory_xact_lock(:key, :id)"), {"key": key, "id": owner_id})
+
+def current(db, route_ids):
+    """{route id: booking fields} of existing routes, for merging partial updates"""
+    found = {}
+    route_ids = list(route_ids)
+    for start in range(0, len(route_ids), 10000):
+        rows = db.execute(
+            select(models.Route.id, *(getattr(models.Route, field) for field in BOOKING_FIELDS))
+            .where(models.Route.id.in_(route_ids[start:start + 10000]))
+        ).all()
+        found.update((row.id, {field: getattr(row, field) for field in BOOKING_FIELDS}) for row in rows)
+    return found
+
+def check(db, writes):
+    """Booking errors of route writes, {key: BookingError}; writes are (key, route id or None, values).
+
+    values are the route's booking fields as they will be after the write. A
+    scheduled_arrival not after scheduled_departure is an error whatever the
+    status. Booked writes are checked against the index and against each
+    other, after locking every vehicle and driver involved.
+    """
+    errors, booked = {}, []
+    for key, route_id, values in writes:
+        start, end = values.get("scheduled_departure"), values.get("scheduled_arrival")
+        if start is not None and end is not None and to_us(end) <= to_us(start):
+            errors[key] = BookingError("scheduled_arrival must be after scheduled_departure")
+        elif start is not None and end is not None and values.get("status") in BOOKED_STATUSES:
+            booked.append((key, route_id, values, to_us(start), to_us(end)))
+    if not booked:
+        return errors
+    lock(db, [values.get("vehicle_id") for _, _, values, _, _ in booked],
+         [values.get("driver_id") for _, _, values, _, _ in booked])
+    # Routes rewritten by this batch are judged by their new values only
+    rewritten = {route_id for _, route_id, _ in writes if route_id is not None}
+    accepted = {column: {} for column in COLUMNS}  # column -> {owner: [(start, end, key)]} earlier in the batch
+    for key, route_id, values, start, end in booked:
+        conflicts = {}
+        for column in COLUMNS:
+            owner = values.get(f"{column}_id")
+            if owner is None:
+                continue
+            route_ids = bookings.overlapping(
+                db, column, owner, values["scheduled_departure"], values["scheduled_arrival"], exclude=rewritten
+            )
+            earlier = [other for other_start, other_end, other in accepted[column].get(owner, ())
+                       if other_start < end and other_end > start]
+            if route_ids or earlier:
+                conflicts[column] = (owner, route_ids, earlier)
+        if conflicts:
+            errors[key] = BookingError(
+                "; ".join(
+                    f"{column.capitalize()} {owner} is booked"
+                    + (f" on routes {', '.join(map(str, route_ids))}" if route_ids else "")
+                    + (" by another row of this request" if earlier else "")
+                    for column, (owner, route_ids, earlier) in conflicts.items()
+                ),
+                {f"{column}_route_ids": route_ids for column, (_, route_ids, _) in conflicts.items()},
+            )
+            continue
+        for column in COLUMNS:
+            owner = values.get(f"{column}_id")
+            if owner is not None:
+                accepted[column].setdefault(owner, []).append((start, end, key))
+    return errors
+
+def check_rows(db, rows, partial=False):
+    """check() for bulk rows, (index, values) pairs; returns (rows to write, error results).
+
+    With partial=True each row is an update carrying its "id" and is merged
+    over the stored route; rows that touch no booking field are not checked.
+    """
+    existing = current(db, [values["id"] for _, values in rows if values.keys() & set(BOOKING_FIELDS)]) if partial else {}
+    writes = []
+    for index, values in rows:
+        if not partial:
+            writes.append((index, None, values))
+        elif values["id"] in existing:
+            writes.append((index, values["id"], {**existing[values["id"]], **values}))
+    errors = check(db, writes)
+    return (
+        [(index, values) for index, values in rows if index not in errors],
+        [
+            {"index": index, "status": "invalid" if error.conflicts is None else "failed", "error": str(error)}
+            for index, error in errors.items()
+        ],
+    )
+
+bookings = ScheduleIndex()
@@ -0,0 +1,68 @@
+"""Ranked full-text search over the free-text columns declared in app.database.fulltext.
+
+A query is a list of words that must all match; a word ending in * matches
+as a prefix. Postgres ranks with ts_rank, SQLite with FTS5's bm25 (negated,
+so a higher score is always a better match). Scores from different types
+are comparable enough to interleave results.
+"""
+import re
+from sqlalchemy import func, literal_column, select, table, column
+from app.database import fulltext
+from app.models.resources import RESOURCES
+
+# table name -> resource (model and response schema)
+SEARCH_TYPES = {
+    resource.model.__tablename__: resource for resource in RESOURCES.values()
+    if resource.model.__tablename__ in fulltext.SEARCHABLE
+}
+
+_TERM = re.compile(r"(\w+)(\*?)")
+
+def parse_terms(q):
+    """[(word, is_prefix)] of a query string; punctuation and operators are ignored"""
+    return [(word.lower(), bool(star)) for word, star in _TERM.findall(q)]
+
+def _tsquery(terms):
+    return " & ".join(f"{word}:*" if prefix else word for word, prefix in terms)
+
+def _fts5_query(terms):
+    return " ".join(f'"{word}"*' if prefix else f'"{word}"' for word, prefix in terms)
+
+def _search_postgresql(db, model, terms, limit):
+    document = fulltext.document([model.__table__.c[name] for name in fulltext.SEARCHABLE[model.__tablename__]])
+    query = func.to_tsquery(literal_column(f"'{fulltext.LANGUAGE}'"), _tsquery(terms))
+    score = func.ts_rank(document, query)
+    return db.execute(
+        select(model, score.label("score")).where(document.bool_op("@@")(query)).order_by(score.desc()).limit(limit)
+    ).all()
+
+def _search_sqlite(db, model, terms, limit):
+    name = fulltext.fts_table(model.__tablename__)
+    fts = table(name, column("rowid"))
+    rank = func.bm25(literal_column(name))
+    return db.execute(
+        select(model, (-rank).label("score"))
+        .join(fts, fts.c.rowid == model.id)
+        .where(literal_column(name).op("MATCH")(_fts5_query(terms)))
+        .order_by(rank)
+        .limit(limit)
+    ).all()
+
+def search(db, q, types=None, limit=20):
+    """The best `limit` matches across types, best first, as {type, id, score, data}"""
+    terms = parse_terms(q)
+    if not terms:
+        return []
+    run = _search_postgresql if db.get_bind().dialect.name == "postgresql" else _search_sqlite
+    hits = []
+    for type_name in types or SEARCH_TYPES:
+        resource = SEARCH_TYPES[type_name]
+        for row, score in run(db, resource.model, terms, limit):
+            hits.append({
+                "type": type_name,
+                "id": row.id,
+                "score": round(float(score), 6),
+                "data": resource.schema.model_validate(row).model_dump(mode="json"),
+            })
+    hits.sort(key=lambda hit: hit["score"], reverse=True)
+    return hits[:limit]
@@ -0,0 +1,708 @@
+"""Deterministic, scalable fleet dataset generator.
+
+Every column value is a pure function of (seed, table, column, row id): values are
+drawn from a vectorized integer hash of the id instead of a sequential RNG. Any
+partition can therefore be generated independently in a worker process, the output
+does not depend on the number of workers, and child tables can recompute the
+attributes of the parent rows they reference (a delivery's route arrival time, a
+fuel log's vehicle mileage) without reading them back from the database.
+
+Rows get explicit ids starting at 1, so seeding requires empty tables.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from sqlalchemy import create_engine, insert, select, delete, func, text
+from faker import Faker
+import io
+import json
+import logging
+import math
+import multiprocessing
+import os
+import zlib
+import numpy as np
+from app.database import events
+from app.database.config import Base, engine as default_engine
+from app.services import changelog
+from app.services.jobs import job_handler
+from app.models.models import (
+    Organization, Vehicle, Driver, Location, Route,
+    Delivery, MaintenanceRecord, FuelLog, Incident, GPSTracking
+)
+
+logger = logging.getLogger(__name__)
+
+# Rows generated and written per worker task
+PARTITION_ROWS = int(os.getenv("SEED_PARTITION_ROWS", "200000"))
+SEED_WORKERS = int(os.getenv("SEED_WORKERS", str(os.cpu_count() or 1)))
+
+HISTORY_DAYS = 180
+GPS_DAYS = 30
+
+# Row counts at scale 1.0; per-vehicle and per-driver tables scale with their parents
+BASE_COUNTS = {
+    "organizations": 3,
+    "vehicles": 50,
+    "drivers": 60,
+    "locations": 100,
+    "routes": 400,
+    "deliveries": 1000,
+    "maintenance_records": 200,
+    "fuel_logs": 1500,
+    "incidents": 36,
+    "gps_tracking": 3750,
+}
+GPS_VEHICLE_SHARE = 0.6
+
+TABLE_ORDER = [
+    Organization, Vehicle, Driver, Location, Route,
+    Delivery, MaintenanceRecord, FuelLog, Incident, GPSTracking
+]
+
+ORGANIZATION_NAMES = ["Swift Logistics Inc", "National Transport Co", "Premier Freight Services"]
+VEHICLE_MAKES = ["Ford", "Chevrolet", "Freightliner", "Peterbilt", "Kenworth", "Volvo", "Mercedes-Benz", "RAM"]
+VEHICLE_MODELS = {
+    "Ford": ["Transit", "F-150", "F-250", "E-Series"],
+    "Chevrolet": ["Express", "Silverado 2500", "Silverado 3500"],
+    "Freightliner": ["Cascadia", "M2 106", "Sprinter"],
+    "Peterbilt": ["579", "389", "567"],
+    "Kenworth": ["T680", "W900", "T880"],
+    "Volvo": ["VNL", "VNR"],
+    "Mercedes-Benz": ["Sprinter", "Actros"],
+    "RAM": ["ProMaster", "2500", "3500"]
+}
+VEHICLE_TYPES = ["cargo_van", "pickup_truck", "box_truck", "semi_truck", "refrigerated_truck"]
+LOCATION_TYPES = ["warehouse", "depot", "customer", "distribution_center"]
+US_STATES = ["CA", "TX", "FL", "NY", "PA", "IL", "OH", "GA", "NC", "MI"]
+MAINTENANCE_DESCRIPTIONS = {
+    "routine": ["Oil change and filter replacement", "Tire rotation", "Brake inspection"],
+    "repair": ["Engine repair", "Transmission service", "Suspension repair"],
+    "inspection": ["Annual DOT inspection", "Safety inspection", "Emissions test"],
+    "emergency": ["Roadside breakdown repair", "Accident damage repair", "Tow service"]
+}
+VIN_CHARS = np.array(list("ABCDEFGHJKLMNPRSTUVWXYZ0123456789"))
+
+LAT_RANGE = (25.0, 48.0)
+LON_RANGE = (-125.0, -65.0)
+
+def plan_counts(scale=1.0, **overrides):
+    """Row counts per table for a scale factor; overrides pin individual tables"""
+    counts = {table: max(1, int(round(count * scale))) for table, count in BASE_COUNTS.items()}
+    counts.update({table: int(count) for table, count in overrides.items() if count is not None})
+    # GPS tracks are whole per-vehicle random walks
+    gps_vehicles = max(1, int(math.ceil(counts["vehicles"] * GPS_VEHICLE_SHARE)))
+    points_per_vehicle = max(1, int(math.ceil(counts["gps_tracking"] / gps_vehicles)))
+    counts["gps_tracking"] = gps_vehicles * points_per_vehicle
+    return counts
+
+def build_pools(seed, size=500):
+    """Faker vocabularies sampled by id; generated once and shared with the workers"""
+    fake = Faker()
+    Faker.seed(seed)
+    return {
+        "first_names": [fake.first_name() for _ in range(size)],
+        "last_names": [fake.last_name() for _ in range(size)],
+        "cities": [fake.city() for _ in range(size)],
+        "companies": [fake.company() for _ in range(size)],
+        "streets": [fake.street_address() for _ in range(size)],
+        "addresses": [fake.address().replace("\n", ", ") for _ in range(size)],
+        "phones": [fake.phone_number() for _ in range(size)],
+        "zipcodes": [fake.zipcode() for _ in range(size)],
+        "sentences": [fake.sentence() for _ in range(size)],
+        "domains": [fake.domain_name() for _ in range(50)],
+    }
+
+class Context:
+    """Everything a worker needs to generate any partition of any table"""
+
+    def __init__(self, seed, counts, anchor, pools):
+        self.seed = seed
+        self.counts = counts
+        self.anchor = np.datetime64(anchor.replace(microsecond=0), "us")
+        self.pools = {name: np.array(values, dtype=object) for name, values in pools.items()}
+
+    # Vectorized per-id randomness
+
+    def uniform(self, ids, column):
+        """Uniform [0, 1) floats that depend only on (seed, column, id)"""
+        salt = np.uint64(zlib.crc32(f"{self.seed}:{column}".encode()))
+        with np.errstate(over="ignore"):
+            x = ids.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15) + salt * np.uint64(0xD1B54A32D192ED03)
+            x ^= x >> np.uint64(30)
+            x *= np.uint64(0xBF58476D1CE4E5B9)
+            x ^= x >> np.uint64(27)
+            x *= np.uint64(0x94D049BB133111EB)
+            x ^= x >> np.uint64(31)
+        return (x >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+    def normal(self, ids, column):
+        u1 = np.maximum(self.uniform(ids, column + "#1"), 1e-12)
+        u2 = self.uniform(ids, column + "#2")
+        return np.sqrt(-2.0 * np.log(u1)) * np.cos(2.0 * np.pi * u2)
+
+    def between(self, ids, column, low, high):
+        return low + self.uniform(ids, column) * (high - low)
+
+    def integers(self, ids, column, low, high):
+        """Integers in [low, high] inclusive"""
+        return low + np.floor(self.uniform(ids, column) * (high - low + 1)).astype(np.int64)
+
+    def choice(self, ids, column, options, weights=None):
+        options = np.asarray(options, dtype=object)
+        u = self.uniform(ids, column)
+        if weights is None:
+            return options[np.minimum((u * len(options)).astype(np.int64), len(options) - 1)]
+        cumulative = np.cumsum(weights) / np.sum(weights)
+        return options[np.minimum(np.searchsorted(cumulative, u, side="right"), len(options) - 1)]
+
+    def pick(self, ids, column, pool):
+        values = self.pools[pool]
+        return values[np.minimum((self.uniform(ids, column) * len(values)).astype(np.int64), len(values) - 1)]
+
+    def foreign_key(self, ids, column, table):
+        return self.integers(ids, column, 1, self.counts[table])
+
+    def days_ago(self, ids, column, low_days, high_days):
+        """Timestamps between high_days and low_days before the anchor"""
+        seconds = self.between(ids, column, low_days, high_days) * 86400
+        return self.anchor - (seconds * 1e6).astype("timedelta64[us]")
+
+    @staticmethod
+    def hours(values):
+        return (np.asarray(values) * 3600e6).astype("timedelta64[us]")
+
+def _permute(ids, modulus):
+    """Bijective scramble of ids below modulus, for unique but random-looking codes"""
+    return (ids * 387_420_489 + 12_345) % modulus
+
+def _join(*parts):
+    return np.array(["".join(map(str, values)) for values in zip(*parts)], dtype=object)
+
+# Table generators: ids -> {column: values}
+
+def organizations(ids, ctx):
+    companies = ctx.pick(ids, "organizations.name", "companies")
+    names = np.array([
+        ORGANIZATION_NAMES[i - 1] if i <= len(ORGANIZATION_NAMES) else f"{company} #{i}"
+        for i, company in zip(ids.tolist(), companies)
+    ], dtype=object)
+    domains = ctx.pick(ids, "organizations.email", "domains")
+    return {
+        "id": ids,
+        "name": names,
+        "email": _join(np.full(len(ids), "contact"), ids, np.full(len(ids), "@"), domains),
+        "phone": ctx.pick(ids, "organizations.phone", "phones"),
+        "address": ctx.pick(ids, "organizations.address", "addresses"),
+        "created_at": ctx.days_ago(ids, "organizations.created_at", HISTORY_DAYS, HISTORY_DAYS + 1),
+    }
+
+def vehicles(ids, ctx):
+    makes = ctx.choice(ids, "vehicles.make", VEHICLE_MAKES)
+    model_u = ctx.uniform(ids, "vehicles.model")
+    models = np.array([
+        VEHICLE_MODELS[make][min(int(u * len(VEHICLE_MODELS[make])), len(VEHICLE_MODELS[make]) - 1)]
+        for make, u in zip(makes, model_u)
+    ], dtype=object)
+    # 8 random characters followed by the id in base 33 keeps VINs unique
+    prefix = VIN_CHARS[(ctx.uniform(np.repeat(ids, 8) * 8 + np.tile(np.arange(8), len(ids)), "vehicles.vin")
+                        * len(VIN_CHARS)).astype(np.int64)].reshape(len(ids), 8)
+    suffix = np.zeros((len(ids), 9), dtype=np.int64)
+    remaining = ids.copy()
+    for position in range(8, -1, -1):
+        suffix[:, position] = remaining % len(VIN_CHARS)
+        remaining //= len(VIN_CHARS)
+    vins = np.array(["".join(row) for row in np.concatenate([prefix, VIN_CHARS[suffix]], axis=1)], dtype=object)
+    letters = VIN_CHARS[:23]
+    plates = _join(
+        letters[(ctx.uniform(ids, "vehicles.plate1") * 23).astype(np.int64)],
+        letters[(ctx.uniform(ids, "vehicles.plate2") * 23).astype(np.int64)],
+        ctx.integers(ids, "vehicles.plate", 1000, 9999),
+    )
+    return {
+        "id": ids,
+        "organization_id": ctx.foreign_key(ids, "vehicles.organization_id", "organizations"),
+        "vin": vins,
+        "make": makes,
+        "model": models,
+        "year": ctx.integers(ids, "vehicles.year", 2015, 2024),
+        "license_plate": plates,
+        "vehicle_type": ctx.choice(ids, "vehicles.vehicle_type", VEHICLE_TYPES),
+        "capacity_kg": ctx.choice(ids, "vehicles.capacity_kg", [1000.0, 2000.0, 5000.0, 10000.0, 20000.0]),
+        "status": ctx.choice(ids, "vehicles.status", ["active", "maintenance", "retired"], [0.85, 0.13, 0.02]),
+        "current_mileage": ctx.between(ids, "vehicles.current_mileage", 10000, 500000),
+        "created_at": ctx.days_ago(ids, "vehicles.created_at", HISTORY_DAYS - 60, HISTORY_DAYS),
+    }
+
+def drivers(ids, ctx):
+    first = ctx.pick(ids, "drivers.first_name", "first_names")
+    last = ctx.pick(ids, "drivers.last_name", "last_names")
+    domains = ctx.pick(ids, "drivers.email", "domains")
+    emails = np.array([
+        f"{f}.{l}{i}@{d}".lower().replace(" ", "").replace("'", "")
+        for f, l, i, d in zip(first, last, ids.tolist(), domains)
+    ], dtype=object)
+    hire_date = ctx.days_ago(ids, "drivers.hire_date", 0, HISTORY_DAYS)
+    licenses = np.array([f"DL{n:08d}" for n in _permute(ids, 10 ** 8).tolist()], dtype=object)
+    licenses[ids >= 10 ** 8] = _join(np.full(int((ids >= 10 ** 8).sum()), "DL"), ids[ids >= 10 ** 8])
+    return {
+        "id": ids,
+        "organization_id": ctx.foreign_key(ids, "drivers.organization_id", "organizations"),
+        "first_name": first,
+        "last_name": last,
+        "email": emails,
+        "phone": ctx.pick(ids, "drivers.phone", "phones"),
+        "license_number": licenses,
+        "license_expiry": ctx.days_ago(ids, "drivers.license_expiry", -1825, -30),
+        "status": ctx.choice(ids, "drivers.status", ["active", "inactive", "on_leave"], [0.9, 0.05, 0.05]),
+        "hire_date": hire_date,
+        "rating": np.round(ctx.between(ids, "drivers.rating", 3.5, 5.0), 1),
+        "created_at": hire_date,
+    }
+
+def locations(ids, ctx):
+    companies = ctx.pick(ids, "locations.company", "companies")
+    cities = ctx.pick(ids, "locations.city", "cities")
+    return {
+        "id": ids,
+        "organization_id": ctx.foreign_key(ids, "locations.organization_id", "organizations"),
+        "name": _join(companies, np.full(len(ids), " - "), ctx.pick(ids, "locations.name_city", "cities")),
+        "type": ctx.choice(ids, "locations.type", LOCATION_TYPES),
+        "address": ctx.pick(ids, "locations.address", "streets"),
+        "city": cities,
+        "state": ctx.choice(ids, "locations.state", US_STATES),
+        "postal_code": ctx.pick(ids, "locations.postal_code", "zipcodes"),
+        "country": np.full(len(ids), "USA", dtype=object),
+        "latitude": ctx.between(ids, "locations.latitude", *LAT_RANGE),
+        "longitude": ctx.between(ids, "locations.longitude", *LON_RANGE),
+        "created_at": ctx.days_ago(ids, "locations.created_at", 30, HISTORY_DAYS),
+    }
+
+def routes(ids, ctx):
+    n_locations = ctx.counts["locations"]
+    origin = ctx.foreign_key(ids, "routes.origin_location_id", "locations")
+    offset = ctx.integers(ids, "routes.destination_location_id", 1, max(1, n_locations - 1))
+    destination = (origin - 1 + offset) % n_locations + 1
+    departure = ctx.days_ago(ids, "routes.scheduled_departure", 0, HISTORY_DAYS)
+    distance = ctx.between(ids, "routes.distance_km", 50, 2000)
+    arrival = departure + ctx.hours(distance / ctx.between(ids, "routes.speed", 60, 80))
+    status = ctx.choice(ids, "routes.status", ["scheduled", "in_progress", "completed", "cancelled"],
+                        [0.1, 0.05, 0.8, 0.05])
+    started = np.isin(status, ["in_progress", "completed"])
+    completed = status == "completed"
+    actual_departure = departure + (ctx.integers(ids, "routes.actual_departure", -30, 60) * 60e6).astype("timedelta64[us]")
+    actual_arrival = arrival + (ctx.integers(ids, "routes.actual_arrival", -60, 120) * 60e6).astype("timedelta64[us]")
+    nat = np.datetime64("NaT", "us")
+    return {
+        "id": ids,
+        "vehicle_id": ctx.foreign_key(ids, "routes.vehicle_id", "vehicles"),
+        "driver_id": ctx.foreign_key(ids, "routes.driver_id", "drivers"),
+        "origin_location_id": origin,
+        "destination_location_id": destination,
+        "scheduled_departure": departure,
+        "actual_departure": np.where(started, actual_departure, nat),
+        "scheduled_arrival": arrival,
+        "actual_arrival": np.where(completed, actual_arrival, nat),
+        "distance_km": distance,
+        "status": status,
+        "created_at": departure - ctx.hours(ctx.integers(ids, "routes.created_at", 1, 7) * 24),
+    }
+
+def deliveries(ids, ctx):
+    route_ids = ctx.foreign_key(ids, "deliveries.route_id", "routes")
+    route = routes(route_ids, ctx)
+    scheduled = route["scheduled_arrival"] + ctx.hours(ctx.integers(ids, "deliveries.scheduled_delivery", 0, 48))
+
+    u = ctx.uniform(ids, "deliveries.status")
+    statuses = np.array(["pending", "in_transit", "delivered", "failed"], dtype=object)
+    completed_cdf = np.cumsum([0.05, 0.1, 0.83, 0.02])
+    open_cdf = np.cumsum([0.7, 0.2, 0.08, 0.02])
+    status = np.where(
+        route["status"] == "completed",
+        statuses[np.minimum(np.searchsorted(completed_cdf, u, side="right"), 3)],
+        statuses[np.minimum(np.searchsorted(open_cdf, u, side="right"), 3)],
+    )
+    actual = scheduled + ctx.hours(ctx.integers(ids, "deliveries.actual_delivery", -12, 24))
+    has_notes = ctx.uniform(ids, "deliveries.has_notes") > 0.7
+    notes = ctx.pick(ids, "deliveries.delivery_notes", "sentences")
+    notes[~has_notes] = None
+    first = ctx.pick(ids, "deliveries.first_name", "first_names")
+    last = ctx.pick(ids, "deliveries.last_name", "last_names")
+    return {
+        "id": ids,
+        "route_id": route_ids,
+        "location_id": ctx.foreign_key(ids, "deliveries.location_id", "locations"),
+        "tracking_number": np.array([f"TRK{n:09d}" for n in _permute(ids, 10 ** 9).tolist()], dtype=object)
+        if ctx.counts["deliveries"] < 10 ** 9 else _join(np.full(len(ids), "TRK"), ids),
+        "customer_name": _join(first, np.full(len(ids), " "), last),
+        "customer_email": _join(first, np.full(len(ids), "."), last, ids, np.full(len(ids), "@example.com")),
+        "customer_phone": ctx.pick(ids, "deliveries.customer_phone", "phones"),
+        "package_count": ctx.integers(ids, "deliveries.package_count", 1, 50),
+        "weight_kg": ctx.between(ids, "deliveries.weight_kg", 1, 1000),
+        "status": status,
+        "priority": ctx.choice(ids, "deliveries.priority", ["standard", "express", "urgent"], [0.7, 0.2, 0.1]),
+        "scheduled_delivery": scheduled,
+        "actual_delivery": np.where(status == "delivered", actual, np.datetime64("NaT", "us")),
+        "delivery_notes": notes,
+        "signature_required": ctx.uniform(ids, "deliveries.signature_required") < 0.5,
+        "created_at": route["created_at"],
+    }
+
+def maintenance_records(ids, ctx):
+    vehicle_ids = ctx.foreign_key(ids, "maintenance_records.vehicle_id", "vehicles")
+    mileage = vehicles(vehicle_ids, ctx)["current_mileage"]
+    kind = ctx.choice(ids, "maintenance_records.maintenance_type", list(MAINTENANCE_DESCRIPTIONS))
+    description_u = ctx.uniform(ids, "maintenance_records.description")
+    service_date = ctx.days_ago(ids, "maintenance_records.service_date", 0, HISTORY_DAYS)
+    next_service = service_date + ctx.hours(ctx.integers(ids, "maintenance_records.next_service_date", 30, 180) * 24)
+    heavy = np.isin(kind, ["repair", "emergency"])
+    return {
+        "id": ids,
+        "vehicle_id": vehicle_ids,
+        "maintenance_type": kind,
+        "description": np.array([
+            MAINTENANCE_DESCRIPTIONS[k][min(int(u * 3), 2)] for k, u in zip(kind, description_u)
+        ], dtype=object),
+        "cost": np.round(ctx.between(ids, "maintenance_records.cost", 100, 5000), 2),
+        "mileage_at_service": mileage - ctx.between(ids, "maintenance_records.mileage_at_service", 0, 50000),
+        "service_date": service_date,
+        "next_service_date": np.where(kind == "routine", next_service, np.datetime64("NaT", "us")),
+        "service_provider": ctx.pick(ids, "maintenance_records.service_provider", "companies"),
+        "downtime_hours": np.where(
+            heavy,
+            ctx.between(ids, "maintenance_records.downtime_heavy", 1, 48),
+            ctx.between(ids, "maintenance_records.downtime_light", 0.5, 4),
+        ),
+        "created_at": service_date,
+    }
+
+def fuel_logs(ids, ctx):
+    vehicle_ids = ctx.foreign_key(ids, "fuel_logs.vehicle_id", "vehicles")
+    mileage = vehicles(vehicle_ids, ctx)["current_mileage"]
+    date = ctx.days_ago(ids, "fuel_logs.date", 0, HISTORY_DAYS)
+    liters = ctx.between(ids, "fuel_logs.liters", 50, 400)
+    price = ctx.between(ids, "fuel_logs.cost_per_liter", 1.2, 2.0)
+    return {
+        "id": ids,
+        "vehicle_id": vehicle_ids,
+        "date": date,
+        "location": _join(ctx.pick(ids, "fuel_logs.city", "cities"), np.full(len(ids), ", "),
+                          ctx.choice(ids, "fuel_logs.state", US_STATES)),
+        "liters": liters,
+        "cost_per_liter": np.round(price, 2),
+        "total_cost": np.round(liters * price, 2),
+        "mileage": mileage - ctx.between(ids, "fuel_logs.mileage", 0, 50000),
+        "fuel_type": ctx.choice(ids, "fuel_logs.fuel_type", ["diesel", "gasoline", "electric"], [0.7, 0.25, 0.05]),
+        "created_at": date,
+    }
+
+def incidents(ids, ctx):
+    kind = ctx.choice(ids, "incidents.incident_type", ["accident", "delay", "damage", "theft", "violation"])
+    date = ctx.days_ago(ids, "incidents.date", 0, HISTORY_DAYS)
+    resolved = date < ctx.anchor - np.timedelta64(7, "D")
+    costly = np.isin(kind, ["accident", "damage", "theft"])
+    cost = np.round(ctx.between(ids, "incidents.cost", 100, 10000), 2).astype(object)
+    cost[~costly] = None
+    notes = ctx.pick(ids, "incidents.resolution_notes", "sentences")
+    notes[~resolved] = None
+    return {
+        "id": ids,
+        "driver_id": ctx.foreign_key(ids, "incidents.driver_id", "drivers"),
+        "incident_type": kind,
+        "severity": ctx.choice(ids, "incidents.severity", ["minor", "moderate", "major", "critical"],
+                               [0.5, 0.3, 0.15, 0.05]),
+        "description": ctx.pick(ids, "incidents.description", "sentences"),
+        "date": date,
+        "location": _join(ctx.pick(ids, "incidents.street", "streets"), np.full(len(ids), ", "),
+                          ctx.pick(ids, "incidents.city", "cities"), np.full(len(ids), ", "),
+                          ctx.choice(ids, "incidents.state", US_STATES)),
+        "cost": cost,
+        "resolved": resolved,
+        "resolution_notes": notes,
+        "created_at": date,
+    }
+
+def gps_tracking(ids, ctx):
+    """Per-vehicle random walks: heading drifts, speed varies, positions integrate both.
+
+    Partitions hold whole tracks (see partitions()), so each track is one cumulative sum.
+    """
+    counts = ctx.counts
+    gps_vehicles = max(1, int(math.ceil(counts["vehicles"] * GPS_VEHICLE_SHARE)))
+    points = counts["gps_tracking"] // gps_vehicles
+    n_tracks = len(ids) // points
+    vehicle_ids = (ids[::points] - 1) // points + 1
+
+    interval_min = ctx.between(ids, "gps.interval", 1, 10).reshape(n_tracks, points)
+    heading = (ctx.between(vehicle_ids, "gps.heading0", 0, 360)[:, None]
+               + np.cumsum(ctx.normal(ids, "gps.turn").reshape(n_tracks, points) * 20, axis=1)) % 360
+    speed = np.clip(60 + ctx.normal(ids, "gps.speed").reshape(n_tracks, points) * 25, 0, 120)
+    step_km = speed * interval_min / 60
+    heading_rad = np.radians(heading)
+    lat = ctx.between(vehicle_ids, "gps.lat0", *LAT_RANGE)[:, None] + np.cumsum(step_km * np.cos(heading_rad) / 111.0, axis=1)
+    lat = np.clip(lat, *LAT_RANGE)
+    lon = (ctx.between(vehicle_ids, "gps.lon0", *LON_RANGE)[:, None]
+           + np.cumsum(step_km * np.sin(heading_rad) / (111.0 * np.cos(np.radians(lat))), axis=1))
+    lon = np.clip(lon, *LON_RANGE)
+
+    # Tracks end shortly before the anchor
+    elapsed = np.cumsum(interval_min, axis=1)
+    start = ctx.anchor - (elapsed[:, -1:] * 60e6).astype("timedelta64[us]")
+    timestamp = start + (elapsed * 60e6).astype("timedelta64[us]")
+    return {
+        "id": ids,
+        "vehicle_id": np.repeat(vehicle_ids, points),
+        "timestamp": timestamp.ravel(),
+        "latitude": lat.ravel(),
+        "longitude": lon.ravel(),
+        "speed_kmh": speed.ravel(),
+        "heading": heading.ravel(),
+        "altitude": ctx.between(ids, "gps.altitude", 0, 3000),
+    }
+
+GENERATORS = {
+    "organizations": organizations,
+    "vehicles": vehicles,
+    "drivers": drivers,
+    "locations": locations,
+    "routes": routes,
+    "deliveries": deliveries,
+    "maintenance_records": maintenance_records,
+    "fuel_logs": fuel_logs,
+    "incidents": incidents,
+    "gps_tracking": gps_tracking,
+}
+
+def partitions(table, counts, size=PARTITION_ROWS):
+    """(start_id, stop_id) ranges; GPS partitions are aligned to whole tracks"""
+    total = counts[table]
+    if table == "gps_tracking":
+        gps_vehicles = max(1, int(math.ceil(counts["vehicles"] * GPS_VEHICLE_SHARE)))
+        points = total // gps_vehicles
+        size = max(1, size // points) * points
+    return [(start, min(start + size, total + 1)) for start in range(1, total + 1, size)]
+
+# Writing
+
+def _to_python(values):
+    if isinstance(values, np.ndarray):
+        return values.tolist()
+    return list(values)
+
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+def _copy_field(value):
+    # COPY text format: \N is NULL and an empty field is the empty string, so restored '' stays ''
+    if value is None:
+        return "\\N"
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    return str(value).translate(_COPY_ESCAPES)
+
+def _copy_postgres(connection, table, columns):
+    buffer = io.StringIO()
+    for row in zip(*(_to_python(v) for v in columns.values())):
+        buffer.write("\t".join(map(_copy_field, row)))
+        buffer.write("\n")
+    buffer.seek(0)
+    raw = connection.connection.dbapi_connection
+    with raw.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT text, NULL '\\N')",
+            buffer
+        )
+
+def _insert_sqlite(connection, table, columns):
+    values = []
+    for array in columns.values():
+        if isinstance(array, np.ndarray) and np.issubdtype(array.dtype, np.datetime64):
+            # SQLAlchemy's SQLite DateTime storage format
+            values.append([None if v is None else v.strftime("%Y-%m-%d %H:%M:%S.%f") for v in array.tolist()])
+        else:
+            values.append(_to_python(array))
+    placeholders = ", ".join("?" for _ in columns)
+    cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        cursor.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", list(zip(*values)))
+    finally:
+        cursor.close()
+
+def write_columns(connection, table, columns):
+    """Write a generated partition: COPY on Postgres, multi-row inserts elsewhere"""
+    if connection.dialect.name == "postgresql":
+        _copy_postgres(connection, table, columns)
+    elif connection.dialect.name == "sqlite":
+        _insert_sqlite(connection, table, columns)
+    else:
+        names = list(columns)
+        rows = [dict(zip(names, row)) for row in zip(*(_to_python(v) for v in columns.values()))]
+        connection.execute(insert(next(m.__table__ for m in TABLE_ORDER if m.__tablename__ == table)), rows)
+
+def reset_sequences(engine, tables=None):
+    """Move Postgres id sequences past rows written with explicit ids"""
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as connection:
+        for table in tables or [model.__tablename__ for model in TABLE_ORDER]:
+            connection.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 1)) FROM {table}"
+            ))
+
+# Worker processes
+
+_worker = {}
+
+def _init_worker(database_url, seed, counts, anchor, pools):
+    _worker["context"] = Context(seed, counts, anchor, pools)
+    _worker["database_url"] = database_url
+    _worker["engine"] = None
+
+def _generate(table, start, stop):
+    ids = np.arange(start, stop, dtype=np.int64)
+    columns = GENERATORS[table](ids, _worker["context"])
+    # Generated rows have never been updated
+    columns["version"] = np.ones(len(ids), dtype=np.int64)
+    columns["updated_at"] = columns["created_at"] if "created_at" in columns else columns["timestamp"]
+    return columns
+
+def _generate_and_write(table, start, stop):
+    """Generate a partition and write it on this process's own connection"""
+    if _worker["engine"] is None:
+        _worker["engine"] = create_engine(_worker["database_url"])
+    columns = _generate(table, start, stop)
+    with _worker["engine"].begin() as connection:
+        write_columns(connection, table, columns)
+    return stop - start
+
+def _generate_only(table, start, stop):
+    return _generate(table, start, stop)
+
+def seed(engine, scale=1.0, seed=42, workers=None, counts=None, anchor=None, progress=None):
+    """Generate and write a full dataset into empty tables.
+
+    Postgres partitions are written by the worker processes in parallel; SQLite
+    allows a single writer, so workers only generate and this process writes.
+    progress(table, rows_written, table_total) is called after every partition.
+    """
+    counts = plan_counts(scale, **(counts or {}))
+    workers = SEED_WORKERS if workers is None else max(1, workers)
+    anchor = anchor or datetime.utcnow()
+
+    with engine.connect() as connection:
+        for model in TABLE_ORDER:
+            if connection.execute(select(model.id).limit(1)).first() is not None:
+                raise ValueError(f"Table {model.__tablename__} is not empty; clear the database before seeding")
+
+    pools = build_pools(seed)
+    parallel_write = engine.dialect.name == "postgresql"
+    database_url = engine.url.render_as_string(hide_password=False)
+    started = datetime.utcnow()
+
+    # Spawned rather than forked: seeding also runs from job threads of the API process
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(database_url, seed, counts, anchor, pools)
+    )
+    try:
+        for model in TABLE_ORDER:
+            table = model.__tablename__
+            written = 0
+            tasks = partitions(table, counts)
+            if parallel_write:
+                futures = [pool.submit(_generate_and_write, table, start, stop) for start, stop in tasks]
+                for future in futures:
+                    written += future.result()
+                    if progress:
+                        progress(table, written, counts[table])
+            else:
+                for (start, stop), columns in zip(tasks, pool.map(_generate_only, *zip(*[(table, a, b) for a, b in tasks]))):
+                    with engine.begin() as connection:
+                        write_columns(connection, table, columns)
+                    written += stop - start
+                    if progress:
+                        progress(table, written, counts[table])
+    finally:
+        # A failing or cancelled run should not wait for the partitions still queued
+        pool.shutdown(wait=True, cancel_futures=True)
+        events.publish_all(model.__tablename__ for model in TABLE_ORDER)
+        changelog.log_reset(engine, [model.__tablename__ for model in TABLE_ORDER])
+
+    reset_sequences(engine)
+
+    elapsed = (datetime.utcnow() - started).total_seconds()
+    total = sum(counts.values())
+    logger.info(f"Seeded {total} rows in {elapsed:.1f}s ({total / max(elapsed, 1e-9) * 60:,.0f} rows/min)")
+    return {"counts": counts, "rows": total, "seconds": round(elapsed, 3)}
+
+# Rows deleted per committed chunk where neither fast path is available
+CLEAR_CHUNK_ROWS = int(os.getenv("CLEAR_CHUNK_ROWS", "50000"))
+
+def clear(engine, progress=None):
+    """Remove all fleet data.
+
+    Postgres truncates every table in one statement and restarts the id
+    sequences; SQLite drops and recreates the tables, which is far faster than
+    deleting rows. Other databases delete in committed chunks of ids.
+    progress(table, rows_cleared, table_total) is called as tables are cleared.
+    """
+    tables = [model.__table__ for model in reversed(TABLE_ORDER)]
+    try:
+        _clear_tables(engine, tables, progress)
+    finally:
+        events.publish_all(table.name for table in tables)
+        changelog.log_reset(engine, [table.name for table in tables])
+
+def _clear_tables(engine, tables, progress):
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as connection:
+            connection.execute(text(
+                f"TRUNCATE {', '.join(table.name for table in tables)} RESTART IDENTITY CASCADE"
+            ))
+        for table in tables:
+            if progress:
+                progress(table.name, 1, 1)
+        return
+
+    if engine.dialect.name == "sqlite":
+        Base.metadata.drop_all(engine, tables=tables)
+        Base.metadata.create_all(engine, tables=tables)
+        for table in tables:
+            if progress:
+                progress(table.name, 1, 1)
+        return
+
+    for table in tables:
+        with engine.connect() as connection:
+            total = connection.execute(select(func.count()).select_from(table)).scalar()
+        cleared = 0
+        while True:
+            with engine.begin() as connection:
+                ids = select(table.c.id).limit(CLEAR_CHUNK_ROWS).scalar_subquery()
+                deleted = connection.execute(delete(table).where(table.c.id.in_(ids))).rowcount
+            if not deleted:
+                break
+            cleared += deleted
+            if progress:
+                progress(table.name, cleared, total)
+        if progress:
+            progress(table.name, total, total)
+
+# Queue handlers
+
+@job_handler("seed")
+def seed_job(context, scale=1.0, workers=None, **options):
+    # The random seed arrives in options; a "seed" parameter would shadow seed()
+    context.set_totals(plan_counts(scale))
+    result = seed(default_engine, scale=scale, seed=options.get("seed", 42), workers=workers, progress=context.report)
+    return {
+        "message": "Database fully seeded with realistic fleet logistics data",
+        "seconds": result["seconds"],
+        "summary": {**result["counts"], "time_span": f"{HISTORY_DAYS // 30} months"}
+    }
+
+@job_handler("clear", priority=10)
+def clear_job(context):
+    context.set_totals({model.__tablename__: 1 for model in TABLE_ORDER})
+    clear(default_engine, progress=context.report)
+    return {"message": "All data cleared from database"}
@@ -0,0 +1,301 @@
+"""Database snapshots: compressed columnar export and bulk restore.
+
+A snapshot is a directory holding manifest.json and one <table>.npz per data
+table. Each .npz is a zip of NumPy arrays, one per column and row chunk, so
+tables are streamed in and out without holding them in memory. Strings are
+stored Arrow-style as UTF-8 bytes plus offsets; NULLs as a separate mask.
+
+Restore clears the tables, drops their secondary indexes, bulk loads every
+chunk (COPY on Postgres, in parallel across chunks and tables), then rebuilds
+the indexes and resets the id sequences.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from sqlalchemy import select, func, text, Integer, Float, Numeric, Boolean, DateTime, String, Text
+from sqlalchemy.schema import CreateIndex, DropIndex
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+import numpy as np
+from app.database import migrations, events
+from app.database.config import engine as default_engine
+from app.services import seed_generator, changelog
+from app.services.jobs import job_handler
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join(tempfile.gettempdir(), "fleet-snapshots"))
+SNAPSHOT_CHUNK_ROWS = int(os.getenv("SNAPSHOT_CHUNK_ROWS", "100000"))
+SNAPSHOT_WORKERS = int(os.getenv("SNAPSHOT_WORKERS", str(os.cpu_count() or 1)))
+
+NAME_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+# The data tables; the job queue is operational state, not data
+TABLES = [model.__table__ for model in seed_generator.TABLE_ORDER]
+
+def snapshot_path(name):
+    if not NAME_PATTERN.fullmatch(name):
+        raise ValueError(f"Invalid snapshot name '{name}'")
+    return os.path.join(SNAPSHOT_DIR, name)
+
+def read_manifest(name):
+    with open(os.path.join(snapshot_path(name), "manifest.json")) as f:
+        return json.load(f)
+
+def list_snapshots():
+    if not os.path.isdir(SNAPSHOT_DIR):
+        return []
+    manifests = []
+    for name in sorted(os.listdir(SNAPSHOT_DIR)):
+        # Exports in progress live in <name>.partial
+        if NAME_PATTERN.fullmatch(name) and os.path.exists(os.path.join(SNAPSHOT_DIR, name, "manifest.json")):
+            manifests.append(read_manifest(name))
+    return manifests
+
+def delete_snapshot(name):
+    shutil.rmtree(snapshot_path(name))
+
+# Column encoding
+
+def column_kind(column):
+    if isinstance(column.type, Boolean):
+        return "bool"
+    if isinstance(column.type, Integer):
+        return "int"
+    if isinstance(column.type, (Float, Numeric)):
+        return "float"
+    if isinstance(column.type, DateTime):
+        return "datetime"
+    if isinstance(column.type, (String, Text)):
+        return "str"
+    return "json"
+
+def encode(values, kind):
+    """Column values -> {suffix: array}"""
+    arrays = {}
+    nulls = np.fromiter((v is None for v in values), dtype=bool, count=len(values))
+    if nulls.any() and kind != "datetime":
+        arrays["mask"] = nulls
+    if kind == "int":
+        arrays["values"] = np.array([0 if v is None else v for v in values], dtype=np.int64)
+    elif kind == "float":
+        arrays["values"] = np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+    elif kind == "bool":
+        arrays["values"] = np.array([bool(v) for v in values], dtype=bool)
+    elif kind == "datetime":
+        # None becomes NaT, which needs no mask
+        arrays["values"] = np.array(values, dtype="datetime64[us]")
+    else:
+        if kind == "json":
+            values = [None if v is None else json.dumps(v) for v in values]
+        encoded = [b"" if v is None else v.encode() for v in values]
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+        arrays["offsets"] = np.concatenate([[0], np.cumsum(lengths)])
+        arrays["data"] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return arrays
+
+def decode(arrays, kind):
+    """{suffix: array} -> values for seed_generator.write_columns"""
+    if kind in ("str", "json"):
+        data = arrays["data"].tobytes()
+        offsets = arrays["offsets"].tolist()
+        values = np.array([data[start:stop].decode() for start, stop in zip(offsets, offsets[1:])], dtype=object)
+        if kind == "json":
+            values = np.array([json.loads(v) if v else None for v in values], dtype=object)
+    else:
+        values = arrays["values"]
+    if "mask" in arrays:
+        values = values.astype(object)
+        values[arrays["mask"]] = None
+    return values
+
+def _write_array(archive, name, array):
+    with archive.open(name, "w", force_zip64=True) as f:
+        np.lib.format.write_array(f, array, allow_pickle=False)
+
+def _read_array(archive, name):
+    with archive.open(name) as f:
+        return np.lib.format.read_array(f, allow_pickle=False)
+
+# Export
+
+def _export_table(engine, table, directory, pg_snapshot, progress):
+    kinds = {column.name: column_kind(column) for column in table.columns}
+    rows = 0
+    parts = 0
+    with engine.connect() as connection:
+        if pg_snapshot:
+            # Every table reads the same MVCC snapshot, so the export is consistent
+            connection.execute(text("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ"))
+            connection.execute(text(f"SET TRANSACTION SNAPSHOT '{pg_snapshot}'"))
+        result = connection.execution_options(stream_results=True, yield_per=SNAPSHOT_CHUNK_ROWS).execute(
+            select(table).order_by(table.c.id)
+        )
+        with zipfile.ZipFile(os.path.join(directory, f"{table.name}.npz"), "w", zipfile.ZIP_DEFLATED) as archive:
+            for chunk in result.partitions(SNAPSHOT_CHUNK_ROWS):
+                columns = list(zip(*chunk))
+                for name, values in zip(kinds, columns):
+                    for suffix, array in encode(list(values), kinds[name]).items():
+                        _write_array(archive, f"{parts:06d}/{name}.{suffix}.npy", array)
+                rows += len(chunk)
+                parts += 1
+                if progress:
+                    progress(table.name, rows)
+    return {"rows": rows, "parts": parts, "file": f"{table.name}.npz", "columns": kinds}
+
+def export_snapshot(engine, name=None, progress=None):
+    """Write every data table to a new snapshot, one table per thread"""
+    name = name or datetime.utcnow().strftime("snapshot-%Y%m%d-%H%M%S")
+    directory = snapshot_path(name)
+    if os.path.exists(directory):
+        raise ValueError(f"Snapshot '{name}' already exists")
+    partial = directory + ".partial"
+    shutil.rmtree(partial, ignore_errors=True)
+    os.makedirs(partial)
+    started = datetime.utcnow()
+
+    leader = engine.connect()
+    try:
+        pg_snapshot = None
+        if engine.dialect.name == "postgresql":
+            leader.execute(text("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ"))
+            pg_snapshot = leader.execute(text("SELECT pg_export_snapshot()")).scalar()
+        with ThreadPoolExecutor(max_workers=SNAPSHOT_WORKERS) as pool:
+            futures = {
+                table.name: pool.submit(_export_table, engine, table, partial, pg_snapshot, progress)
+                for table in TABLES
+            }
+            tables = {table_name: future.result() for table_name, future in futures.items()}
+    except BaseException:
+        shutil.rmtree(partial, ignore_errors=True)
+        raise
+    finally:
+        leader.close()
+
+    manifest = {
+        "name": name,
+        "created_at": started.isoformat(),
+        "schema_version": migrations.current_version(engine),
+        "dialect": engine.dialect.name,
+        "rows": sum(table["rows"] for table in tables.values()),
+        "bytes": sum(os.path.getsize(os.path.join(partial, table["file"])) for table in tables.values()),
+        "seconds": round((datetime.utcnow() - started).total_seconds(), 3),
+        "tables": tables,
+    }
+    with open(os.path.join(partial, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    # Only complete snapshots ever carry their final name
+    os.rename(partial, directory)
+    return manifest
+
+# Restore
+
+def _load_levels():
+    """Tables grouped so every table's foreign key targets are in an earlier group"""
+    levels = {}
+    for table in TABLES:
+        parents = [fk.column.table for fk in table.foreign_keys if fk.column.table is not table]
+        levels[table.name] = 1 + max((levels[parent.name] for parent in parents), default=-1)
+    grouped = {}
+    for table in TABLES:
+        grouped.setdefault(levels[table.name], []).append(table)
+    return [grouped[level] for level in sorted(grouped)]
+
+def _load_part(engine, directory, table, info, part):
+    with zipfile.ZipFile(os.path.join(directory, info["file"])) as archive:
+        names = set(archive.namelist())
+        columns = {}
+        for name, kind in info["columns"].items():
+            arrays = {
+                suffix: _read_array(archive, f"{part:06d}/{name}.{suffix}.npy")
+                for suffix in ("values", "mask", "offsets", "data")
+                if f"{part:06d}/{name}.{suffix}.npy" in names
+            }
+            columns[name] = decode(arrays, kind)
+    with engine.begin() as connection:
+        seed_generator.write_columns(connection, table.name, columns)
+    return len(columns["id"])
+
+def restore_snapshot(engine, name, progress=None):
+    """Replace all data with a snapshot"""
+    manifest = read_manifest(name)
+    directory = snapshot_path(name)
+    version = migrations.current_version(engine)
+    if manifest["schema_version"] != version:
+        raise ValueError(
+            f"Snapshot '{name}' was taken at schema version {manifest['schema_version']}; the database is at {version}"
+        )
+    started = datetime.utcnow()
+
+    seed_generator.clear(engine)
+    try:
+        indexes = [
+            index for table in TABLES for index in table.indexes if migrations.index_applies(index, engine.dialect)
+        ]
+        with engine.begin() as connection:
+            for index in indexes:
+                connection.execute(DropIndex(index, if_exists=True))
+
+        # SQLite has a single writer, so only Postgres loads chunks concurrently
+        workers = SNAPSHOT_WORKERS if engine.dialect.name == "postgresql" else 1
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for level in _load_levels():
+                futures = [
+                    (table, pool.submit(_load_part, engine, directory, table, manifest["tables"][table.name], part))
+                    for table in level
+                    for part in range(manifest["tables"][table.name]["parts"])
+                ]
+                loaded = {}
+                for table, future in futures:
+                    loaded[table.name] = loaded.get(table.name, 0) + future.result()
+                    if progress:
+                        progress(table.name, loaded[table.name])
+
+        def build(index):
+            with engine.begin() as connection:
+                connection.execute(CreateIndex(index, if_not_exists=True))
+
+        built = 0
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for _ in pool.map(build, indexes):
+                built += 1
+                if progress:
+                    progress("indexes", built)
+        seed_generator.reset_sequences(engine)
+        with engine.begin() as connection:
+            connection.execute(text("ANALYZE"))
+    finally:
+        events.publish_all(table.name for table in TABLES)
+        changelog.log_reset(engine, [table.name for table in TABLES])
+
+    return {
+        "name": name,
+        "rows": manifest["rows"],
+        "indexes": built,
+        "seconds": round((datetime.utcnow() - started).total_seconds(), 3),
+    }
+
+# Queue handlers
+
+@job_handler("snapshot_export")
+def export_job(context, name=None):
+    with default_engine.connect() as connection:
+        context.set_totals({
+            table.name: connection.execute(select(func.count()).select_from(table)).scalar() for table in TABLES
+        })
+    manifest = export_snapshot(default_engine, name, progress=context.report)
+    return {key: manifest[key] for key in ("name", "rows", "bytes", "seconds")}
+
+@job_handler("snapshot_restore", priority=10)
+def restore_job(context, name):
+    manifest = read_manifest(name)
+    totals = {table: info["rows"] for table, info in manifest["tables"].items()}
+    totals["indexes"] = sum(
+        migrations.index_applies(index, default_engine.dialect) for table in TABLES for index in table.indexes
+    )
+    context.set_totals(totals)
+    return restore_snapshot(default_engine, name, progress=context.report)
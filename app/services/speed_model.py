@@ -0,0 +1,251 @@
+"""Road speed model: mean GPS speed per grid cell and hour of the week.
+
+Built by the "speed_model" job from the whole of gps_tracking, up to the
+newest fix when the build starts. Fixes are read in id-ordered chunks of
+SPEED_MODEL_CHUNK_ROWS. Each chunk is binned into (cell, hour of week) sums
+and counts with np.bincount, so memory holds one chunk plus those two arrays. Cells are SPEED_GRID_DEGREES squares over
+the bounding box of the fixes, coarsened if the box would need more than
+SPEED_GRID_MAX_CELLS. Every (cell, hour) gets a speed:
+- its own mean, given SPEED_MODEL_MIN_SAMPLES moving fixes;
+- else the cell's mean over all hours, scaled by that hour's share of the
+  fleet-wide profile;
+- else the fleet-wide mean for that hour.
+
+The model is a float16 (rows, cols, 168) array plus its grid origin, saved
+as one .npz at SPEED_MODEL_PATH and replaced atomically. Processes load it
+on first use and again when the file changes.
+
+travel_minutes() drives the great-circle path between two points in
+cell-sized pieces. Each piece runs at the speed of its cell in the hour it
+is reached. Points outside the grid use the fleet-wide profile, which is all
+there is before the first build (app.services.speed_profile).
+"""
+import logging
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import NamedTuple
+import numpy as np
+from sqlalchemy import select, func
+from app.database.config import SessionLocal
+from app.models import models
+from app.services import distance_matrix
+from app.services.geo import EARTH_RADIUS_KM, unit_vectors, haversine_km
+from app.services.jobs import job_handler
+from app.services.speed_profile import profile, hour_of_week, HOURS_PER_WEEK, MIN_MOVING_SPEED_KMH
+
+logger = logging.getLogger(__name__)
+
+SPEED_MODEL_PATH = os.getenv("SPEED_MODEL_PATH", os.path.join(tempfile.gettempdir(), "fleet-speed-model.npz"))
+SPEED_GRID_DEGREES = float(os.getenv("SPEED_GRID_DEGREES", "0.5"))
+SPEED_GRID_MAX_CELLS = int(os.getenv("SPEED_GRID_MAX_CELLS", "200000"))
+SPEED_MODEL_MIN_SAMPLES = int(os.getenv("SPEED_MODEL_MIN_SAMPLES", "10"))
+SPEED_MODEL_CHUNK_ROWS = int(os.getenv("SPEED_MODEL_CHUNK_ROWS", "200000"))
+# Paths are driven in pieces of at most this many cells' length, and at most MAX_PIECES of them
+PIECES_PER_CELL = 2
+MAX_PIECES = 256
+# How often a process checks the file for a newer build
+RELOAD_CHECK_SECONDS = 1.0
+KM_PER_DEGREE = 111.195
+
+def _hours_of_week(timestamps):
+    """Hour of the week, Monday 00:00 = 0, of a datetime64 array"""
+    # 1970-01-01 was a Thursday, 72 hours into its week
+    return (timestamps.astype("datetime64[h]").astype(np.int64) + 72) % HOURS_PER_WEEK
+
+def build(path=SPEED_MODEL_PATH, cell_degrees=SPEED_GRID_DEGREES, progress=None):
+    """Aggregate gps_tracking into the model file; returns a summary"""
+    started = time.perf_counter()
+    moving = (
+        models.GPSTracking.speed_kmh > MIN_MOVING_SPEED_KMH,
+        models.GPSTracking.latitude.isnot(None),
+        models.GPSTracking.longitude.isnot(None),
+        models.GPSTracking.timestamp.isnot(None),
+    )
+    with SessionLocal() as db:
+        # Fixes written after this are left for the next build, so every chunk read lies within the box
+        min_lat, max_lat, min_lon, max_lon, total, max_id = db.execute(
+            select(
+                func.min(models.GPSTracking.latitude), func.max(models.GPSTracking.latitude),
+                func.min(models.GPSTracking.longitude), func.max(models.GPSTracking.longitude),
+                func.count(), func.max(models.GPSTracking.id),
+            ).where(*moving)
+        ).one()
+        if not total:
+            min_lat = max_lat = min_lon = max_lon = 0.0
+            max_id = 0
+        while True:
+            rows = int((max_lat - min_lat) // cell_degrees) + 1
+            cols = int((max_lon - min_lon) // cell_degrees) + 1
+            if rows * cols <= SPEED_GRID_MAX_CELLS:
+                break
+            cell_degrees *= 2
+        cells = rows * cols
+        sums = np.zeros(cells * HOURS_PER_WEEK)
+        counts = np.zeros(cells * HOURS_PER_WEEK)
+
+        done, last_id = 0, 0
+        while True:
+            chunk = db.execute(
+                select(
+                    models.GPSTracking.id, models.GPSTracking.timestamp, models.GPSTracking.latitude,
+                    models.GPSTracking.longitude, models.GPSTracking.speed_kmh,
+                )
+                .where(models.GPSTracking.id > last_id, models.GPSTracking.id <= max_id, *moving)
+                .order_by(models.GPSTracking.id)
+                .limit(SPEED_MODEL_CHUNK_ROWS)
+            ).all()
+            if not chunk:
+                break
+            ids, timestamps, lat, lon, speed = zip(*chunk)
+            last_id = ids[-1]
+            lat, lon, speed = np.array(lat), np.array(lon), np.array(speed)
+            # A fix moved by an update since the box was measured may lie outside it
+            inside = (lat >= min_lat) & (lat <= max_lat) & (lon >= min_lon) & (lon <= max_lon)
+            if not inside.all():
+                lat, lon, speed = lat[inside], lon[inside], speed[inside]
+                timestamps = np.array(timestamps, dtype="datetime64[us]")[inside]
+            row = np.minimum(((lat - min_lat) // cell_degrees).astype(np.int64), rows - 1)
+            col = np.minimum(((lon - min_lon) // cell_degrees).astype(np.int64), cols - 1)
+            bins = (row * cols + col) * HOURS_PER_WEEK + _hours_of_week(np.array(timestamps, dtype="datetime64[us]"))
+            sums += np.bincount(bins, weights=speed, minlength=len(sums))
+            counts += np.bincount(bins, minlength=len(counts))
+            done += len(speed)
+            if progress:
+                progress("gps_tracking", done, total)
+
+    sums, counts = sums.reshape(cells, HOURS_PER_WEEK), counts.reshape(cells, HOURS_PER_WEEK)
+    overall = float(sums.sum() / counts.sum()) if counts.sum() else distance_matrix.AVERAGE_SPEED_KMH
+    hour_counts = counts.sum(axis=0)
+    hourly = np.where(hour_counts >= SPEED_MODEL_MIN_SAMPLES, sums.sum(axis=0) / np.maximum(hour_counts, 1), overall)
+    cell_counts = counts.sum(axis=1)
+    cell_mean = np.where(cell_counts >= SPEED_MODEL_MIN_SAMPLES, sums.sum(axis=1) / np.maximum(cell_counts, 1), np.nan)
+    fallback = np.where(np.isnan(cell_mean)[:, None], hourly[None, :], cell_mean[:, None] * (hourly / overall)[None, :])
+    speeds = np.where(counts >= SPEED_MODEL_MIN_SAMPLES, sums / np.maximum(counts, 1), fallback)
+
+    built_at = datetime.utcnow()
+    temporary = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(
+        temporary,
+        speeds=speeds.reshape(rows, cols, HOURS_PER_WEEK).astype(np.float16),
+        hourly=hourly.astype(np.float32),
+        origin=np.array([min_lat, min_lon]),
+        cell_degrees=np.array(cell_degrees),
+        fixes=np.array(done),
+        built_at=np.array(built_at.isoformat()),
+    )
+    os.replace(temporary, path)
+    seconds = time.perf_counter() - started
+    logger.info(f"Built speed model from {done} GPS fixes into {rows}x{cols} cells in {seconds:.1f}s")
+    return {
+        "fixes": done,
+        "rows": rows,
+        "cols": cols,
+        "cell_degrees": cell_degrees,
+        "cells_with_data": int((cell_counts > 0).sum()),
+        "bytes": os.path.getsize(path),
+        "seconds": round(seconds, 3),
+        "built_at": built_at.isoformat(),
+    }
+
+class Grid(NamedTuple):
+    speeds: np.ndarray  # (rows, cols, 168) km/h
+    hourly: np.ndarray  # (168,) km/h, fleet-wide
+    origin: np.ndarray  # (lat, lon) of the south-west corner of cell (0, 0)
+    cell_degrees: float
+
+class SpeedModel:
+    def __init__(self, path=SPEED_MODEL_PATH):
+        self.path = path
+        self.grid = None  # replaced whole on reload, so readers never see a mix of builds
+        self.fixes = 0
+        self.built_at = None
+        self._mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _reload(self):
+        """Load the file if it changed since the last check, at most every RELOAD_CHECK_SECONDS"""
+        if time.monotonic() - self._checked_at < RELOAD_CHECK_SECONDS:
+            return
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except FileNotFoundError:
+                return
+            if mtime == self._mtime:
+                return
+            with np.load(self.path) as data:
+                self.grid = Grid(
+                    data["speeds"].astype(np.float32), data["hourly"], data["origin"], float(data["cell_degrees"])
+                )
+                self.fixes = int(data["fixes"])
+                self.built_at = datetime.fromisoformat(str(data["built_at"]))
+            self._mtime = mtime
+            logger.info(f"Loaded speed model built {self.built_at} from {self.fixes} GPS fixes")
+
+    def travel_minutes(self, lat1, lon1, lat2, lon2, departure):
+        """(minutes, road km) to drive between two points leaving at departure"""
+        self._reload()
+        grid = self.grid
+        if grid is None:
+            grid = Grid(np.empty((0, 0, HOURS_PER_WEEK)), profile.speeds(), np.zeros(2), SPEED_GRID_DEGREES)
+        speeds, hourly, origin, cell_degrees = grid
+        km = float(haversine_km(lat1, lon1, lat2, lon2))
+        road_km = distance_matrix.road_km(km)
+        if road_km == 0:
+            return 0.0, 0.0
+        rows, cols = speeds.shape[:2]
+        pieces = int(min(MAX_PIECES, max(1, np.ceil(km * PIECES_PER_CELL / (cell_degrees * KM_PER_DEGREE)))))
+
+        # Piece midpoints along the great circle
+        a, b = unit_vectors(lat1, lon1), unit_vectors(lat2, lon2)
+        angle = km / EARTH_RADIUS_KM
+        t = (np.arange(pieces) + 0.5) / pieces
+        if angle > 1e-9:
+            points = (np.sin((1 - t) * angle)[:, None] * a + np.sin(t * angle)[:, None] * b) / np.sin(angle)
+        else:
+            points = np.repeat(a[None, :], pieces, axis=0)
+        lat = np.degrees(np.arcsin(np.clip(points[:, 2], -1, 1)))
+        lon = np.degrees(np.arctan2(points[:, 1], points[:, 0]))
+        row = ((lat - origin[0]) // cell_degrees).astype(np.int64)
+        col = ((lon - origin[1]) // cell_degrees).astype(np.int64)
+        inside = (row >= 0) & (row < rows) & (col >= 0) & (col < cols)
+        row, col = np.clip(row, 0, max(rows - 1, 0)), np.clip(col, 0, max(cols - 1, 0))
+
+        piece_km = road_km / pieces
+        start_hour = hour_of_week(departure) + departure.minute / 60
+
+        def piece_speeds(hours):
+            hours = hours.astype(np.int64) % HOURS_PER_WEEK
+            if not rows:
+                return hourly[hours]
+            return np.where(inside, speeds[row, col, hours], hourly[hours])
+
+        # The hour each piece is reached in, from a first pass at the departure hour
+        minutes = piece_km / piece_speeds(np.full(pieces, start_hour)) * 60
+        reached = start_hour + (np.cumsum(minutes) - minutes) / 60
+        minutes = piece_km / piece_speeds(reached) * 60
+        return float(minutes.sum()), road_km
+
+    def stats(self):
+        self._reload()
+        grid = self.grid
+        return {
+            "path": self.path,
+            "built_at": self.built_at,
+            "fixes": self.fixes,
+            "rows": grid.speeds.shape[0] if grid else 0,
+            "cols": grid.speeds.shape[1] if grid else 0,
+            "cell_degrees": grid.cell_degrees if grid else None,
+        }
+
+model = SpeedModel()
+
+@job_handler("speed_model")
+def speed_model_job(context, cell_degrees=None):
+    context.set_totals({"gps_tracking": 0})
+    return build(cell_degrees=cell_degrees or SPEED_GRID_DEGREES, progress=context.report)
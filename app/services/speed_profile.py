@@ -0,0 +1,88 @@
+"""Historical road speeds by hour of the week, from gps_tracking.
+
+The profile is the mean speed of moving fixes (above MIN_MOVING_SPEED_KMH) in
+each of the 168 hours of the week, Monday 00:00 first. It is aggregated in
+the database with one GROUP BY over all of gps_tracking, so it is never
+loaded within a request: a job worker maintenance task loads it on the first
+heartbeat and again once it is SPEED_PROFILE_TTL_SECONDS old. Until then, and in processes
+that run no job workers, every hour is AVERAGE_SPEED_KMH. Hours with fewer
+than SPEED_PROFILE_MIN_SAMPLES fixes use the mean over all hours.
+"""
+import logging
+import os
+import threading
+import time
+import numpy as np
+from sqlalchemy import select, func, cast, Integer, literal_column
+from app.database.config import SessionLocal
+from app.models import models
+from app.services.distance_matrix import AVERAGE_SPEED_KMH
+from app.services.jobs import maintenance_task
+
+logger = logging.getLogger(__name__)
+
+HOURS_PER_WEEK = 168
+# Slower fixes are stops, not driving
+MIN_MOVING_SPEED_KMH = float(os.getenv("MIN_MOVING_SPEED_KMH", "5"))
+SPEED_PROFILE_TTL_SECONDS = float(os.getenv("SPEED_PROFILE_TTL_SECONDS", "3600"))
+SPEED_PROFILE_MIN_SAMPLES = int(os.getenv("SPEED_PROFILE_MIN_SAMPLES", "30"))
+
+def hour_of_week(timestamp):
+    return timestamp.weekday() * 24 + timestamp.hour
+
+def _hour_of_week_sql(column, dialect):
+    if dialect == "postgresql":
+        # Literal constants so the GROUP BY expression matches the selected one exactly
+        return ((func.extract("isodow", column) - literal_column("1")) * literal_column("24")
+                + func.extract("hour", column))
+    # SQLite: %w counts from Sunday
+    return ((cast(func.strftime("%w", column), Integer) + 6) % 7) * 24 + cast(func.strftime("%H", column), Integer)
+
+class SpeedProfile:
+    def __init__(self):
+        self._speeds = None
+        self._samples = 0
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def load(self, db):
+        """Aggregate the profile from gps_tracking; the query runs outside the lock"""
+        started = time.perf_counter()
+        hour = _hour_of_week_sql(models.GPSTracking.timestamp, db.get_bind().dialect.name)
+        rows = db.execute(
+            select(hour, func.count(), func.avg(models.GPSTracking.speed_kmh))
+            .where(models.GPSTracking.speed_kmh > MIN_MOVING_SPEED_KMH)
+            .group_by(hour)
+        ).all()
+        counts, means = np.zeros(HOURS_PER_WEEK), np.zeros(HOURS_PER_WEEK)
+        for hour_value, count, mean in rows:
+            if hour_value is not None:
+                counts[int(hour_value)], means[int(hour_value)] = count, mean
+        overall = float((counts * means).sum() / counts.sum()) if counts.sum() else AVERAGE_SPEED_KMH
+        speeds = np.where(counts >= SPEED_PROFILE_MIN_SAMPLES, means, overall)
+        with self._lock:
+            self._speeds, self._samples, self._loaded_at = speeds, int(counts.sum()), time.monotonic()
+        logger.info(f"Loaded speed profile from {self._samples} GPS fixes in {time.perf_counter() - started:.2f}s")
+
+    def due(self):
+        return self._speeds is None or time.monotonic() - self._loaded_at > SPEED_PROFILE_TTL_SECONDS
+
+    def speeds(self):
+        """km/h for each hour of the week, flat until the profile is first loaded"""
+        speeds = self._speeds
+        return np.full(HOURS_PER_WEEK, AVERAGE_SPEED_KMH) if speeds is None else speeds
+
+    def stats(self):
+        return {
+            "loaded": self._speeds is not None,
+            "samples": self._samples,
+            "age_seconds": round(time.monotonic() - self._loaded_at, 1) if self._speeds is not None else None,
+        }
+
+profile = SpeedProfile()
+
+@maintenance_task
+def refresh_speed_profile():
+    if profile.due():
+        with SessionLocal() as db:
+            profile.load(db)
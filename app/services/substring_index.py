@@ -0,0 +1,192 @@
+"""Indexed substring search (ILIKE '%term%') on delivery tracking numbers and location cities.
+
+On Postgres these are served by pg_trgm GIN indexes. SQLite has no trigram
+index, so this module keeps one in process per column: every lowercase
+3-gram of every value mapped to the ids of the rows containing it, as two
+sorted NumPy arrays. A search intersects the postings of the term's grams
+and hands the candidate ids to the database, which confirms them with the
+same LIKE over a primary-key lookup.
+
+The index is built on first use. Before every search it reads the rows of
+its table logged in change_log (app.services.changelog) since the last
+search, one indexed probe, so it sees writes from every process: API
+workers, the job worker, CSV imports and scripts. Rows changed since the
+build are held in a small delta that is folded in by the next rebuild; a
+reset of the table (seeding, clearing, restore) rebuilds it.
+"""
+import logging
+import os
+import threading
+import time
+import numpy as np
+from sqlalchemy import select
+from app.models import models
+from app.services import changelog
+
+logger = logging.getLogger(__name__)
+
+# Above this many candidates an index probe costs more than a LIKE scan that stops at LIMIT
+NGRAM_MAX_CANDIDATES = int(os.getenv("NGRAM_MAX_CANDIDATES", "5000"))
+# Rows changed since the build kept as a delta before the index is rebuilt
+NGRAM_MAX_DELTA = int(os.getenv("NGRAM_MAX_DELTA", "100000"))
+NGRAM_BUILD_CHUNK_ROWS = 500_000
+
+def gram_codes(texts, n=3):
+    """(codes, valid): an int64 code per n-gram position of each text, and which positions exist"""
+    width = max(map(len, texts), default=0)
+    if width < n:
+        return np.empty((len(texts), 0), dtype=np.int64), np.empty((len(texts), 0), dtype=bool)
+    chars = np.array(texts, dtype=f"<U{width}").view(np.uint32).reshape(len(texts), width).astype(np.int64)
+    positions = width - n + 1
+    codes = np.zeros((len(texts), positions), dtype=np.int64)
+    for k in range(n):
+        # 21 bits hold any code point
+        codes = (codes << 21) | chars[:, k:k + positions]
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    valid = np.arange(positions)[None, :] <= (lengths[:, None] - n)
+    return codes, valid
+
+class NgramIndex:
+    def __init__(self, column, n=3):
+        self.column = column
+        self.model = column.class_
+        self.n = n
+        self._codes = np.empty(0, dtype=np.int64)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._delta = {}  # id -> lowercase text, or None once deleted
+        self._dirty = set()
+        self._cursor = 0  # newest change_log id applied
+        self._caught_up_at = 0.0
+        self._stale = True
+        self._lock = threading.Lock()
+
+    def _build(self, db):
+        # Read the cursor first: changes committed during the build are applied again, which is harmless
+        self._cursor = changelog.horizon(db)
+        codes, ids = [], []
+        result = db.execute(
+            select(self.model.id, self.column).order_by(self.model.id)
+            .execution_options(yield_per=NGRAM_BUILD_CHUNK_ROWS)
+        )
+        for chunk in result.partitions(NGRAM_BUILD_CHUNK_ROWS):
+            chunk_ids = np.fromiter((row[0] for row in chunk), dtype=np.int64, count=len(chunk))
+            chunk_codes, valid = gram_codes([(row[1] or "").lower() for row in chunk], self.n)
+            codes.append(chunk_codes[valid])
+            ids.append(np.broadcast_to(chunk_ids[:, None], valid.shape)[valid])
+        codes = np.concatenate(codes) if codes else np.empty(0, dtype=np.int64)
+        ids = np.concatenate(ids) if ids else np.empty(0, dtype=np.int64)
+        order = np.lexsort((ids, codes))
+        codes, ids = codes[order], ids[order]
+        # A gram repeated within one text is posted once
+        keep = np.ones(len(codes), dtype=bool)
+        keep[1:] = (codes[1:] != codes[:-1]) | (ids[1:] != ids[:-1])
+        self._codes, self._ids = codes[keep], ids[keep]
+        self._delta = {}
+        self._dirty = set()
+        self._stale = False
+        self._caught_up_at = time.monotonic()
+        logger.info(f"Built {self.n}-gram index on {self.column} with {len(self._codes)} postings")
+
+    def refresh(self, db):
+        """Fold in pending writes, rebuilding when stale; searches call this themselves"""
+        with self._lock:
+            self._refresh(db)
+
+    def _catch_up(self, db):
+        """Mark the rows logged since the cursor dirty, or the index stale after a reset"""
+        # Entries older than the change log's retention may be pruned before they are read
+        if time.monotonic() - self._caught_up_at > changelog.CHANGE_RETENTION_DAYS * 86400 / 2:
+            self._stale = True
+            return
+        final = changelog.horizon(db, self._cursor)
+        changes = db.execute(
+            select(models.ChangeLog.id, models.ChangeLog.row_id)
+            .where(
+                models.ChangeLog.table_name == self.model.__tablename__,
+                models.ChangeLog.id > self._cursor, models.ChangeLog.id <= final,
+            )
+        ).all()
+        self._cursor = max(self._cursor, final)
+        changed = {row_id for _, row_id in changes}
+        if None in changed:
+            self._stale = True
+        self._dirty.update(changed)
+        self._caught_up_at = time.monotonic()
+
+    def _refresh(self, db):
+        if not self._stale:
+            self._catch_up(db)
+        if not self._stale and len(self._delta) + len(self._dirty) > NGRAM_MAX_DELTA:
+            self._stale = True
+        if self._stale:
+            self._build(db)
+            return
+        dirty, self._dirty = list(self._dirty), set()
+        for start in range(0, len(dirty), 10000):
+            chunk = dirty[start:start + 10000]
+            self._delta.update(dict.fromkeys(chunk))
+            self._delta.update(
+                (row_id, (text or "").lower())
+                for row_id, text in db.execute(select(self.model.id, self.column).where(self.model.id.in_(chunk)))
+            )
+
+    def candidates(self, db, term):
+        """Sorted ids of rows that may contain term, or None when the index cannot narrow the search"""
+        term = term.lower()
+        if len(term) < self.n:
+            return None
+        with self._lock:
+            self._refresh(db)
+            codes, valid = gram_codes([term], self.n)
+            postings = []
+            for code in np.unique(codes[valid]):
+                start, stop = np.searchsorted(self._codes, [code, code + 1])
+                postings.append(self._ids[start:stop])
+            found = None
+            for posting in sorted(postings, key=len):
+                found = posting if found is None else np.intersect1d(found, posting, assume_unique=True)
+                if not len(found):
+                    break
+            if self._delta:
+                changed = np.fromiter(self._delta, dtype=np.int64, count=len(self._delta))
+                found = np.setdiff1d(found, changed, assume_unique=True)
+                matches = [row_id for row_id, text in self._delta.items() if text is not None and term in text]
+                found = np.union1d(found, np.array(matches, dtype=np.int64))
+        if len(found) > NGRAM_MAX_CANDIDATES:
+            return None
+        return found
+
+    def stats(self):
+        return {
+            "postings": len(self._codes),
+            "delta": len(self._delta),
+            "pending": len(self._dirty),
+            "stale": self._stale,
+            "cursor": self._cursor,
+            "bytes": self._codes.nbytes + self._ids.nbytes,
+        }
+
+tracking_numbers = NgramIndex(models.Delivery.tracking_number)
+cities = NgramIndex(models.Location.city)
+
+def escape_like(term):
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def filter_contains(db, query, index, term):
+    """Narrow a query to rows whose indexed column contains term, case-insensitively"""
+    contains = index.column.ilike(f"%{escape_like(term)}%", escape="\\")
+    if db.get_bind().dialect.name == "sqlite":
+        candidates = index.candidates(db, term)
+        if candidates is not None:
+            return query.filter(index.model.id.in_(candidates.tolist()), contains)
+    return query.filter(contains)
+
+def filter_tracking_number(db, query, term):
+    """Narrow a deliveries query to tracking numbers containing term"""
+    term = term.strip()
+    exact = models.Delivery.tracking_number == term
+    if db.query(db.query(models.Delivery.id).filter(exact).exists()).scalar():
+        # A complete tracking number: the unique B-tree lookup GET /deliveries/tracking/{n} uses
+        return query.filter(exact)
+    # Anything else, including a full number in another case, is matched like ILIKE
+    return filter_contains(db, query, tracking_numbers, term)
@@ -0,0 +1,88 @@
+"""Dispatch planner benchmark on synthetic fleets.
+
+Generates deliveries around a number of cities and a fleet with the seeded
+vehicle capacities, then times the solver behind POST /dispatch/plan in
+two parts: assignment (pre-clustering and capacitated placement) and stop
+sequencing. Sequencing uses up to DISPATCH_TIME_LIMIT_SECONDS of local
+search. The baseline packs the same deliveries first-fit in id order and
+sequences them by nearest neighbour, which shows what clustering saves.
+
+    python scripts/benchmark_dispatch.py
+    python scripts/benchmark_dispatch.py --deliveries 10000 --vehicles 1000 --trials 5
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import time
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--deliveries", type=int, default=10000)
+parser.add_argument("--vehicles", type=int, default=1000)
+parser.add_argument("--depots", type=int, default=20)
+parser.add_argument("--cities", type=int, default=50, help="centres the deliveries are spread around")
+parser.add_argument("--load", type=float, default=0.6, help="total delivery weight as a share of fleet capacity")
+parser.add_argument("--trials", type=int, default=3)
+args = parser.parse_args()
+
+import numpy as np
+from app.services import dispatch, route_optimizer, distance_matrix
+from app.services.geo import unit_vectors, haversine_km
+
+CAPACITIES = [1000.0, 2000.0, 5000.0, 10000.0, 20000.0]
+
+def problem(rng):
+    cities = np.column_stack([rng.uniform(25, 48, args.cities), rng.uniform(-125, -65, args.cities)])
+    city = rng.integers(0, args.cities, args.deliveries)
+    lat = cities[city, 0] + rng.normal(0, 0.3, args.deliveries)
+    lon = cities[city, 1] + rng.normal(0, 0.3, args.deliveries)
+    capacities = rng.choice(CAPACITIES, args.vehicles)
+    weights = rng.uniform(1, 1000, args.deliveries)
+    weights *= args.load * capacities.sum() / weights.sum()
+    tiers = rng.choice([0, 1, 2], args.deliveries, p=[0.1, 0.2, 0.7])
+    deadlines = np.full(args.deliveries, np.nan)
+    return lat, lon, weights, tiers, deadlines, capacities, cities[:args.depots, 0], cities[:args.depots, 1]
+
+def baseline_km(lat, lon, weights, capacities, depot_lat, depot_lon):
+    """First-fit in id order into the largest vehicles, nearest-neighbour stops from the nearest depot"""
+    remaining = np.sort(capacities)[::-1].copy()
+    bins = np.full(len(weights), -1)
+    for i, weight in enumerate(weights.tolist()):
+        room = np.flatnonzero(remaining >= weight)
+        if len(room):
+            bins[i] = room[0]
+            remaining[room[0]] -= weight
+    depots = unit_vectors(depot_lat, depot_lon)
+    total = 0.0
+    for b in np.unique(bins[bins >= 0]):
+        stops = np.flatnonzero(bins == b)
+        depot = int(np.argmax(depots @ unit_vectors(lat[stops], lon[stops]).sum(axis=0)))
+        node_lat = np.concatenate([[depot_lat[depot]], lat[stops], [depot_lat[depot]]])
+        node_lon = np.concatenate([[depot_lon[depot]], lon[stops], [depot_lon[depot]]])
+        distances = distance_matrix.road_km(haversine_km(node_lat[:, None], node_lon[:, None], node_lat, node_lon))
+        problem = route_optimizer.Problem(distances, np.zeros(len(stops)), np.full(len(stops), np.nan), 1.0)
+        total += problem.plan(problem.nearest_neighbour()).distance_km
+    return total
+
+def main():
+    rng = np.random.default_rng(42)
+    print(f"{args.deliveries} deliveries, {args.vehicles} vehicles, {args.depots} depots, load {args.load:.0%} of capacity")
+    print(f"{'trial':>6}{'assign ms':>11}{'total ms':>10}{'routes':>8}{'unplaced':>10}{'fill':>7}{'km':>11}{'baseline km':>13}")
+    for trial in range(args.trials):
+        lat, lon, weights, tiers, deadlines, capacities, depot_lat, depot_lon = problem(rng)
+        started = time.perf_counter()
+        dispatch.assign(unit_vectors(lat, lon), weights, capacities, np.random.default_rng(0))
+        assign_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        trips, unplaced = dispatch.solve(lat, lon, weights, tiers, deadlines, capacities, depot_lat, depot_lon)
+        total_ms = (time.perf_counter() - started) * 1000
+        fill = np.mean([trip.load_kg / capacities[trip.vehicle] for trip in trips])
+        km = sum(trip.distance_km for trip in trips)
+        print(
+            f"{trial:>6}{assign_ms:>11.0f}{total_ms:>10.0f}{len(trips):>8}{len(unplaced):>10}{fill:>7.0%}"
+            f"{km:>11.0f}{baseline_km(lat, lon, weights, capacities, depot_lat, depot_lon):>13.0f}"
+        )
+
+if __name__ == "__main__":
+    main()
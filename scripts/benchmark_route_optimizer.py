@@ -0,0 +1,102 @@
+"""Route optimizer benchmark on seeded data.
+
+For each stop count, loads that many pending deliveries onto a seeded route
+and runs the solver behind POST /routes/{id}/optimize. It reports solve time
+and road distance of the optimized order against the stored order (by
+delivery id) and the better of the solver's starting tours
+(nearest-neighbour and earliest-deadline). Stops are the deliveries
+nearest the route's origin, and deadlines are spread over the starting tour's
+duration so time windows actually bind.
+
+    python scripts/benchmark_route_optimizer.py
+    python scripts/benchmark_route_optimizer.py --stops 50 100 200 --trials 10 --database-url postgresql://localhost/fleet_bench
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import random
+import tempfile
+import time
+from datetime import timedelta
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--stops", type=int, nargs="+", default=[25, 50, 100, 200], help="stops per route")
+parser.add_argument("--trials", type=int, default=5, help="routes solved per stop count")
+parser.add_argument("--scale", type=float, default=20.0, help="seed scale for an empty database")
+parser.add_argument("--database-url", default=None, help="defaults to a temporary SQLite file")
+args = parser.parse_args()
+
+if args.database_url is None:
+    args.database_url = f"sqlite:///{tempfile.mkdtemp()}/benchmark_route_optimizer.db"
+os.environ["DATABASE_URL"] = args.database_url
+os.environ.setdefault("DISTANCE_MATRIX_DIR", tempfile.mkdtemp())
+
+import numpy as np
+from sqlalchemy import select, func, update
+from app.database.config import engine, SessionLocal
+from app.database import migrations
+from app.models import models
+from app.services import seed_generator, route_optimizer, geo_index
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(pct / 100 * len(sorted_values)))]
+
+def load_route(db, rng, stops):
+    """A seeded route carrying `stops` deliveries around its origin, with deadlines that bind"""
+    route = db.get(models.Route, rng.randint(1, db.scalar(select(func.max(models.Route.id)))))
+    origin = db.get(models.Location, route.origin_location_id)
+    # A route serves one area: deliveries at the locations nearest its origin
+    nearby = [location_id for location_id, _ in geo_index.locations.nearest(db, origin.latitude, origin.longitude, stops * 2)]
+    candidates = db.scalars(select(models.Delivery.id).where(models.Delivery.location_id.in_(nearby))).all()
+    chosen = rng.sample(candidates, min(stops, len(candidates)))
+    db.execute(update(models.Delivery).where(models.Delivery.route_id == route.id).values(route_id=None))
+    db.execute(
+        update(models.Delivery).where(models.Delivery.id.in_(chosen))
+        .values(route_id=route.id, status="pending", scheduled_delivery=None)
+    )
+    db.commit()
+
+    # Deadlines spread over the duration of the solver's starting tour
+    tour = route_optimizer.optimize_route(db, route, time_limit=0)
+    departure = tour["departure"]
+    duration = max(60.0, (tour["stops"][-1]["estimated_arrival"] - departure).total_seconds() / 60)
+    for delivery_id in chosen:
+        db.execute(update(models.Delivery).where(models.Delivery.id == delivery_id).values(
+            scheduled_delivery=departure + timedelta(minutes=rng.uniform(0.3, 1.0) * duration)
+        ))
+    db.commit()
+    return route
+
+def main():
+    migrations.upgrade(engine)
+    with engine.connect() as connection:
+        seeded = connection.execute(select(func.count()).select_from(models.Route)).scalar()
+    if not seeded:
+        print(f"Seeding scale {args.scale} into {engine.url.render_as_string(hide_password=True)} ...")
+        seed_generator.seed(engine, scale=args.scale)
+
+    rng = random.Random(42)
+    print(f"{'stops':>6}{'trials':>8}{'p50 ms':>10}{'max ms':>10}{'stored km':>12}{'start km':>10}{'opt km':>10}{'late min':>10}")
+    for stops in args.stops:
+        times, stored, start, optimized, late = [], [], [], [], []
+        for _ in range(args.trials):
+            with SessionLocal() as db:
+                route = load_route(db, rng, stops)
+                started = time.perf_counter()
+                result = route_optimizer.optimize_route(db, route)
+                times.append(time.perf_counter() - started)
+                stored.append(result["current_order_distance_km"])
+                optimized.append(result["total_distance_km"])
+                late.append(result["late_minutes"])
+                # Without a time budget the solver returns its better starting tour
+                start.append(route_optimizer.optimize_route(db, route, time_limit=0)["total_distance_km"])
+        times.sort()
+        print(
+            f"{stops:>6}{args.trials:>8}{percentile(times, 50) * 1000:>10.1f}{times[-1] * 1000:>10.1f}"
+            f"{np.mean(stored):>12.0f}{np.mean(start):>10.0f}{np.mean(optimized):>10.0f}{np.mean(late):>10.0f}"
+        )
+
+if __name__ == "__main__":
+    main()
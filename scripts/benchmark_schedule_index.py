@@ -0,0 +1,76 @@
+"""Interval tree benchmark on synthetic bookings.
+
+Books a fleet back to back with random gaps and times the trees behind
+the route double-booking check and GET /vehicles/available: building them,
+one vehicle's overlaps, and every busy vehicle in a window. The baseline
+is a vectorized scan of all bookings, which is what the SQL predicate
+costs without an index.
+
+    python scripts/benchmark_schedule_index.py
+    python scripts/benchmark_schedule_index.py --vehicles 10000 --bookings 100 --queries 2000
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import time
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--vehicles", type=int, default=10000)
+parser.add_argument("--bookings", type=int, default=100, help="routes per vehicle")
+parser.add_argument("--queries", type=int, default=1000)
+args = parser.parse_args()
+
+import numpy as np
+from app.services.schedule_index import IntervalTree, _build_trees
+
+HOUR_US = 3600 * 10**6
+
+def bookings(rng):
+    durations = rng.integers(1, 12, (args.vehicles, args.bookings)) * HOUR_US
+    gaps = rng.integers(0, 24, (args.vehicles, args.bookings)) * HOUR_US
+    ends = np.cumsum(durations + gaps, axis=1)
+    starts = ends - durations
+    owners = np.repeat(np.arange(args.vehicles, dtype=np.int64), args.bookings)
+    return owners, starts.ravel(), ends.ravel()
+
+def main():
+    rng = np.random.default_rng(42)
+    owners, starts, ends = bookings(rng)
+    route_ids = np.arange(len(owners), dtype=np.int64)
+    print(f"{len(owners)} bookings over {args.vehicles} vehicles")
+
+    started = time.perf_counter()
+    trees = _build_trees(owners, starts, ends, route_ids)
+    everything = IntervalTree(starts, ends, route_ids)
+    print(f"build {time.perf_counter() - started:.2f}s")
+
+    windows = rng.integers(0, int(ends.max()), args.queries)
+    lengths = rng.integers(1, 12, args.queries) * HOUR_US
+    vehicles = rng.integers(0, args.vehicles, args.queries)
+
+    started = time.perf_counter()
+    for vehicle, start, length in zip(vehicles.tolist(), windows.tolist(), lengths.tolist()):
+        trees[vehicle].overlapping(start, start + length)
+    tree_conflict = (time.perf_counter() - started) / args.queries * 1e6
+    started = time.perf_counter()
+    for vehicle, start, length in zip(vehicles.tolist(), windows.tolist(), lengths.tolist()):
+        np.flatnonzero((owners == vehicle) & (starts < start + length) & (ends > start))
+    scan_conflict = (time.perf_counter() - started) / args.queries * 1e6
+
+    started = time.perf_counter()
+    for start, length in zip(windows.tolist(), lengths.tolist()):
+        set(owners[everything.overlapping(start, start + length)].tolist())
+    tree_busy = (time.perf_counter() - started) / args.queries * 1e6
+    started = time.perf_counter()
+    for start, length in zip(windows.tolist(), lengths.tolist()):
+        set(owners[(starts < start + length) & (ends > start)].tolist())
+    scan_busy = (time.perf_counter() - started) / args.queries * 1e6
+
+    print(f"{'query':>10}{'tree us':>10}{'scan us':>10}")
+    print(f"{'conflict':>10}{tree_conflict:>10.1f}{scan_conflict:>10.1f}")
+    print(f"{'busy':>10}{tree_busy:>10.1f}{scan_busy:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Speed model benchmark against the configured database.
+
+Times the build behind POST /admin/speed-model over the whole of
+gps_tracking (rows per second and file size), then the per-call cost of
+travel_minutes on random pairs of seeded locations, which is what
+POST /routes/estimate and every ETA leg pay.
+
+    python scripts/benchmark_speed_model.py
+    python scripts/benchmark_speed_model.py --cell-degrees 0.25 --estimates 20000
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import tempfile
+import time
+from datetime import datetime
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--cell-degrees", type=float, default=None, help="grid cell size (default SPEED_GRID_DEGREES)")
+parser.add_argument("--estimates", type=int, default=10000)
+args = parser.parse_args()
+
+import numpy as np
+from sqlalchemy import select
+from app.database.config import SessionLocal
+from app.models import models
+from app.services import speed_model
+
+def main():
+    path = os.path.join(tempfile.mkdtemp(), "speed-model.npz")
+    summary = speed_model.build(path, args.cell_degrees or speed_model.SPEED_GRID_DEGREES)
+    rate = summary["fixes"] / summary["seconds"] if summary["seconds"] else 0
+    print(
+        f"built from {summary['fixes']} fixes in {summary['seconds']:.2f}s ({rate:,.0f} rows/s): "
+        f"{summary['rows']}x{summary['cols']} cells of {summary['cell_degrees']} deg, "
+        f"{summary['cells_with_data']} with data, {summary['bytes'] / 1e6:.1f} MB"
+    )
+
+    model = speed_model.SpeedModel(path)
+    rng = np.random.default_rng(42)
+    with SessionLocal() as db:
+        points = np.array(db.execute(
+            select(models.Location.latitude, models.Location.longitude)
+            .where(models.Location.latitude.isnot(None), models.Location.longitude.isnot(None))
+        ).all(), dtype=np.float64)
+        if len(points) < 2:
+            print("no locations to estimate between")
+            return
+        pairs = rng.integers(0, len(points), (args.estimates, 2))
+        departure = datetime.utcnow()
+        model.travel_minutes(*points[0], *points[1], departure)
+        timings, kms = np.empty(args.estimates), np.empty(args.estimates)
+        for i, (a, b) in enumerate(pairs.tolist()):
+            started = time.perf_counter()
+            _, kms[i] = model.travel_minutes(*points[a], *points[b], departure)
+            timings[i] = (time.perf_counter() - started) * 1e6
+    print(f"{args.estimates} estimates, median {np.median(kms):.0f} road km")
+    print(f"{'p50 us':>10}{'p95 us':>10}{'p99 us':>10}{'max us':>10}")
+    p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+    print(f"{p50:>10.0f}{p95:>10.0f}{p99:>10.0f}{timings.max():>10.0f}")
+    os.remove(path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Tracking number search benchmark: leading-wildcard ILIKE scan versus the indexed paths.
+
+Seeds --deliveries rows into an empty database (other tables at scale 1) and
+times, per query term, GET /deliveries/?tracking_number= as it was (a plain
+ILIKE '%term%' that scans the table), the indexed substring search (pg_trgm
+GIN on Postgres, the in-process n-gram index on SQLite) and the exact-number
+path. The 50M row default is meant for Postgres; the SQLite n-gram index holds
+about 160 bytes per delivery in memory, so use a smaller --deliveries there.
+
+    python scripts/benchmark_tracking_search.py --database-url postgresql://localhost/fleet_bench
+    python scripts/benchmark_tracking_search.py --deliveries 1000000
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import random
+import tempfile
+import time
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--deliveries", type=int, default=50_000_000, help="deliveries seeded into an empty database")
+parser.add_argument("--queries", type=int, default=50, help="search terms per mode")
+parser.add_argument("--database-url", default=None, help="defaults to a temporary SQLite file")
+args = parser.parse_args()
+
+if args.database_url is None:
+    args.database_url = f"sqlite:///{tempfile.mkdtemp()}/benchmark_tracking_search.db"
+os.environ["DATABASE_URL"] = args.database_url
+
+from sqlalchemy import select, func
+from app.database.config import engine, SessionLocal
+from app.database import migrations
+from app.models import models
+from app.services import seed_generator
+from app.services.substring_index import tracking_numbers, filter_tracking_number, escape_like
+
+PAGE = 100
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(pct / 100 * len(sorted_values)))]
+
+def scan(db, query, term):
+    if engine.dialect.name == "postgresql":
+        # The trigram index is only reachable through bitmap scans
+        db.execute(select(func.set_config("enable_bitmapscan", "off", True)))
+    return query.filter(models.Delivery.tracking_number.ilike(f"%{escape_like(term)}%", escape="\\"))
+
+def indexed(db, query, term):
+    return filter_tracking_number(db, query, term)
+
+def run(label, narrow, terms):
+    latencies, rows = [], 0
+    for term in terms:
+        with SessionLocal() as db:
+            started = time.perf_counter()
+            rows += len(narrow(db, db.query(models.Delivery), term).limit(PAGE).all())
+            latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    print(
+        f"{label:<22}{len(terms):>8}{rows:>8}{percentile(latencies, 50) * 1000:>10.2f}"
+        f"{percentile(latencies, 95) * 1000:>10.2f}{max(latencies) * 1000:>10.2f}"
+    )
+
+def main():
+    migrations.upgrade(engine)
+    with engine.connect() as connection:
+        seeded = connection.execute(select(func.count()).select_from(models.Delivery)).scalar()
+    if not seeded:
+        print(f"Seeding {args.deliveries:,} deliveries into {engine.url.render_as_string(hide_password=True)} ...")
+        seed_generator.seed(engine, counts={"deliveries": args.deliveries})
+        with engine.connect() as connection:
+            seeded = connection.execute(select(func.count()).select_from(models.Delivery)).scalar()
+
+    rng = random.Random(42)
+    with engine.connect() as connection:
+        numbers = connection.execute(
+            select(models.Delivery.tracking_number).where(
+                models.Delivery.id.in_([rng.randint(1, seeded) for _ in range(args.queries)])
+            )
+        ).scalars().all()
+    # Customer-service lookups: a fragment of a number, in any case, and the whole number
+    fragments = []
+    for number in numbers:
+        length = rng.randint(5, 8)
+        start = rng.randint(0, len(number) - length)
+        fragments.append(number[start:start + length].lower())
+
+    if engine.dialect.name == "sqlite":
+        started = time.perf_counter()
+        with SessionLocal() as db:
+            tracking_numbers.refresh(db)
+        stats = tracking_numbers.stats()
+        print(
+            f"Built the n-gram index in {time.perf_counter() - started:.1f}s: "
+            f"{stats['postings']:,} postings, {stats['bytes'] / 2 ** 20:,.0f} MiB"
+        )
+
+    print(f"\n{seeded:,} deliveries, first {PAGE} matches per query on {engine.dialect.name}")
+    print(f"{'mode':<22}{'queries':>8}{'rows':>8}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    run("substring, scan", scan, fragments)
+    run("substring, indexed", indexed, fragments)
+    run("exact number, scan", scan, numbers)
+    run("exact number, indexed", indexed, numbers)
+
+if __name__ == "__main__":
+    main()
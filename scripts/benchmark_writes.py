@@ -0,0 +1,112 @@
+"""Write-path benchmark: ORM add/commit/refresh versus single-statement RETURNING.
+
+Runs N creates and N full updates of vehicles through the previous ORM write
+path and through app.database.crud, counting statements per write.
+
+    python scripts/benchmark_writes.py
+    python scripts/benchmark_writes.py --count 5000 --database-url postgresql://localhost/fleet_bench
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import tempfile
+import time
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--count", type=int, default=2000, help="writes per phase")
+parser.add_argument("--database-url", default=None, help="defaults to a temporary SQLite file")
+args = parser.parse_args()
+
+if args.database_url is None:
+    args.database_url = f"sqlite:///{tempfile.mkdtemp()}/benchmark_writes.db"
+os.environ["DATABASE_URL"] = args.database_url
+
+from sqlalchemy import event
+from app.database.config import engine, SessionLocal
+from app.database import crud, migrations
+from app.models import models
+
+statements = []
+
+def vehicle_values(i, org_id):
+    return {
+        "organization_id": org_id,
+        "vin": f"BENCH{i:012d}",
+        "make": "Ford",
+        "model": "Transit",
+        "year": 2022,
+        "license_plate": f"BN{i % 10000:04d}",
+        "vehicle_type": "cargo_van",
+        "capacity_kg": 2000.0,
+        "current_mileage": float(i),
+        "status": "active",
+    }
+
+def legacy_create(db, values):
+    db_vehicle = models.Vehicle(**values)
+    db.add(db_vehicle)
+    db.commit()
+    db.refresh(db_vehicle)
+    return db_vehicle
+
+def legacy_update(db, vehicle_id, values):
+    db_vehicle = db.query(models.Vehicle).filter(models.Vehicle.id == vehicle_id).first()
+    for key, value in values.items():
+        setattr(db_vehicle, key, value)
+    db.commit()
+    db.refresh(db_vehicle)
+    return db_vehicle
+
+def returning_create(db, values):
+    return crud.create_returning(db, models.Vehicle, values)
+
+def returning_update(db, vehicle_id, values):
+    return crud.update_returning(db, models.Vehicle, vehicle_id, values)
+
+def run(label, create, update, offset, org_id):
+    # A fresh session per write, as each request gets from get_db
+    statements.clear()
+    ids = []
+    started = time.perf_counter()
+    for i in range(args.count):
+        db = SessionLocal()
+        try:
+            ids.append(create(db, vehicle_values(offset + i, org_id)).id)
+        finally:
+            db.close()
+    create_elapsed = time.perf_counter() - started
+    create_statements = len(statements)
+
+    statements.clear()
+    started = time.perf_counter()
+    for i, vehicle_id in enumerate(ids):
+        db = SessionLocal()
+        try:
+            values = vehicle_values(offset + i, org_id)
+            values["current_mileage"] += 100
+            update(db, vehicle_id, values)
+        finally:
+            db.close()
+    update_elapsed = time.perf_counter() - started
+    update_statements = len(statements)
+
+    print(f"{label:<10} create: {args.count / create_elapsed:8.0f} writes/s  {create_statements / args.count:.1f} statements/write")
+    print(f"{label:<10} update: {args.count / update_elapsed:8.0f} writes/s  {update_statements / args.count:.1f} statements/write")
+
+def main():
+    migrations.upgrade(engine)
+    db = SessionLocal()
+    org = crud.create_returning(db, models.Organization, {
+        "name": f"Benchmark {time.time()}", "email": "bench@example.com", "phone": "0", "address": "-"
+    })
+    db.close()
+
+    event.listen(engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+    print(f"{args.count} writes per phase against {engine.dialect.name}")
+    run("before", legacy_create, legacy_update, 0, org.id)
+    run("after", returning_create, returning_update, args.count, org.id)
+
+if __name__ == "__main__":
+    main()
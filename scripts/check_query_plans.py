@@ -0,0 +1,194 @@
+"""Query-plan regression check for the list endpoints.
+
+Seeds a throwaway database, calls every filterable list endpoint with each
+single filter and each pair of filters, and fails if any resulting SELECT
+is planned as a full table scan.
+
+    python scripts/check_query_plans.py
+    python scripts/check_query_plans.py --rows 200000
+    python scripts/check_query_plans.py --database-url postgresql://localhost/fleet_plans
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import itertools
+import random
+import re
+import tempfile
+import typing
+from datetime import datetime, timedelta
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--rows", type=int, default=50000, help="rows seeded into each table")
+parser.add_argument("--database-url", default=None, help="defaults to a temporary SQLite file")
+args = parser.parse_args()
+
+if args.database_url is None:
+    args.database_url = f"sqlite:///{tempfile.mkdtemp()}/query_plans.db"
+os.environ["DATABASE_URL"] = args.database_url
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, select, insert, func, Boolean, DateTime, Float, Integer, Numeric
+from app.database.config import engine, Base, SessionLocal
+from app.models import models
+from app.main import app
+from app.services.substring_index import tracking_numbers, cities
+
+# Filters known not to be index-backed, with the reason
+KNOWN_SCANS = {}
+
+# Values for required query parameters that are not filters
+REQUIRED_PARAMS = {
+    "start": "2024-01-01T00:00:00",
+    "end": "2024-01-02T00:00:00",
+    "bbox": "-180,-90,180,90",
+}
+
+# Realistic cardinalities for the low-cardinality columns the routers filter on
+VOCABULARY = {
+    "status": ["active", "maintenance", "retired", "inactive", "on_leave", "scheduled",
+               "in_progress", "completed", "cancelled", "pending", "in_transit", "delivered", "failed"],
+    "vehicle_type": ["cargo_van", "pickup_truck", "box_truck", "semi_truck", "refrigerated_truck"],
+    "type": ["warehouse", "depot", "customer", "distribution_center"],
+    "state": ["CA", "TX", "FL", "NY", "PA", "IL", "OH", "GA", "NC", "MI"],
+    "priority": ["standard", "express", "urgent"],
+    "maintenance_type": ["routine", "repair", "inspection", "emergency"],
+    "fuel_type": ["diesel", "gasoline", "electric"],
+    "incident_type": ["accident", "delay", "damage", "theft", "violation"],
+    "severity": ["minor", "moderate", "major", "critical"],
+}
+
+def fake_value(column, i, rows, rng):
+    if column.foreign_keys:
+        return rng.randint(1, rows)
+    if "email" in column.name:
+        return f"{column.name}{i}@example.com"
+    if column.unique:
+        return f"{column.name}-{i}"
+    if column.name in VOCABULARY:
+        return rng.choice(VOCABULARY[column.name])
+    if isinstance(column.type, Boolean):
+        return rng.random() < 0.5
+    if isinstance(column.type, DateTime):
+        return datetime(2024, 1, 1) + timedelta(minutes=i)
+    if isinstance(column.type, (Integer, Float, Numeric)):
+        return rng.randint(0, 1000)
+    return f"{column.name}-{rng.randint(0, 999)}"
+
+def seed(rows):
+    rng = random.Random(42)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            columns = [c for c in table.columns if not c.primary_key]
+            for start in range(0, rows, 5000):
+                batch = [
+                    {c.name: fake_value(c, i, rows, rng) for c in columns}
+                    for i in range(start, min(start + 5000, rows))
+                ]
+                conn.execute(insert(table), batch)
+        conn.exec_driver_sql("ANALYZE")
+
+def list_endpoints():
+    """(path, model, filter names, required params) for every GET list route with filter parameters.
+
+    Routes with a required parameter missing from REQUIRED_PARAMS are skipped.
+    """
+    for route in app.routes:
+        if "GET" not in getattr(route, "methods", ()) or "{" in route.path:
+            continue
+        response_model = getattr(route, "response_model", None)
+        if typing.get_origin(response_model) is not list:
+            continue
+        schema = typing.get_args(response_model)[0]
+        model = getattr(models, schema.__name__, None)
+        if model is None:
+            continue
+        filters = [
+            param.name for param in route.dependant.query_params
+            if param.name not in ("skip", "limit") and param.name in model.__table__.columns
+        ]
+        required = [param.name for param in route.dependant.query_params if param.required]
+        if any(name not in REQUIRED_PARAMS for name in required):
+            print(f"Skipping GET {route.path}: no value for required {', '.join(required)}")
+            continue
+        yield route.path, model, filters, {name: REQUIRED_PARAMS[name] for name in required}
+
+def explain(conn, statement, parameters):
+    if engine.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+        return [row[-1] for row in rows]
+    rows = conn.exec_driver_sql("EXPLAIN " + statement, parameters).fetchall()
+    return [row[0] for row in rows]
+
+def full_scans(plan, table):
+    if engine.dialect.name == "sqlite":
+        pattern = re.compile(rf"^SCAN (TABLE )?{table}$")
+    else:
+        pattern = re.compile(rf"Seq Scan on {table}\b")
+    return [line for line in plan if pattern.search(line.strip())]
+
+def main():
+    print(f"Seeding {args.rows} rows per table into {engine.url.render_as_string(hide_password=True)} ...")
+    seed(args.rows)
+    # In-process search indexes read their whole table once when built; do that before capturing
+    with SessionLocal() as db:
+        tracking_numbers.refresh(db)
+        cities.refresh(db)
+
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+
+    failures = []
+    checked = 0
+    with TestClient(app) as client, engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            # Small test tables make seq scans cheap; ask whether an index *could* be used
+            conn.exec_driver_sql("SET enable_seqscan = off")
+
+        for path, model, filters, required in list_endpoints():
+            table = model.__tablename__
+            sample = conn.execute(select(model.__table__).order_by(func.random()).limit(1)).mappings().first()
+            for size in (1, 2):
+                for combo in itertools.combinations(filters, size):
+                    if size == 1 and (table, combo[0]) in KNOWN_SCANS:
+                        continue
+                    params = {name: sample[name] for name in combo}
+                    if any(value is None for value in params.values()):
+                        continue
+                    params = {k: str(v).lower() if isinstance(v, bool) else v for k, v in params.items()}
+
+                    captured.clear()
+                    response = client.get(path, params={**required, **params})
+                    if response.status_code != 200:
+                        failures.append((path, params, [f"HTTP {response.status_code}"]))
+                        continue
+
+                    for statement, parameters in captured:
+                        if f"FROM {table}" not in statement:
+                            continue
+                        checked += 1
+                        scans = full_scans(explain(conn, statement, parameters), table)
+                        if scans:
+                            failures.append((path, params, scans))
+
+    event.remove(engine, "before_cursor_execute", capture)
+
+    print(f"Checked {checked} query plans")
+    for path, params, scans in failures:
+        print(f"FULL SCAN  GET {path} {params}: {'; '.join(scans)}")
+    if failures:
+        print(f"{len(failures)} list queries are not index-backed")
+        sys.exit(1)
+    print("All filtered list queries use an index")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Run background job workers outside the API process.
+
+    python scripts/job_worker.py
+    python scripts/job_worker.py --workers 8
+
+Set JOB_WORKERS=0 on the API replicas to leave all execution to sidecars;
+any number of sidecars and API replicas can share one queue.
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import logging
+import signal
+import threading
+from app.database.config import engine
+from app.database import migrations
+from app.services.jobs import WorkerPool, JOB_WORKERS
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=JOB_WORKERS or os.cpu_count() or 1,
+                        help="worker threads (default: JOB_WORKERS, else CPU count)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    migrations.ensure_schema(engine)
+
+    stopping = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stopping.set())
+
+    pool = WorkerPool(workers=args.workers)
+    pool.start()
+    stopping.wait()
+    print("Stopping job workers; running jobs finish their current step...")
+    pool.stop()
+
+if __name__ == "__main__":
+    main()
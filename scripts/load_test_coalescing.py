@@ -0,0 +1,141 @@
+"""Load test for request coalescing (single-flight) on hot GET endpoints.
+
+Serves the app with uvicorn in this process, fires bursts of identical
+concurrent requests at each endpoint with single-flight off and then on, and
+reports the SQL statements the database received per second alongside
+client-side latency percentiles. Requests are sent from one asyncio client
+so the load generator adds as little thread contention as possible. The list response cache is disabled for the
+run so only coalescing is measured.
+
+    python scripts/load_test_coalescing.py
+    python scripts/load_test_coalescing.py --db-latency-ms 5
+    python scripts/load_test_coalescing.py --concurrency 200 --bursts 30 --database-url postgresql://localhost/fleet_bench
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import socket
+import tempfile
+import threading
+import time
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--concurrency", type=int, default=200, help="identical requests per burst")
+parser.add_argument("--bursts", type=int, default=20, help="bursts per endpoint and mode")
+parser.add_argument("--scale", type=float, default=1.0, help="seed scale for an empty database")
+parser.add_argument("--database-url", default=None, help="defaults to a temporary SQLite file")
+parser.add_argument("--db-latency-ms", type=float, default=0, help="added to every statement, to emulate a networked database when testing on SQLite")
+args = parser.parse_args()
+
+if args.database_url is None:
+    args.database_url = f"sqlite:///{tempfile.mkdtemp()}/load_test_coalescing.db"
+os.environ["DATABASE_URL"] = args.database_url
+os.environ["JOB_WORKERS"] = "0"
+
+from sqlalchemy import event, select, func
+import httpx
+import uvicorn
+from app.database.config import engine
+from app.database import migrations
+from app.models import models
+from app.services import seed_generator
+from app.cache.responses import response_cache, flights
+from app.main import app
+
+statements = 0
+statements_lock = threading.Lock()
+
+@event.listens_for(engine, "before_cursor_execute")
+def count_statement(conn, cursor, statement, parameters, context, executemany):
+    global statements
+    with statements_lock:
+        statements += 1
+    if args.db_latency_ms:
+        time.sleep(args.db_latency_ms / 1000)
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(pct / 100 * len(sorted_values)))]
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server():
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", timeout_keep_alive=120))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread, f"http://127.0.0.1:{port}"
+
+async def burst(client, path):
+    async def request():
+        begin = time.perf_counter()
+        response = await client.get(path)
+        response.raise_for_status()
+        return time.perf_counter() - begin
+
+    return await asyncio.gather(*(request() for _ in range(args.concurrency)))
+
+async def run(client, path):
+    global statements
+    latencies = []
+    with statements_lock:
+        statements = 0
+    started = time.perf_counter()
+    for _ in range(args.bursts):
+        latencies.extend(await burst(client, path))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "statements": statements,
+        "db_qps": statements / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+async def measure(base_url, paths):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        for path in paths:
+            (await client.get(path)).raise_for_status()
+            # Open every connection up front so bursts measure requests, not handshakes
+            await burst(client, path)
+            print(f"\n{path}: {args.bursts} bursts of {args.concurrency} identical requests")
+            print(f"{'single-flight':<15}{'statements':>12}{'db qps':>10}{'p50 ms':>10}{'p99 ms':>10}")
+            for enabled in (False, True):
+                flights.enabled = enabled
+                result = await run(client, path)
+                print(
+                    f"{'on' if enabled else 'off':<15}{result['statements']:>12}{result['db_qps']:>10.0f}"
+                    f"{result['p50_ms']:>10.1f}{result['p99_ms']:>10.1f}"
+                )
+
+def main():
+    migrations.upgrade(engine)
+    with engine.connect() as connection:
+        seeded = connection.execute(select(func.count()).select_from(models.Vehicle)).scalar()
+    if not seeded:
+        print(f"Seeding scale {args.scale} into {args.database_url} ...")
+        seed_generator.seed(engine, scale=args.scale)
+    with engine.connect() as connection:
+        vehicle_id = connection.execute(select(models.GPSTracking.vehicle_id).limit(1)).scalar()
+
+    # Store nothing, so every request reaches the handler
+    response_cache.max_entry_bytes = 0
+    server, thread, base_url = start_server()
+    paths = [f"/gps/vehicle/{vehicle_id}/latest", "/vehicles/?status=active"]
+    try:
+        asyncio.run(measure(base_url, paths))
+    finally:
+        server.should_exit = True
+        thread.join()
+
+if __name__ == "__main__":
+    main()
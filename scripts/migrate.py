@@ -0,0 +1,38 @@
+"""Apply or inspect versioned schema migrations.
+
+    python scripts/migrate.py            # upgrade to the latest version
+    python scripts/migrate.py --status   # show current and latest version
+    python scripts/migrate.py --target 2 # upgrade up to a given version
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+from app.database.config import engine
+from app.database import migrations
+
+def main():
+    parser = argparse.ArgumentParser(description="Fleet Logistics schema migrations")
+    parser.add_argument("--status", action="store_true", help="show versions without migrating")
+    parser.add_argument("--target", type=int, default=None, help="stop at this version")
+    args = parser.parse_args()
+
+    current = migrations.current_version(engine)
+    head = migrations.head_version()
+    print(f"Current schema version: {current}")
+    print(f"Latest schema version:  {head}")
+    if args.status:
+        for step in migrations.MIGRATIONS:
+            marker = "applied" if step.version <= current else "pending"
+            print(f"  {step.version:>4}  {marker:<8} {step.description}")
+        return
+
+    applied = migrations.upgrade(engine, target=args.target)
+    if applied:
+        print(f"Applied migrations: {', '.join(str(v) for v in applied)}")
+    else:
+        print("Nothing to migrate")
+
+if __name__ == "__main__":
+    main()